@@ -1,18 +1,42 @@
-import argparse as ap
-
-def get_args():
-    '''
-    Parses the command-line argument(s) for analyzing/processing the graph.
-    Utilizes the 'argparse' module for the graph processing script. 
-    '''
-    parser = ap.ArgumentParser()
-
-    parser.add_argument("--input")
-    parser.add_argument("--create_random_graph", nargs=2, type=float)
-
-    parser.add_argument("--multi_BFS", nargs="+")
-    parser.add_argument("--analyze", action="store_true")
-    parser.add_argument("--plot", action="store_true")
-    parser.add_argument("--output")
-
+import argparse as ap
+
+def at_least(minimum):
+    '''
+    Returns an argparse type accepting integers no smaller than minimum.
+    '''
+    def parse(value):
+        value = int(value)
+        if value < minimum:
+            raise ap.ArgumentTypeError(f"must be at least {minimum}, got {value}")
+        return value
+    return parse
+
+def get_args():
+    '''
+    Parses the command-line argument(s) for analyzing/processing the graph.
+    Utilizes the 'argparse' module for the graph processing script. 
+    '''
+    parser = ap.ArgumentParser()
+
+    parser.add_argument("--input")
+    parser.add_argument("--no_cache", action="store_true")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--create_random_graph", nargs=2, type=float)
+    parser.add_argument("--seed", type=int)
+
+    parser.add_argument("--multi_BFS", nargs="+")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--analyze", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--stream_failures", type=int, default=0)
+    parser.add_argument("--stream_runs", type=int, default=10)
+    parser.add_argument("--memory_limit", type=int)
+    parser.add_argument("--path_samples", type=at_least(2))
+    parser.add_argument("--path_tolerance", type=float)
+    parser.add_argument("--path_per_component", action="store_true")
+    parser.add_argument("--plot", action="store_true")
+    parser.add_argument("--output")
+    parser.add_argument("--profile", nargs="?", const="profile_trace.json")
+    parser.add_argument("--cprofile", nargs="+", default=[])
+
     return parser.parse_args()
\ No newline at end of file
@@ -0,0 +1,316 @@
+'''
+Reproducible benchmarks for the analysis entry points.
+
+Every benchmark runs on seeded Erdos-Renyi, scale-free and community-structured
+graphs of the requested sizes. Wall and CPU time are measured on untraced runs
+(best of --repeat) and peak Python/NumPy memory on one extra run under tracemalloc.
+Results are written as JSON and compared against a stored baseline, exiting
+with status 1 when a benchmark got slower or larger than the threshold allows,
+or when one that passed in the baseline now fails or is missing.
+
+Examples:
+    python benchmark.py --sizes 1000 10000 --output results.json
+    python benchmark.py --sizes 1000 10000 --baseline baseline.json --output results.json
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import networkx as nx
+import numpy as np
+
+import centrality
+import graph_algorithms
+import graph_generator
+import graph_io
+from detect_community import partition_graph
+from metrics import metrics_computation, verify_homophily
+from simulation import failure_sim, robustness_check
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+GRAPH_KINDS = ['er', 'scale_free', 'community']
+AVERAGE_DEGREE = 8
+
+# Nodes per planted community in the community-structured graphs
+COMMUNITY_SIZE = 100
+
+# A benchmark regresses when it is this much slower/larger than the baseline...
+REGRESSION_THRESHOLD = 0.25
+# ...and the difference is above these absolute floors (timer and allocator noise)
+MIN_SECONDS = 0.05
+MIN_MEGABYTES = 1.0
+
+def make_graph(kind, n, seed, average_degree=AVERAGE_DEGREE):
+    '''
+    Generates a seeded benchmark graph with nodes labeled "0", ..., "n-1" and a
+    'color' attribute for the homophily test (the planted community for
+    community graphs, one of 8 random colors otherwise).
+
+    Arguments:
+        kind (str): 'er', 'scale_free' or 'community'
+        n (int): number of nodes
+        seed (int): seed for the structure and the colors
+        average_degree (float): expected average degree
+
+    Returns:
+        nx.Graph: the generated graph
+    '''
+    if kind == 'er':
+        graph = graph_generator.erdos_renyi_graph(n, min(average_degree / max(n - 1, 1), 1.0), seed=seed)
+        colors = np.random.default_rng(seed).integers(0, 8, size=n)
+    elif kind == 'scale_free':
+        graph = graph_generator.scale_free_graph(n, average_degree, seed=seed)
+        colors = np.random.default_rng(seed).integers(0, 8, size=n)
+    elif kind == 'community':
+        graph = graph_generator.community_graph(n, max(1, n // COMMUNITY_SIZE), average_degree, seed=seed)
+        colors = np.fromiter(nx.get_node_attributes(graph, 'community').values(), dtype=np.int64, count=n)
+    else:
+        raise ValueError(f"Unknown graph kind '{kind}'")
+    nx.set_node_attributes(graph, dict(zip(graph.nodes(), colors.tolist())), 'color')
+    return graph
+
+def _bench_read(graph, workdir, options):
+    path = os.path.join(workdir, 'read.gml')
+    graph_io.writeGraph(graph, path)
+    return lambda: graph_io.readGraph(path)
+
+def _bench_write(graph, workdir, options):
+    path = os.path.join(workdir, 'write.gml')
+    return lambda: graph_io.writeGraph(graph, path)
+
+def _bench_multi_bfs(graph, workdir, options):
+    sources = [str(i) for i in range(0, graph.number_of_nodes(), max(1, graph.number_of_nodes() // 4))][:4]
+    return lambda: graph_algorithms.multi_BFS(graph, sources, workers=options['workers'])
+
+def _bench_components(graph, workdir, options):
+    return lambda: graph_algorithms.connectedComp(graph)
+
+def _bench_metrics(graph, workdir, options):
+    return lambda: metrics_computation(graph, workers=options['workers'])
+
+def _bench_homophily(graph, workdir, options):
+    return lambda: verify_homophily(graph, seed=options['seed'])
+
+def _bench_partition(graph, workdir, options):
+    return lambda: partition_graph(graph, 10, samples=32, seed=options['seed'], workers=options['workers'])
+
+def _bench_failure(graph, workdir, options):
+    k = max(1, graph.number_of_edges() // 100)
+    return lambda: failure_sim(graph, k, path_samples=32, betweenness_samples=32,
+                               workers=options['workers'], seed=options['seed'])
+
+def _bench_robustness(graph, workdir, options):
+    k = max(1, graph.number_of_edges() // 100)
+    return lambda: robustness_check(graph, k, 2, num_sims=10, workers=options['workers'], seed=options['seed'])
+
+# name -> (setup returning the timed callable, largest graph it runs on, graph kinds)
+BENCHMARKS = {
+    'readGraph': (_bench_read, 1000000, GRAPH_KINDS),
+    'writeGraph': (_bench_write, 1000000, GRAPH_KINDS),
+    'multi_BFS': (_bench_multi_bfs, 1000000, GRAPH_KINDS),
+    'connectedComp': (_bench_components, 1000000, GRAPH_KINDS),
+    'metrics_computation': (_bench_metrics, 1000000, GRAPH_KINDS),
+    'verify_homophily': (_bench_homophily, 1000000, GRAPH_KINDS),
+    # Girvan-Newman removes edges one at a time, so it only runs on small community graphs
+    'partition_graph': (_bench_partition, 1000, ['community']),
+    'failure_sim': (_bench_failure, 1000000, GRAPH_KINDS),
+    'robustness_check': (_bench_robustness, 1000000, GRAPH_KINDS),
+}
+
+def _reset(seed):
+    '''
+    Restores global state between runs: seeds the random module (failure_sim) and
+    clears the centrality cache so repeated runs do the same work.
+    '''
+    random.seed(seed)
+    centrality._cache.clear()
+
+def measure(function, repeat=1, memory=True, seed=None):
+    '''
+    Times a callable with its output suppressed.
+
+    Returns:
+        dict: best 'wall' and 'cpu' seconds over repeat runs, and the tracemalloc
+              'peak_mb' of one more run (None without memory)
+    '''
+    wall, cpu = [], []
+    for _ in range(repeat):
+        _reset(seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            function()
+            wall.append(time.perf_counter() - start_wall)
+            cpu.append(time.process_time() - start_cpu)
+
+    peak = None
+    if memory:
+        _reset(seed)
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                function()
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return {'wall': min(wall), 'cpu': min(cpu), 'peak_mb': peak}
+
+def run_benchmarks(sizes, kinds=GRAPH_KINDS, names=None, seed=42, repeat=1, memory=True, workers=1,
+                   average_degree=AVERAGE_DEGREE):
+    '''
+    Runs the selected benchmarks on every graph kind and size.
+    Each graph is generated once per (kind, size) and shared by its benchmarks;
+    failures are recorded instead of aborting the suite.
+
+    Returns:
+        list: one dict per (benchmark, graph, nodes) with its measurements and a status
+              ('ok', 'skipped' above the benchmark's size limit, or 'error')
+    '''
+    names = list(BENCHMARKS) if names is None else names
+    options = {'seed': seed, 'workers': workers}
+    results = []
+    workdir = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        for n in sizes:
+            for kind in kinds:
+                selected = [name for name in names if kind in BENCHMARKS[name][2]]
+                if not selected:
+                    continue
+                start = time.perf_counter()
+                graph = make_graph(kind, n, seed, average_degree)
+                print(f"{kind} graph: {n} nodes, {graph.number_of_edges()} edges ({time.perf_counter() - start:.1f}s)")
+
+                for name in selected:
+                    setup, max_nodes, _ = BENCHMARKS[name]
+                    result = {'benchmark': name, 'graph': kind, 'nodes': n, 'edges': graph.number_of_edges()}
+                    if n > max_nodes:
+                        result['status'] = 'skipped'
+                    else:
+                        try:
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                function = setup(graph, workdir, options)
+                            result.update(measure(function, repeat, memory, seed), status='ok')
+                        except Exception as error:
+                            result.update(status='error', error=f"{type(error).__name__}: {error}")
+                    results.append(result)
+                    print(f"  {_format_row(result)}")
+                del graph
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def _key(result):
+    return result['benchmark'], result['graph'], result['nodes']
+
+def compare_results(results, baseline, threshold=REGRESSION_THRESHOLD, names=None):
+    '''
+    Compares results with a baseline run of the same benchmarks. A benchmark has
+    regressed when its wall time or peak memory grew by more than threshold (and
+    by more than MIN_SECONDS / MIN_MEGABYTES), or when it passed in the baseline
+    and now did not: it failed, was skipped, or is missing from a run that covered
+    its graph kind and size (and selected it, if names limits the benchmarks).
+
+    Returns:
+        list: the regressed results, each with its 'wall_ratio' and 'memory_ratio',
+              and a 'missing' placeholder for every benchmark that did not run
+    '''
+    previous = {_key(result): result for result in baseline if result.get('status') == 'ok'}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        if result.get('status') != 'ok':
+            regressions.append(result)
+            continue
+        result['wall_ratio'] = result['wall'] / old['wall'] if old['wall'] > 0 else None
+        slower = result['wall'] > old['wall'] * (1 + threshold) and result['wall'] - old['wall'] > MIN_SECONDS
+
+        larger = False
+        if result['peak_mb'] is not None and old.get('peak_mb') is not None:
+            result['memory_ratio'] = result['peak_mb'] / old['peak_mb'] if old['peak_mb'] > 0 else None
+            larger = result['peak_mb'] > old['peak_mb'] * (1 + threshold) and result['peak_mb'] - old['peak_mb'] > MIN_MEGABYTES
+        if slower or larger:
+            regressions.append(result)
+
+    # Graphs the run covered, so a baseline of other sizes or kinds is not reported as missing
+    ran = {_key(result) for result in results}
+    graphs = {(result['graph'], result['nodes']) for result in results}
+    for key, old in previous.items():
+        name, kind, n = key
+        if key not in ran and (kind, n) in graphs and (names is None or name in names):
+            regressions.append({'benchmark': name, 'graph': kind, 'nodes': n, 'status': 'missing'})
+    return regressions
+
+def _format_row(result):
+    label = f"{result['benchmark']:<20} {result['graph']:<11} {result['nodes']:>8}"
+    if result['status'] != 'ok':
+        return f"{label}  {result['status']}" + (f" ({result['error']})" if 'error' in result else '')
+    text = f"{label}  {result['wall']:9.3f}s wall {result['cpu']:9.3f}s cpu"
+    if result['peak_mb'] is not None:
+        text += f" {result['peak_mb']:9.1f} MB peak"
+    if result.get('wall_ratio') is not None:
+        text += f"  x{result['wall_ratio']:.2f} time"
+    if result.get('memory_ratio') is not None:
+        text += f" x{result['memory_ratio']:.2f} memory"
+    return text
+
+def _environment():
+    return {'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'platform': platform.platform(), 'numpy': np.__version__, 'networkx': nx.__version__,
+            'cpus': os.cpu_count()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the graph analysis entry points on seeded synthetic graphs.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Numbers of nodes of the generated graphs')
+    parser.add_argument('--graphs', nargs='+', choices=GRAPH_KINDS, default=GRAPH_KINDS, help='Kinds of generated graphs')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run (default: all)')
+    parser.add_argument('--degree', type=float, default=AVERAGE_DEGREE, help='Average degree of the generated graphs')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the graphs and the sampled computations')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed runs per benchmark (the best is kept)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes passed to the entry points')
+    parser.add_argument('--no_memory', action='store_true', help='Skip the extra tracemalloc run per benchmark')
+    parser.add_argument('--output', type=str, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', type=str, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='Allowed relative slowdown/growth over the baseline')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.graphs, args.benchmarks, seed=args.seed, repeat=args.repeat,
+                             memory=not args.no_memory, workers=args.workers, average_degree=args.degree)
+
+    regressions = []
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as error:
+            print(f"Error: could not read baseline '{args.baseline}': {error}")
+            sys.exit(2)
+        regressions = compare_results(results, baseline, args.threshold, args.benchmarks)
+        print(f"\n===== Comparison with {args.baseline} =====")
+        for result in results:
+            print(_format_row(result))
+
+    if args.output:
+        report = {'environment': _environment(), 'parameters': vars(args), 'results': results}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) (over {args.threshold:.0%}, failing or missing):")
+        for result in regressions:
+            print(f"  {_format_row(result)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import numpy as np
+import hashlib
+
+import graph_algorithms
+from graph_csr import build_csr, expand_frontier
+
+# Recently computed centralities, keyed by (adjacency digest, k, seed)
+_cache = {}
+CACHE_SIZE = 8
+
+def brandes_arrays(offsets, neighbors, sources, entries=False):
+    '''
+    Accumulates Brandes' dependencies from the given sources over a CSR adjacency.
+    Every BFS level is expanded in one vectorized step: path counts flow forward
+    along the shortest-path DAG edges of a level and dependencies flow back along
+    them in reverse level order.
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        sources (iterable): node indices to start from
+        entries (bool): also accumulate the dependency carried by every adjacency entry
+
+    Returns:
+        np.ndarray: unnormalized betweenness (summed dependencies) of every node,
+                    or (betweenness, entry dependencies) when entries=True
+    '''
+    n = len(offsets) - 1
+    betweenness = np.zeros(n, dtype=np.float64)
+    distances = np.empty(n, dtype=np.int64)
+    sigma = np.empty(n, dtype=np.float64)
+    delta = np.empty(n, dtype=np.float64)
+    carried = np.zeros(len(neighbors), dtype=np.float64) if entries else None
+
+    for source in sources:
+        distances.fill(-1)
+        sigma.fill(0.0)
+        delta.fill(0.0)
+        distances[source] = 0
+        sigma[source] = 1.0
+
+        # Forward pass: shortest-path counts, keeping the DAG edges of each level
+        levels = []
+        frontier = np.array([source], dtype=np.int64)
+        level = 0
+        while frontier.size:
+            level += 1
+            tails, heads, positions = expand_frontier(offsets, neighbors, frontier, positions=True)
+            found = np.unique(heads[distances[heads] < 0])
+            distances[found] = level
+            on_path = distances[heads] == level
+            tails, heads, positions = tails[on_path], heads[on_path], positions[on_path]
+            np.add.at(sigma, heads, sigma[tails])
+            levels.append((tails, heads, positions))
+            frontier = found
+
+        # Backward pass: dependencies, deepest level first
+        for tails, heads, positions in reversed(levels):
+            dependency = sigma[tails] / sigma[heads] * (1.0 + delta[heads])
+            np.add.at(delta, tails, dependency)
+            if entries:
+                carried[positions] += dependency
+        delta[source] = 0.0
+        betweenness += delta
+
+    return (betweenness, carried) if entries else betweenness
+
+def _brandes_task(sources):
+    '''
+    Accumulates the partial betweenness of one chunk of sources in a worker.
+    '''
+    offsets, neighbors = graph_algorithms.shared_adjacency()
+    return brandes_arrays(offsets, neighbors, sources)
+
+def parallel_brandes(offsets, neighbors, sources, workers):
+    '''
+    Runs brandes_arrays over chunks of the sources across a process pool and
+    sums the partial results. The adjacency is shared with the workers once.
+    '''
+    sources = list(sources)
+    chunks = [chunk.tolist() for chunk in np.array_split(sources, min(len(sources), workers * 4)) if chunk.size]
+    with graph_algorithms.shared_BFS_pool(offsets, neighbors, workers) as (pool, _):
+        partials = pool.map(_brandes_task, chunks)
+    return np.sum(partials, axis=0) if partials else np.zeros(len(offsets) - 1)
+
+def _digest(offsets, neighbors):
+    '''
+    Structural key for the cache: a hash of the CSR adjacency.
+    '''
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(offsets.tobytes())
+    digest.update(neighbors.tobytes())
+    return digest.hexdigest()
+
+def betweenness_centrality(graph, k=None, seed=None, workers=1, cache=True, csr=None):
+    '''
+    Normalized betweenness centrality of every node, computed exactly or estimated
+    from k sampled pivot sources. Values are scaled like nx.betweenness_centrality,
+    so both are interchangeable.
+
+    Arguments:
+        graph (nx.Graph): graph to analyze
+        k (int): number of pivot sources to sample, at least 2 (None = exact)
+        seed (int): seed for the pivot sample
+        workers (int): number of processes, each accumulating a chunk of the sources
+        cache (bool): reuse the result of an earlier call on the same structure
+        csr (tuple): optional prebuilt result of graph_csr.build_csr(graph)
+
+    Returns:
+        dict: node -> betweenness centrality
+    '''
+    nodes, _, offsets, neighbors = csr if csr is not None else build_csr(graph)
+    n = len(nodes)
+    # A pivot's own score is estimated from the other k - 1 pivots, so one pivot leaves it undefined
+    if k is not None and k < 2:
+        raise ValueError(f"k must be at least 2 sampled pivots, got {k}")
+    if k is not None and k >= n:
+        k = None
+
+    # Unseeded samples differ on every call, so only deterministic results are kept
+    key = (_digest(offsets, neighbors), k, seed)
+    cacheable = cache and (k is None or seed is not None)
+    if cacheable and key in _cache and _cache[key][0] == nodes:
+        return dict(zip(nodes, _cache[key][1].tolist()))
+
+    if k is None:
+        sources = np.arange(n)
+    else:
+        sources = np.random.default_rng(seed).choice(n, size=k, replace=False)
+
+    if workers > 1 and len(sources) > 1:
+        betweenness = parallel_brandes(offsets, neighbors, sources, workers)
+    else:
+        betweenness = brandes_arrays(offsets, neighbors, sources.tolist())
+
+    # Normalized by the number of (s, t) pairs a node can lie between; sampled pivots
+    # are scaled up to all n sources (a pivot cannot be between its own pairs)
+    if n > 2:
+        if k is None:
+            betweenness /= (n - 1) * (n - 2)
+        else:
+            scale = np.full(n, 1 / (k * (n - 2)))
+            scale[sources] = 1 / ((k - 1) * (n - 2))
+            betweenness *= scale
+
+    if cacheable:
+        _cache[key] = (nodes, betweenness)
+        while len(_cache) > CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+    return dict(zip(nodes, betweenness.tolist()))
@@ -1,9 +1,122 @@
 import networkx as nx
+import numpy as np
 import os
+from multiprocessing import Pool
 
-def partition_graph(g, num_components, output_dir=None):
+from centrality import brandes_arrays
+from graph_csr import build_csr, edge_index
+
+def _component_betweenness(task):
+    '''
+    Edge betweenness inside one component, from all of its nodes or from a sample
+    of pivots scaled up to the component size.
+
+    Arguments:
+        task (tuple): (nodes, offsets, neighbors, pivots) of the component's CSR adjacency,
+                      where pivots is None for the exact computation
+
+    Returns:
+        dict: (u, v) -> unnormalized edge betweenness
+    '''
+    nodes, offsets, neighbors, pivots = task
+    entry_edges, src, dst = edge_index(offsets, neighbors)
+    sources = range(len(nodes)) if pivots is None else pivots
+    _, carried = brandes_arrays(offsets, neighbors, sources, entries=True)
+
+    scores = np.bincount(entry_edges, weights=carried, minlength=len(src))
+    if pivots is not None and len(pivots):
+        scores *= len(nodes) / len(pivots)
+    return {(nodes[u], nodes[v]): score for u, v, score in zip(src.tolist(), dst.tolist(), scores.tolist())}
+
+def _component_task(h, component, samples, rng):
+    '''
+    Builds the betweenness task of one component of h. Nodes keep their order in h,
+    so every edge is always reported in the same orientation.
+    '''
+    nodes, _, offsets, neighbors = build_csr(h, [node for node in h if node in component])
+    pivots = None
+    if samples is not None and samples < len(nodes):
+        pivots = rng.choice(len(nodes), size=samples, replace=False).tolist()
+    return nodes, offsets, neighbors, pivots
+
+def _most_central_edge(h, scores):
+    '''
+    Returns the edge of h with the highest betweenness. Near-equal scores are
+    treated as ties and resolved by edge order, as networkx does.
+    '''
+    best = max(scores.values())
+    for u, v in h.edges():
+        score = scores[(u, v)] if (u, v) in scores else scores[(v, u)]
+        if score >= best - 1e-9 * abs(best):
+            return u, v
+
+def girvan_newman(g, num_components, samples=None, seed=None, workers=1):
+    '''
+    Girvan-Newman community detection that stops once num_components communities exist.
+    Removing an edge only changes betweenness inside the component that contained it,
+    so after every removal the edge betweenness is recomputed for that component only.
+
+    Arguments:
+        g (nx.Graph): graph to partition (not modified)
+        num_components (int): number of communities to find
+        samples (int): estimate edge betweenness from this many pivots per component (None = exact)
+        seed (int): seed for the pivot samples
+        workers (int): number of processes recomputing components in parallel
+
+    Returns:
+        tuple: communities (sets of nodes) in nx.connected_components order, as
+               produced by the same step of nx.community.girvan_newman
+    '''
+    # Structure-only copy, with edges added in the same order as networkx's own copy
+    h = nx.Graph()
+    h.add_nodes_from(g)
+    h.add_edges_from((u, v) for u, neighbors in g.adj.items() for v in neighbors if u != v)
+    if h.number_of_edges() == 0:
+        return tuple(nx.connected_components(h))
+
+    rng = np.random.default_rng(seed)
+    pool = Pool(processes=workers) if workers > 1 else None
+    try:
+        def recompute(components):
+            tasks = [_component_task(h, component, samples, rng) for component in components]
+            if pool is not None and len(tasks) > 1:
+                return pool.map(_component_betweenness, tasks)
+            return [_component_betweenness(task) for task in tasks]
+
+        scores = {}
+        for result in recompute(list(nx.connected_components(h))):
+            scores.update(result)
+
+        # Every step removes edges until the number of components grows, like networkx
+        count = nx.number_connected_components(h)
+        while h.number_of_edges():
+            u, v = _most_central_edge(h, scores)
+            h.remove_edge(u, v)
+            scores.pop((u, v), None)
+            scores.pop((v, u), None)
+
+            component = nx.node_connected_component(h, u)
+            affected = [component]
+            if v not in component:
+                affected.append(nx.node_connected_component(h, v))
+                count += 1
+            for result in recompute(affected):
+                scores.update(result)
+
+            if len(affected) > 1 and count >= num_components:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return tuple(nx.connected_components(h))
+
+def partition_graph(g, num_components, output_dir=None, samples=None, seed=None, workers=1):
     '''
     Partitions graph (using Girvan-Newman Method) into n components.
+    Edge betweenness is recomputed only for the component an edge was removed
+    from, exactly or from samples pivots per component.
     '''
 
     print(f"\n===== Community Partitioning (Girvan-Newman) =====")
@@ -12,16 +125,10 @@ def partition_graph(g, num_components, output_dir=None):
     if g.number_of_nodes() < num_components:
         print(f"Error: cannot find {num_components} components in a graph with only {g.number_of_nodes()} nodes.")
         return
-    
-    component_iter = nx.community.girvan_newman(g)
 
-    curr_comps = []
-    while len(curr_comps) < num_components:
-        try:
-            curr_comps = next(component_iter)
-        except StopIteration:
-            print("Warning: Completed algorithm before reaching desired number of components")
-            break
+    curr_comps = girvan_newman(g, num_components, samples=samples, seed=seed, workers=workers)
+    if len(curr_comps) < num_components:
+        print("Warning: Completed algorithm before reaching desired number of components")
 
     actual = len(curr_comps)
     print(f"Partitioning successful. Found {actual} communities.")
@@ -29,7 +136,7 @@ def partition_graph(g, num_components, output_dir=None):
     for i, component in enumerate(curr_comps):
         for node in component:
             g.nodes[node]['community_id'] = i
-    
+
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
         print(f"Exporting to {output_dir}")
@@ -38,4 +145,4 @@ def partition_graph(g, num_components, output_dir=None):
             filename = os.path.join(output_dir, f'component_{i}.gml')
             nx.write_gml(sub, filename)
             print(f" -> Component {i} has been exported")
-            print(f"Nodes: {sub.number_nodes()}")
\ No newline at end of file
+            print(f"Nodes: {sub.number_of_nodes()}")
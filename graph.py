@@ -1,76 +1,143 @@
 import networkx as nx
 import math
+import os
 
 # Import modular component files
 import graph_io
+import graph_generator
 import graph_algorithms
 import graph_analysis
+import graph_stream
 import argument_parser
-import visualizerBFS
-
-args = argument_parser.get_args()
-
-# Generate Graph
-if args.create_random_graph:
-    n, c = args.create_random_graph
-    n = int(n)
-    # Uses the Erdos-Renyi graph algorithm
-    p = c * math.log(n) / n if n > 1 else 0
-    graph = nx.erdos_renyi_graph(n, p)
-    mapping = {i: str(i) for i in range(n)}
-    graph = nx.relabel_nodes(graph, mapping)
-    print(f'Generated a random graph with {n} nodes and p={p:.4f}.')
-elif args.input:
-    try:
-        # If graph is read successfully, print message. Otherwise, print error message.
-        graph = graph_io.readGraph(args.input)
-        print(f"Successfully read graph from {args.input}.")
-
-    except FileNotFoundError:
-        print(f"Error: The file '{args.input}' was not found.")
-        exit(1)
-else:
-    # Gracefully handles insufficient parameters
-    print("Missing arguments (\"--input graph_file.gml\" or \"--create_random_graph n c\")\n")
-    exit(1)
-
-if args.multi_BFS:
-    # Runs BFS
-    bfs_nodes = [str(node) for node in args.multi_BFS]
-    graph_algorithms.multi_BFS(graph, bfs_nodes)
-
-if args.analyze:
-    print("\n---Graph Analysis---")
-
-    # Prints the number of connected components
-    num_components = graph_algorithms.connectedComp(graph)
-    print(f"Number of Connected Components: {num_components}")
-
-    # Prints whether or not the graph contains cycles
-    cycles = graph_algorithms.findCycles(graph)
-    if cycles:
-        print (f"The inputted graph contains cycles.")
+import profiler
+from graph_csr import build_csr
+
+def main():
+    '''
+    Main driver: generates or reads the graph and runs the requested steps.
+    '''
+    args = argument_parser.get_args()
+
+    # Times every stage when profiling (stages are no-ops with trace=None)
+    trace = None
+    if args.profile or args.cprofile:
+        args.profile = args.profile or 'profile_trace.json'
+        trace = profiler.new_trace(args.cprofile, cprofile_prefix=os.path.splitext(args.profile)[0])
+
+    # Streams an --input graph (GML or edge list) through graph_stream instead of loading it
+    if args.stream:
+        if not args.input or not (args.analyze or args.stream_failures):
+            print("Streaming needs \"--input graph_file\" and --analyze or --stream_failures k\n")
+            exit(1)
+        if not os.path.exists(args.input):
+            print(f"Error: The file '{args.input}' was not found.")
+            exit(1)
+        if args.multi_BFS or args.plot or args.output:
+            print("Note: --multi_BFS, --plot and --output need the loaded graph and are skipped when streaming")
+
+        print("\n---Streaming Graph Analysis---")
+        memory_limit = args.memory_limit << 20 if args.memory_limit else graph_stream.MEMORY_LIMIT
+        with profiler.stage(trace, 'stream'):
+            summary = graph_stream.stream_graph(args.input, failures=args.stream_failures, runs=args.stream_runs,
+                                                seed=args.seed, memory_limit=memory_limit)
+        graph_stream.print_summary(summary, args.stream_failures)
+        profiler.report(trace, args.profile)
+        exit(0)
+
+    # Generate Graph
+    if args.create_random_graph:
+        n, c = args.create_random_graph
+        n = int(n)
+        # Uses the Erdos-Renyi graph algorithm
+        p = c * math.log(n) / n if n > 1 else 0
+        with profiler.stage(trace, 'generate'):
+            graph = graph_generator.erdos_renyi_graph(n, p, seed=args.seed, compact=args.compact)
+        print(f'Generated a random graph with {n} nodes and p={p:.4f}.')
+    elif args.input:
+        try:
+            # If graph is read successfully, print message. Otherwise, print error message.
+            with profiler.stage(trace, 'load'):
+                graph = graph_io.readGraph(args.input, cache=not args.no_cache, trace=trace, compact=args.compact)
+            print(f"Successfully read graph from {args.input}.")
+
+        except FileNotFoundError:
+            print(f"Error: The file '{args.input}' was not found.")
+            exit(1)
     else:
-        print (f"The inputted graph does not contain cycles.")
-    
-    # Identifies nodes that are not connected to any other nodes
-    isolated_nodes_list = graph_algorithms.isolated_nodes(graph)
-    print(f"The graph contains the following isolated nodes: {isolated_nodes_list}.")
-
-    # Prints the density of the graph
-    density = graph_analysis.graph_density(graph)
-    print(f"Graph Density: {density:.4f}")
-    
-    # Prints the average shortest path length
-    avg_path_length = graph_analysis.avgShortestPath(graph)
-    print(f"Average Shortest Path Length: {avg_path_length}")
-
-# Plots graph
-if args.plot:
-    print("\n--- Plotting Graph ---")
-    bfs_nodes = args.multi_BFS if args.multi_BFS else []
-    visualizerBFS.plotBFStree(graph, bfs_nodes, graph_algorithms.isolated_nodes(graph))
-    
-# Saves output into a file
-if args.output:
-    graph_io.writeGraph(graph, str(args.output))
\ No newline at end of file
+        # Gracefully handles insufficient parameters
+        print("Missing arguments (\"--input graph_file.gml\" or \"--create_random_graph n c\")\n")
+        exit(1)
+
+    # The CSR adjacency is built once and shared by BFS and the BFS tree plot
+    csr = None
+    if args.multi_BFS or args.plot:
+        with profiler.stage(trace, 'build CSR'):
+            csr = build_csr(graph)
+    bfs_results = None
+
+    if args.multi_BFS:
+        # Runs BFS
+        bfs_nodes = [str(node) for node in args.multi_BFS]
+        with profiler.stage(trace, 'multi_BFS'):
+            bfs_results = graph_algorithms.multi_BFS(graph, bfs_nodes, csr=csr, workers=args.workers)
+
+    if args.analyze:
+        print("\n---Graph Analysis---")
+
+        # Components, cycles, isolated nodes, density and degrees come from one pass
+        with profiler.stage(trace, 'structural summary'):
+            summary = graph_algorithms.structural_summary(graph, csr=csr)
+        csr = summary['csr']
+
+        # Prints the number of connected components
+        print(f"Number of Connected Components: {summary['components']}")
+
+        # Prints whether or not the graph contains cycles (m > n - c)
+        if summary['cyclic']:
+            print (f"The inputted graph contains cycles.")
+        else:
+            print (f"The inputted graph does not contain cycles.")
+        
+        # Identifies nodes that are not connected to any other nodes
+        print(f"The graph contains the following isolated nodes: {summary['isolated']}.")
+
+        # Prints the density and the degree statistics of the graph
+        print(f"Graph Density: {summary['density']:.4f}")
+        print(f"Degree: min {summary['degree_min']}, max {summary['degree_max']}, mean {summary['degree_mean']:.4f}")
+        
+        # Prints the average shortest path length (largest component if disconnected)
+        component = 'all' if args.path_per_component else 'largest'
+        with profiler.stage(trace, 'average shortest path'):
+            avg_path_length = graph_analysis.avgShortestPath(graph, samples=args.path_samples, tolerance=args.path_tolerance,
+                                                             workers=args.workers, seed=args.seed, component=component,
+                                                             summary=summary)
+        if args.path_per_component:
+            for i, result in enumerate(avg_path_length):
+                print(f"Average Shortest Path Length (component {i}): {graph_analysis.format_path_length(result, graph.number_of_nodes())}")
+        else:
+            print(f"Average Shortest Path Length: {graph_analysis.format_path_length(avg_path_length, graph.number_of_nodes())}")
+
+    # Plots graph
+    if args.plot:
+        print("\n--- Plotting Graph ---")
+        # matplotlib is only imported when a plot is requested
+        import visualizerBFS
+        bfs_nodes = args.multi_BFS if args.multi_BFS else []
+        isolated = summary['isolated'] if args.analyze else graph_algorithms.isolated_nodes(graph)
+        if args.compact:
+            # Plotting goes through networkx; the converted graph keeps the node order
+            graph = graph.to_networkx()
+            csr = build_csr(graph)
+        with profiler.stage(trace, 'plot'):
+            visualizerBFS.plotBFStree(graph, bfs_nodes, isolated, bfs_results, csr)
+        
+    # Saves output into a file
+    if args.output:
+        with profiler.stage(trace, 'write'):
+            graph_io.writeGraph(graph, str(args.output))
+
+    profiler.report(trace, args.profile)
+
+# Worker processes re-import this module under spawn, so the CLI only runs as a script
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,300 @@
 import networkx as nx
+import numpy as np
+from contextlib import contextmanager
+from multiprocessing import Pool, shared_memory
+from statistics import NormalDist
 
-def multi_BFS(graph, startNodes):
+from graph_csr import CompactGraph, build_csr, expand_frontier
+
+def bfs_arrays(offsets, neighbors, source, distances=None, parents=None):
+    '''
+    Level-synchronous BFS over a CSR adjacency using frontier arrays.
+    Each level is expanded in one vectorized step, so a traversal costs O(n + m).
+    Parents match a queue-based BFS that visits neighbors in adjacency order.
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        source (int): index of the starting node
+        distances (np.ndarray): optional output buffer for distances
+        parents (np.ndarray): optional output buffer for parents
+
+    Returns:
+        tuple: (distances, parents) arrays, with -1 marking unreachable nodes
+               (and the source's parent)
+    '''
+    n = len(offsets) - 1
+    if distances is None:
+        distances = np.empty(n, dtype=np.int64)
+    if parents is None:
+        parents = np.empty(n, dtype=np.int64)
+    distances.fill(-1)
+    parents.fill(-1)
+
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        sources, targets = expand_frontier(offsets, neighbors, frontier)
+        unvisited = distances[targets] < 0
+        sources, targets = sources[unvisited], targets[unvisited]
+        if not targets.size:
+            break
+
+        # Keeps the first discovery of each node, in discovery order
+        found, first = np.unique(targets, return_index=True)
+        order = np.argsort(first, kind='stable')
+        frontier = found[order].astype(np.int64)
+        distances[frontier] = level
+        parents[frontier] = sources[first[order]]
+
+    return distances, parents
+
+# Shared arrays attached by each BFS worker process
+_shared_BFS = {}
+
+def _shared_array(shape, dtype, name=None):
+    '''
+    Creates (or attaches to, when a name is given) a shared memory block viewed as an array.
+    '''
+    dtype = np.dtype(dtype)
+    if name is None:
+        block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    else:
+        block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _attach_BFS(layout):
+    '''
+    Pool initializer: maps the shared adjacency and result buffers into this worker.
+    '''
+    for key, (name, shape, dtype) in layout.items():
+        _shared_BFS[key] = _shared_array(shape, dtype, name)
+
+def shared_adjacency():
+    '''
+    Returns the (offsets, neighbors) CSR adjacency attached to this worker by shared_BFS_pool.
+    '''
+    return _shared_BFS['offsets'][1], _shared_BFS['neighbors'][1]
+
+def _BFS_task(task):
+    '''
+    Runs one BFS in a worker, writing straight into its row of the shared result buffers.
+    '''
+    row, source = task
+    bfs_arrays(_shared_BFS['offsets'][1], _shared_BFS['neighbors'][1], source,
+               distances=_shared_BFS['distances'][1][row], parents=_shared_BFS['parents'][1][row])
+    return row
+
+@contextmanager
+def shared_BFS_pool(offsets, neighbors, workers, result_shape=None):
+    '''
+    Starts a process pool whose workers share the CSR adjacency (and optionally
+    (sources x nodes) distance/parent result buffers) through shared memory.
+    The adjacency is copied into shared memory once and never pickled per task.
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        workers (int): number of worker processes
+        result_shape (tuple): shape of the shared result buffers, if any
+
+    Yields:
+        tuple: (pool, buffers) where buffers maps 'distances'/'parents' to the shared arrays
+    '''
+    blocks = {}
+    try:
+        for key, array in (('offsets', offsets), ('neighbors', neighbors)):
+            blocks[key] = _shared_array(array.shape, array.dtype)
+            blocks[key][1][:] = array
+        if result_shape is not None:
+            for key in ('distances', 'parents'):
+                blocks[key] = _shared_array(result_shape, neighbors.dtype)
+
+        layout = {key: (block.name, array.shape, array.dtype.str) for key, (block, array) in blocks.items()}
+        with Pool(processes=workers, initializer=_attach_BFS, initargs=(layout,)) as pool:
+            yield pool, {key: array for key, (_, array) in blocks.items()}
+    finally:
+        for block, _ in blocks.values():
+            block.close()
+            block.unlink()
+
+def _distance_sum_task(source):
+    '''
+    Runs one BFS in a worker and returns only the sum of distances to the reached nodes.
+    '''
+    distances, _ = bfs_arrays(_shared_BFS['offsets'][1], _shared_BFS['neighbors'][1], source)
+    return int(distances[distances > 0].sum())
+
+def parallel_BFS(offsets, neighbors, sources, workers):
+    '''
+    Runs BFS from several sources across a process pool.
+    Every worker writes its distance/parent arrays into a shared
+    (sources x nodes) result buffer.
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        sources (list): node indices to start from
+        workers (int): number of worker processes
+
+    Returns:
+        tuple: (distances, parents) arrays of shape (len(sources), n)
+    '''
+    shape = (len(sources), len(offsets) - 1)
+    with shared_BFS_pool(offsets, neighbors, workers, shape) as (pool, buffers):
+        for _ in pool.imap_unordered(_BFS_task, enumerate(sources)):
+            pass
+        return buffers['distances'].copy(), buffers['parents'].copy()
+
+def store_BFS(graph, nodes, suffix, distances, parents):
+    '''
+    Writes BFS arrays back into the graph as distance/parent node attributes.
+    Unreachable nodes get a distance of inf and a parent of None.
+
+    Arguments:
+        graph (nx.Graph): the graph to annotate (a CompactGraph gets node columns)
+        nodes (list): node IDs in array order
+        suffix (str): attribute suffix (e.g. '_0')
+        distances (np.ndarray): BFS distances
+        parents (np.ndarray): BFS parents
+    '''
+    inf = float('inf')
+    if isinstance(graph, CompactGraph):
+        # Integer columns with inf/None as the defaults of unreached positions
+        reachable = distances >= 0
+        graph.set_node_column(f"distance{suffix}", distances.astype(np.int64), reachable, default=inf)
+        reached = parents >= 0
+        graph.set_node_column(f"parent{suffix}", graph.nodes.labels[np.where(reached, parents, 0)], reached, default=None)
+        return
+    nx.set_node_attributes(graph, {node: (d if d >= 0 else inf) for node, d in zip(nodes, distances.tolist())}, f"distance{suffix}")
+    nx.set_node_attributes(graph, {node: (nodes[p] if p >= 0 else None) for node, p in zip(nodes, parents.tolist())}, f"parent{suffix}")
+
+def multi_BFS(graph, startNodes, store=True, csr=None, workers=1):
     '''
     Performs BFS after accepting one or more starting nodes.
     Computes BFS trees from each and stores all shortest paths.
+    The graph is converted to a CSR adjacency once, so k sources cost O(k * (n + m)).
 
     Arguments:
         graph (nx.Graph): the graph being inputted to traverse
         startNodes (list): a list of starting nodes for BFS
+        store (bool): whether to write distance/parent attributes into the graph
+        csr (tuple): optional prebuilt result of graph_csr.build_csr(graph)
+        workers (int): number of processes; above 1 the sources are run in parallel
+
+    Returns:
+        dict: maps the index of each start node found in the graph to its
+              (distances, parents) arrays, indexed in graph.nodes() order
     '''
+    nodes, index, offsets, neighbors = csr if csr is not None else build_csr(graph)
+    results = {}
 
+    # Gracefully handles nodes if they cannot be found
+    found = []
     for i, startNode in enumerate(startNodes):
-
-        # Gracefully handles nodes if they cannot be found
-        if startNode not in graph:
+        if startNode not in index:
             print(f"Node '{startNode}' could not be found. Skipping node.")
             continue
+        found.append(i)
+
+    if workers > 1 and len(found) > 1:
+        distances, parents = parallel_BFS(offsets, neighbors, [index[startNodes[i]] for i in found], min(workers, len(found)))
+        for row, i in enumerate(found):
+            results[i] = (distances[row], parents[row])
+    else:
+        for i in found:
+            results[i] = bfs_arrays(offsets, neighbors, index[startNodes[i]])
 
-        # Dictionaries to store distances and parents for BFS
-        distances = {node: float('inf') for node in graph.nodes()}
-        parents = {node: None for node in graph.nodes()} 
-
-        distances[startNode] = 0
-        queue = [(startNode, 0)]
-
-        # BFS Algorithm
-        while queue:
-            currentNode, currentDistance = queue.pop(0)
-            for neighbor in graph.neighbors(currentNode):
-                # Checks if neighbor has been visited
-                if distances[neighbor] == float('inf'):
-                    # Helps calculate the shortest path distance
-                    distances[neighbor] = currentDistance + 1
-                    parents[neighbor] = currentNode
-                    queue.append((neighbor, currentDistance + 1))
-        
-        # Stores nodes
+    # Suffixes follow the position in startNodes, including skipped nodes
+    for i in found:
         suffix = f"_{i}"
-        for node in graph.nodes():
-            graph.nodes[node][f"distance{suffix}"] = distances[node]
-            graph.nodes[node][f"parent{suffix}"] = parents[node]
-        
-        print(f"BFS from node '{startNode}' was successful. Path attributes were stored with suffix '{suffix}'.")
+        if store:
+            store_BFS(graph, nodes, suffix, *results[i])
+            print(f"BFS from node '{startNodes[i]}' was successful. Path attributes were stored with suffix '{suffix}'.")
+        else:
+            print(f"BFS from node '{startNodes[i]}' was successful.")
+
+    return results
+
+def component_labels(n, src, dst):
+    '''
+    Array-based union-find: labels every node with the smallest node index of its
+    connected component. Roots are hooked onto the smaller root over all edges at
+    once, then flattened by pointer jumping, until no edge joins two different roots.
+
+    Arguments:
+        n (int): number of nodes
+        src (np.ndarray): edge source indices
+        dst (np.ndarray): edge target indices
+
+    Returns:
+        np.ndarray: component label (smallest member index) of every node
+    '''
+    parent = np.arange(n, dtype=np.int64)
+    while True:
+        root_u, root_v = parent[src], parent[dst]
+        joining = root_u != root_v
+        if not joining.any():
+            return parent
+        src, dst = src[joining], dst[joining]
+        np.minimum.at(parent, np.maximum(root_u[joining], root_v[joining]), np.minimum(root_u[joining], root_v[joining]))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+def csr_components(offsets, neighbors):
+    '''
+    Connected component labels of a CSR adjacency (see component_labels).
+    '''
+    n = len(offsets) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    return component_labels(n, rows, neighbors.astype(np.int64))
+
+def structural_summary(graph, csr=None, store=True):
+    '''
+    Fused structural summary: connected components, isolated nodes, cycle presence,
+    density and degree statistics from one union-find pass over the CSR adjacency.
+    An undirected graph has a cycle exactly when it has more edges than a spanning
+    forest, m > n - c (a self-loop counts as a cycle, as in nx.is_forest).
+
+    Arguments:
+        graph (nx.Graph): graph to analyze
+        csr (tuple): optional prebuilt result of graph_csr.build_csr(graph)
+        store (bool): write the component_id node attributes (in one bulk assignment)
+
+    Returns:
+        dict: 'nodes', 'edges', 'components', 'component_sizes' (largest first),
+              'cyclic', 'isolated' (node IDs), 'self_loops', 'density', 'degree_min',
+              'degree_max', 'degree_mean', plus the CSR ('csr') and the component
+              label of every node ('labels', see component_labels) for later passes
+    '''
+    nodes, index, offsets, neighbors = csr if csr is not None else build_csr(graph)
+    n = len(nodes)
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    labels = component_labels(n, rows, neighbors.astype(np.int64))
+
+    # Components are numbered by their first node, like nx.connected_components
+    roots, component_ids, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    if store and isinstance(graph, CompactGraph):
+        graph.set_node_column('component_id', component_ids)
+    elif store:
+        nx.set_node_attributes(graph, dict(zip(nodes, component_ids.tolist())), 'component_id')
+
+    # A self-loop is stored once in the CSR but counts twice towards the degree
+    loops = np.bincount(rows[rows == neighbors], minlength=n)
+    degrees = np.diff(offsets) + loops
+    m = int(degrees.sum()) // 2
+    c = len(roots)
+    return {'nodes': n, 'edges': m, 'components': c, 'component_sizes': np.sort(sizes)[::-1],
+            'cyclic': m > n - c, 'isolated': [nodes[i] for i in np.flatnonzero(degrees == 0).tolist()],
+            'self_loops': int(loops.sum()), 'density': m / (n * (n - 1) / 2) if n > 1 else 0.0,
+            'degree_min': int(degrees.min()) if n else 0, 'degree_max': int(degrees.max()) if n else 0,
+            'degree_mean': 2 * m / n if n else 0.0,
+            'csr': (nodes, index, offsets, neighbors), 'labels': labels}
 
 def connectedComp(graph):
     '''
@@ -53,12 +306,7 @@ def connectedComp(graph):
     Returns:
         int: # of connected components
     '''
-    # Identifies connected components
-    components = list(nx.connected_components(graph))
-    for i, component in enumerate(components):
-        for node in component:
-            graph.nodes[node]['component_id'] = i
-    return len(components)
+    return structural_summary(graph)['components']
 
 def findCycles(graph):
     '''
@@ -70,7 +318,7 @@ def findCycles(graph):
     Returns:
         bool: True if cycles exist, False otherwise.
     '''
-    return not nx.is_forest(graph) # Evaluates to True if cycle exist
+    return structural_summary(graph, store=False)['cyclic'] # m > n - c
 
 def isolated_nodes(graph):
     '''
@@ -82,4 +330,108 @@ def isolated_nodes(graph):
     Returns:
         list: list of isolated node IDs
     '''
-    return list(nx.isolates(graph)) # Lists the number of isolated nodes
\ No newline at end of file
+    if isinstance(graph, CompactGraph):
+        return structural_summary(graph, store=False)['isolated']
+    return list(nx.isolates(graph)) # Lists the number of isolated nodes
+
+def _source_means(offsets, neighbors, sources, size, pool=None):
+    '''
+    Average distance from each source to the other nodes of its component.
+    '''
+    if pool is not None:
+        sums = pool.map(_distance_sum_task, sources.tolist())
+    else:
+        sums = []
+        for source in sources.tolist():
+            distances, _ = bfs_arrays(offsets, neighbors, source)
+            sums.append(int(distances[distances > 0].sum()))
+    return np.array(sums, dtype=np.float64) / (size - 1)
+
+def _component_path_length(offsets, neighbors, members, samples, tolerance, z, rng, pool, workers):
+    '''
+    Exact or sampled average shortest path length inside one component.
+    '''
+    size = len(members)
+    if size < 2:
+        return {'value': 0.0, 'error': 0.0, 'sources': size, 'nodes': size, 'exact': True}
+    if samples is None and tolerance is None:
+        means = _source_means(offsets, neighbors, members, size, pool)
+        return {'value': float(means.mean()), 'error': 0.0, 'sources': size, 'nodes': size, 'exact': True}
+
+    # Sources are drawn without replacement, in batches when a target error is given
+    order = rng.permutation(members)
+    target = min(samples, size) if samples is not None else size
+    batch = target if tolerance is None else max(32, 8 * workers)
+    means = np.empty(0)
+    while len(means) < target:
+        chosen = order[len(means):min(len(means) + batch, target)]
+        means = np.concatenate([means, _source_means(offsets, neighbors, chosen, size, pool)])
+        error = _half_width(means, size, z)
+        if tolerance is not None and len(means) >= 30 and error <= tolerance:
+            break
+
+    return {'value': float(means.mean()), 'error': error, 'sources': len(means),
+            'nodes': size, 'exact': len(means) == size}
+
+def _half_width(means, size, z):
+    '''
+    Confidence-interval half width of the mean of sampled per-source averages,
+    with the finite population correction for sampling without replacement.
+    '''
+    k = len(means)
+    if k >= size or k < 2:
+        return 0.0
+    return float(z * means.std(ddof=1) / np.sqrt(k) * np.sqrt((size - k) / (size - 1)))
+
+def average_path_length(graph, samples=None, tolerance=None, confidence=0.95, workers=1,
+                        seed=None, component='largest', csr=None, labels=None):
+    '''
+    Average shortest path length, computed exactly or estimated from BFS runs
+    from a random sample of source nodes. Each sampled source contributes its
+    average distance to the rest of its component; the estimate is the mean of
+    those averages and comes with a confidence-interval half width.
+
+    Arguments:
+        graph (nx.Graph): graph to analyze
+        samples (int): number of BFS sources to sample, at least 2 (None = exact unless tolerance is set)
+        tolerance (float): keep sampling until the half width drops below this value
+        confidence (float): confidence level of the reported error bound
+        workers (int): number of processes running the BFS passes
+        seed (int): seed for the source sample
+        component (str): 'largest' for the largest component, 'all' for every component
+        csr (tuple): optional prebuilt result of graph_csr.build_csr(graph)
+        labels (np.ndarray): optional component labels of the CSR nodes (see structural_summary)
+
+    Returns:
+        dict: {'value', 'error', 'sources', 'nodes', 'exact'} for the largest component,
+              or a list of such dicts (largest first) when component='all'
+    '''
+    # The error bound comes from the spread of the sampled averages, which needs two of them
+    if samples is not None and samples < 2:
+        raise ValueError(f"samples must be at least 2 BFS sources, got {samples}")
+    nodes, index, offsets, neighbors = csr if csr is not None else build_csr(graph)
+    labels = labels if labels is not None else csr_components(offsets, neighbors)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rng = np.random.default_rng(seed)
+
+    # Components ordered from largest to smallest
+    roots, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    ranked = np.argsort(-sizes, kind='stable')
+    if component == 'largest':
+        ranked = ranked[:1]
+    if not len(ranked):
+        empty = {'value': 0.0, 'error': 0.0, 'sources': 0, 'nodes': 0, 'exact': True}
+        return empty if component == 'largest' else []
+    grouped = np.argsort(inverse, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+
+    def run(pool):
+        return [_component_path_length(offsets, neighbors, grouped[starts[c]:starts[c + 1]],
+                                       samples, tolerance, z, rng, pool, workers) for c in ranked]
+
+    if workers > 1:
+        with shared_BFS_pool(offsets, neighbors, workers) as (pool, _):
+            results = run(pool)
+    else:
+        results = run(None)
+    return results[0] if component == 'largest' else results
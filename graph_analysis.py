@@ -1,12 +1,256 @@
 # Import modules and appropriate functions
 import argparse
+import contextlib
+import csv
+import glob
+import io
+import json
 import networkx as nx
 import os
+import time
+from multiprocessing import Pool
 
+import graph_io
+import graph_algorithms
+import profiler
 from detect_community import partition_graph
 from metrics import metrics_computation, verify_homophily, verify_balanced_graph
 from simulation import failure_sim, robustness_check
-from visualization import plot_graph, temporal_sim
+
+def graph_density(graph):
+    '''
+    Calculates the density of the graph: the number of edges divided by the
+    maximum possible number of edges, n(n-1)/2.
+
+    Arguments:
+        graph (nx.Graph): graph to analyze
+
+    Returns:
+        float: density between 0.0 (no edges) and 1.0 (complete graph)
+    '''
+    n = graph.number_of_nodes()
+    if n < 2:
+        return 0.0
+    return graph.number_of_edges() / (n * (n - 1) / 2)
+
+def avgShortestPath(graph, samples=None, tolerance=None, workers=1, seed=None, component='largest', summary=None):
+    '''
+    Calculates the average shortest path length. Disconnected graphs are measured
+    on their largest component (or on every component with component='all').
+    With samples/tolerance the value is estimated from BFS runs from a random
+    sample of sources (see graph_algorithms.average_path_length).
+
+    Arguments:
+        graph (nx.Graph): graph to analyze
+        samples (int): number of BFS sources to sample
+        tolerance (float): target half width of the 95% confidence interval
+        workers (int): number of processes running the BFS passes
+        seed (int): seed for the source sample
+        component (str): 'largest' or 'all'
+        summary (dict): optional graph_algorithms.structural_summary result whose CSR
+                        and component labels are reused
+
+    Returns:
+        dict: {'value', 'error', 'sources', 'nodes', 'exact'} (a list of them for component='all')
+    '''
+    csr, labels = (summary['csr'], summary['labels']) if summary is not None else (None, None)
+    return graph_algorithms.average_path_length(graph, samples=samples, tolerance=tolerance, workers=workers,
+                                                seed=seed, component=component, csr=csr, labels=labels)
+
+def format_path_length(result, total_nodes):
+    '''
+    Formats an avgShortestPath result for terminal output.
+    '''
+    text = f"{result['value']:.4f}"
+    if not result['exact']:
+        text += f" ± {result['error']:.4f} (95% CI, {result['sources']} sampled sources)"
+    if result['nodes'] < total_nodes:
+        text += f" [component of {result['nodes']} nodes]"
+    return text
+
+def output_path(output, graph_path):
+    '''
+    Path the analyzed graph is written to: --output with _{name} of the input file
+    inserted before .gml (e.g. out.gml and graphs/a.gml give out_a.gml).
+    '''
+    name = os.path.basename(graph_path).replace('.gml', '')
+    return output.replace('.gml', f'_{name}.gml')
+
+def analyze_graph(g, args, trace=None, workers=None, split_output_dir=None):
+    '''
+    Runs the analysis steps requested in args on a loaded graph (everything except
+    plotting and writing).
+
+    Arguments:
+        g (nx.Graph): graph to analyze
+        args (argparse.Namespace): parsed command line
+        trace (dict): optional profiler trace
+        workers (int): number of worker processes (default: args.workers)
+        split_output_dir (str): directory for the exported communities (default: args.split_output_dir)
+    '''
+    workers = args.workers if workers is None else workers
+    split_output_dir = args.split_output_dir if split_output_dir is None else split_output_dir
+
+    if args.simulate_failures:
+        with profiler.stage(trace, 'failure simulation'):
+            failure_sim(g, args.simulate_failures, path_samples=args.path_samples, workers=workers,
+                        seed=args.seed, betweenness_samples=args.betweenness_samples)
+    
+    if args.robustness_check is not None and args.components:
+        with profiler.stage(trace, 'robustness check'):
+            robustness_check(g, args.robustness_check, args.components, num_sims=args.robustness_runs, workers=workers,
+                             seed=args.seed)
+    
+    if args.components:
+        with profiler.stage(trace, 'partition'):
+            partition_graph(g, args.components, split_output_dir, samples=args.betweenness_samples,
+                            seed=args.seed, workers=workers)
+    
+    if args.verify_homophily:
+        with profiler.stage(trace, 'homophily'):
+            verify_homophily(g, test=args.homophily_test, seed=args.seed)
+
+    if args.verify_balanced_graph:
+        with profiler.stage(trace, 'balance'):
+            verify_balanced_graph(g, frustration_rounds=args.frustration_rounds)
+    
+    if args.plot in ['C', 'N']:
+        with profiler.stage(trace, 'metrics'):
+            metrics_computation(g, workers=workers)
+
+# Extensions of the graph files picked up from a directory
+GRAPH_EXTENSIONS = ('.gml', '.gml.gz', '.gml.bz2')
+
+# Columns of a batch report (the JSON report also keeps each file's printed output)
+REPORT_FIELDS = ['file', 'status', 'seconds', 'nodes', 'edges', 'components', 'largest_component', 'isolated',
+                 'self_loops', 'cyclic', 'density', 'degree_mean', 'degree_max', 'output', 'error']
+
+def expand_graph_files(patterns):
+    '''
+    Expands the graph_file arguments: a directory stands for the .gml files in it and
+    a glob pattern for its matches (sorted); other paths are kept as given, so missing
+    files are reported later. Duplicates are dropped.
+
+    Returns:
+        list: graph file paths
+    '''
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files += sorted(os.path.join(pattern, name) for name in os.listdir(pattern)
+                            if name.endswith(GRAPH_EXTENSIONS) and os.path.isfile(os.path.join(pattern, name)))
+        elif glob.has_magic(pattern):
+            matches = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+            if not matches:
+                print(f"Warning: No files match '{pattern}'")
+            files += matches
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+def _batch_task(task):
+    '''
+    Loads and analyzes one graph file of a batch in a worker process. Everything the
+    steps print is captured, and any error only fails this file.
+
+    Returns:
+        dict: report row of the file
+    '''
+    graph_path, args = task
+    row = {'file': graph_path, 'status': 'ok'}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            if not os.path.exists(graph_path):
+                raise FileNotFoundError(f"File '{graph_path}' does not exist")
+            g = graph_io.readGraph(graph_path, cache=not args.no_cache, signed=True)
+            summary = graph_algorithms.structural_summary(g, store=False)
+            row.update({key: summary[key] for key in ('nodes', 'edges', 'components', 'self_loops', 'cyclic')})
+            row.update({'largest_component': int(summary['component_sizes'][0]) if summary['nodes'] else 0,
+                        'isolated': len(summary['isolated']), 'density': float(summary['density']),
+                        'degree_mean': float(summary['degree_mean']), 'degree_max': int(summary['degree_max'])})
+
+            # Pool workers cannot start pools of their own, and communities of each graph get their own directory
+            name = os.path.basename(graph_path).replace('.gml', '')
+            split_output_dir = os.path.join(args.split_output_dir, name) if args.split_output_dir else None
+            analyze_graph(g, args, workers=1, split_output_dir=split_output_dir)
+
+            if args.output:
+                row['output'] = output_path(args.output, graph_path)
+                os.makedirs(os.path.dirname(row['output']) or '.', exist_ok=True)
+                nx.write_gml(g, row['output'])
+        except Exception as e:
+            row['status'] = 'error'
+            row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = round(time.perf_counter() - start, 4)
+    row['log'] = log.getvalue().splitlines()
+    return row
+
+@contextlib.contextmanager
+def report_writer(path):
+    '''
+    Opens a batch report and yields a function that appends one row to it. Rows are
+    written (and flushed) as they arrive: a .csv path gets one line per file with
+    REPORT_FIELDS as columns, any other path a JSON list of rows.
+    '''
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            def write(row):
+                writer.writerow(row)
+                f.flush()
+            yield write
+        else:
+            rows = 0
+            f.write('[')
+            def write(row):
+                nonlocal rows
+                f.write((',\n' if rows else '\n') + json.dumps(row))
+                f.flush()
+                rows += 1
+            yield write
+            f.write('\n]\n')
+
+def run_batch(files, args, trace=None):
+    '''
+    Analyzes many graph files in a pool of args.jobs processes, largest files first so
+    the longest jobs do not start last. Every finished file is printed as a progress
+    line and appended to the report (args.report).
+
+    Returns:
+        list: report rows in completion order
+    '''
+    files = sorted(files, key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0, reverse=True)
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(files)))
+    if args.plot or args.serve is not None or args.socket:
+        print("Note: Plots and the query server are skipped when analyzing several files")
+    print(f"Analyzing {len(files)} graph files with {jobs} parallel jobs")
+
+    rows = []
+    tasks = [(path, args) for path in files]
+    with profiler.stage(trace, 'batch'), report_writer(args.report) as write:
+        with Pool(processes=jobs) as pool:
+            for row in pool.imap_unordered(_batch_task, tasks):
+                rows.append(row)
+                write(row)
+                detail = f"{row['nodes']} nodes, {row['edges']} edges" if row['status'] == 'ok' else row['error']
+                print(f"[{len(rows)}/{len(files)}] {row['file']}: {row['status']} ({row['seconds']:.2f}s) - {detail}")
+
+    failed = sum(row['status'] != 'ok' for row in rows)
+    print(f"Batch finished: {len(rows) - failed} analyzed, {failed} failed. Report saved to {args.report}")
+    return rows
+
+def at_least(minimum):
+    '''
+    Returns an argparse type accepting integers no smaller than minimum.
+    '''
+    def parse(value):
+        value = int(value)
+        if value < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {value}")
+        return value
+    return parse
 
 def main():
     '''
@@ -15,41 +259,75 @@ def main():
 
     # Reading the .gml file
     parser = argparse.ArgumentParser(description='Analyze structural properties, explore patterns, and simulate manipulations.')
-    parser.add_argument('graph_file', type=str, help='Paths to one .gml graph file')
+    parser.add_argument('graph_file', type=str, nargs='+', help='Paths to .gml graph files, directories of them or glob patterns (quoted)')
+    parser.add_argument('--no_cache', action='store_true', help='Always parse the .gml file instead of using its binary snapshot')
 
     # Community Identifier and Robustness
     parser.add_argument('--components', type=int, help='Partition graph into n components using Girvan-Newman')
     parser.add_argument('--robustness_check', type=int, nargs='?', const=5, help='Perform robustness check with a specified number of random edge failures')
+    parser.add_argument('--robustness_runs', type=int, default=10, help='Number of simulation runs for the robustness check')
     parser.add_argument('--split_output_dir', type=str, help='Directory to separate the components in their own separate .gml file')
 
     # Visualization
     parser.add_argument('--plot', choices=['C', 'N', 'P', 'T'], help='Controls output visualization')
+    parser.add_argument('--plot_output', type=str, help='Write the C/N/P plot to this .png/.svg file instead of showing it')
 
     # Verification
     parser.add_argument('--verify_homophily', action='store_true', help='Perform statistical t-test for homophily check')
+    parser.add_argument('--homophily_test', choices=['welch', 'permutation'], default='welch', help='Significance test used by the homophily check')
     parser.add_argument('--verify_balanced_graph', action='store_true', help='Check if graph is balanced')
+    parser.add_argument('--frustration_rounds', type=int, default=0, help='Estimate the frustration index of an unbalanced graph with up to this many local search rounds')
 
     # Simulations
     parser.add_argument('--simulate_failures', type=int, help='Randomly remove k edges and analyze how it affects the network')
+    parser.add_argument('--path_samples', type=at_least(2), help='Estimate average shortest paths from this many sampled BFS sources')
+    parser.add_argument('--betweenness_samples', type=at_least(2), help='Estimate (edge) betweenness centrality from this many sampled pivot nodes')
+    parser.add_argument('--seed', type=int, help='Seed for sampled estimates, so repeated simulations can reuse results')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for parallel computations')
 
     # Temporal Analysis
     parser.add_argument('--temporal_simulation', type=str, help='Load a time series of edge changes and animate graph evolution')
+    parser.add_argument('--temporal_output', type=str, help='Replay headlessly, writing PNG frames to this directory (or a .gif/.mp4 animation)')
+    parser.add_argument('--frame_interval', type=int, default=1, help='Number of events applied between rendered frames in a headless replay')
 
     # Outputs
     parser.add_argument('--output', type=str, help='Save graph with all new updates')
 
+    # Batch analysis (several graph files)
+    parser.add_argument('--jobs', type=int, help='Number of graph files analyzed in parallel (default: number of CPUs)')
+    parser.add_argument('--report', type=str, default='batch_report.json', help='Combined report of a batch run, as JSON or .csv (default: batch_report.json)')
+
+    # Query server
+    parser.add_argument('--serve', type=int, nargs='?', const=8765, help='After the other steps, keep the graph in memory and answer queries over HTTP on 127.0.0.1 (default port: 8765)')
+    parser.add_argument('--socket', type=str, help='With --serve, listen on this Unix socket instead of a TCP port')
+
+    # Profiling
+    parser.add_argument('--profile', type=str, nargs='?', const='profile_trace.json', help='Time every stage (wall/CPU time, tracemalloc peak), print a summary table and write a JSON trace (default: profile_trace.json)')
+    parser.add_argument('--cprofile', type=str, nargs='+', default=[], help="Also dump a cProfile of these stages (e.g. load partition, or all) next to the trace")
+
     args = parser.parse_args()
+    trace = None
+    if args.profile or args.cprofile:
+        args.profile = args.profile or 'profile_trace.json'
+        trace = profiler.new_trace(args.cprofile, cprofile_prefix=os.path.splitext(args.profile)[0])
+
+    # Several graph files are analyzed as a batch
+    graph_files = expand_graph_files(args.graph_file)
+    if not graph_files:
+        print("Error: No graph files to analyze")
+        return
+    if len(graph_files) > 1:
+        run_batch(graph_files, args, trace)
+        profiler.report(trace, args.profile)
+        return
 
     # Load the graph file
+    graph_path = graph_files[0]
     print(f"\n======================================")
-    print(f"Starting analysis for: {args.graph_file}")
+    print(f"Starting analysis for: {graph_path}")
     print(f"======================================")
 
     try:
-        graph_path = args.graph_file
-        if isinstance(args.graph_file, list):
-            graph_path = args.graph_file[0]
-    
         print(f"Attempting to load: {graph_path}")
     
         # Check if file exists
@@ -57,23 +335,9 @@ def main():
             print(f"Error: File '{graph_path}' does not exist")
             return
     
-        # Load the graph
-        g = nx.read_gml(graph_path)
-    
-        # Convert string signs to integers
-        for u, v, data in g.edges(data=True):
-            if 'sign' in data:
-                if data['sign'] == '+':
-                    data['sign'] = 1
-                elif data['sign'] == '-':
-                    data['sign'] = -1
-                elif isinstance(data['sign'], str):
-                    # Handle other string representations
-                    try:
-                        data['sign'] = int(data['sign'])
-                    except ValueError:
-                        print(f"Warning: Could not convert sign value '{data['sign']}' to integer")
-                        data['sign'] = 1  # Default to positive
+        # Load the graph (from its binary snapshot when valid) and convert string signs to integers
+        with profiler.stage(trace, 'load'):
+            g = graph_io.readGraph(graph_path, cache=not args.no_cache, signed=True, trace=trace)
     
         print(f"Graph loaded successfully: {g.number_of_nodes()} nodes, {g.number_of_edges()} edges")
     
@@ -85,34 +349,29 @@ def main():
         return
     
     # Analysis
-    if args.simulate_failures:
-        failure_sim(g, args.simulate_failures)
-    
-    if args.robustness_check is not None and args.components:
-        robustness_check(g, args.robustness_check, args.components)
-    
-    if args.components:
-        partition_graph(g, args.components, args.split_output_dir)
-    
-    if args.verify_homophily:
-        verify_homophily(g)
+    analyze_graph(g, args, trace)
 
-    if args.verify_balanced_graph:
-        verify_balanced_graph(g)
-    
-    if args.plot in ['C', 'N']:
-        metrics_computation(g)
-    
+    # matplotlib is only imported when a plot is requested
     if args.plot == 'T' and args.temporal_simulation:
-        temporal_sim(g, args.temporal_simulation)
+        from visualization import temporal_sim
+        with profiler.stage(trace, 'temporal simulation'):
+            temporal_sim(g, args.temporal_simulation, output=args.temporal_output, frame_interval=args.frame_interval)
     elif args.plot:
-        plot_graph(g, args.plot)
+        from visualization import plot_graph
+        with profiler.stage(trace, 'plot'):
+            plot_graph(g, args.plot, output=args.plot_output)
 
     if args.output:
-        name = os.path.basename(args.graph_file).replace('.gml','')
-        path_output = args.output.replace('.gml', f'_{name}.gml')
-        nx.write_gml(g, path_output)
+        path_output = output_path(args.output, graph_path)
+        with profiler.stage(trace, 'write'):
+            nx.write_gml(g, path_output)
         print(f"Final graph saved to {path_output}")
 
+    profiler.report(trace, args.profile)
+
+    if args.serve is not None or args.socket:
+        import server
+        server.serve(graph_path, args.serve or server.PORT, args.socket, workers=args.workers, graph=g)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
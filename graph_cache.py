@@ -0,0 +1,271 @@
+import networkx as nx
+import numpy as np
+import contextlib
+import hashlib
+import json
+import os
+
+from graph_csr import CompactGraph, _key_order, build_csr, encode_column, insertion_order
+
+# Bumped whenever the snapshot layout changes, so old snapshots are ignored
+SNAPSHOT_VERSION = 2
+
+def snapshot_path(file_path, variant=''):
+    '''
+    Returns the path of the snapshot cached next to a graph file
+    (e.g. data/graph.gml -> data/.graph.gml.snapshot.npz).
+    '''
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}{variant}.snapshot.npz")
+
+def _file_hash(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _encode_attrs(records, prefix, arrays):
+    '''
+    Stores every attribute of the given records as an (indices, values) column pair,
+    and the records' key order when it differs from the column order (see _key_order).
+
+    Returns:
+        bool: False if some attribute cannot be stored as a typed column
+    '''
+    names = {}
+    for data in records:
+        names.update(dict.fromkeys(data))
+
+    for name in names:
+        present = [(i, data[name]) for i, data in enumerate(records) if name in data]
+        column = encode_column([value for _, value in present])
+        if column is None:
+            return False
+        arrays[f"{prefix}:{name}:index"] = np.array([i for i, _ in present], dtype=np.int64)
+        arrays[f"{prefix}:{name}:values"] = column
+
+    keys = _key_order(records, names)
+    if keys is not None:
+        signatures, codes = keys
+        try:
+            arrays[f"{prefix}_keys"] = np.array(json.dumps(signatures))
+        except TypeError:
+            return False
+        arrays[f"{prefix}_key_codes"] = codes
+    return True
+
+def _stored_keys(data, kind):
+    '''
+    Key order (signatures, codes) stored for a kind of record, or None.
+    '''
+    if f"{kind}_keys" not in data.files:
+        return None
+    signatures = [tuple(signature) for signature in json.loads(str(data[f"{kind}_keys"]))]
+    return signatures, data[f"{kind}_key_codes"]
+
+def save_snapshot(graph, file_path, variant=''):
+    '''
+    Saves a binary snapshot of a graph read from file_path: the node-ID table,
+    CSR adjacency, edge list and typed attribute columns, keyed by the source
+    file's size, mtime and content hash.
+
+    Arguments:
+        graph (nx.Graph): the graph parsed from file_path
+        file_path (str): the source .gml file
+        variant (str): distinguishes snapshots of differently processed reads
+
+    Returns:
+        bool: True if a snapshot was written
+    '''
+    if type(graph) is not nx.Graph:
+        return False
+
+    nodes, index, offsets, neighbors = build_csr(graph)
+    arrays = {}
+    labels = encode_column(nodes) if nodes else np.array([], dtype=str)
+    if labels is None or labels.dtype == bool:
+        return False
+
+    edges = list(graph.edges(data=True))
+    src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    order = insertion_order(offsets, neighbors, src, dst)
+    edges = [edges[i] for i in order.tolist()]
+
+    if not _encode_attrs([data for _, data in graph.nodes(data=True)], 'node', arrays):
+        return False
+    if not _encode_attrs([data for _, _, data in edges], 'edge', arrays):
+        return False
+    try:
+        graph_attrs = json.dumps(graph.graph)
+    except TypeError:
+        return False
+
+    stat = os.stat(file_path)
+    arrays.update(
+        version=np.array(SNAPSHOT_VERSION),
+        source=np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64),
+        source_hash=np.array(_file_hash(file_path)),
+        labels=labels,
+        offsets=offsets,
+        neighbors=neighbors,
+        src=src[order],
+        dst=dst[order],
+        graph_attrs=np.array(graph_attrs),
+    )
+
+    return _write_snapshot(snapshot_path(file_path, variant), arrays)
+
+def _write_snapshot(path, arrays):
+    '''
+    Writes the snapshot arrays to path.
+
+    Returns:
+        bool: True if the snapshot was written
+    '''
+    # Written to a temporary file first so readers never see a partial snapshot
+    try:
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(path + '.tmp', path)
+    except OSError:
+        return False
+    return True
+
+def _check_source(data, file_path):
+    '''
+    Checks an opened snapshot against its source file. A snapshot is valid when
+    the source's size and mtime match, or, if only the mtime changed, when its
+    content hash matches.
+
+    Returns:
+        tuple: (valid, arrays), where arrays holds the snapshot with the new mtime
+               stored if it only passed by its hash, and is None otherwise
+    '''
+    if int(data['version']) != SNAPSHOT_VERSION:
+        return False, None
+    stat = os.stat(file_path)
+    size, mtime = data['source'].tolist()
+    if size != stat.st_size:
+        return False, None
+    if mtime == stat.st_mtime_ns:
+        return True, None
+    if str(data['source_hash']) != _file_hash(file_path):
+        return False, None
+
+    arrays = {key: data[key] for key in data.files}
+    arrays['source'] = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    return True, arrays
+
+@contextlib.contextmanager
+def _open_snapshot(file_path, variant):
+    '''
+    Opens the snapshot cached for file_path, yielding its arrays if it exists and
+    is still valid and None otherwise. A snapshot that only matched by its content
+    hash is rewritten with the new mtime, so later loads skip the hash.
+    '''
+    path = snapshot_path(file_path, variant)
+    if not os.path.exists(path):
+        yield None
+        return
+
+    with np.load(path, allow_pickle=False) as data:
+        valid, refreshed = _check_source(data, file_path)
+        yield data if valid else None
+    # Rewritten only once the archive is closed
+    if refreshed is not None:
+        _write_snapshot(path, refreshed)
+
+def _attr_columns(data):
+    '''
+    Yields (kind, name, indices, values) for every attribute column of a snapshot.
+    '''
+    for key in data.files:
+        kind, _, name = key.partition(':')
+        if not name.endswith(':index'):
+            continue
+        name = name[:-len(':index')]
+        yield kind, name, data[key], data[f"{kind}:{name}:values"]
+
+def load_snapshot(file_path, variant=''):
+    '''
+    Loads the snapshot cached for file_path if it is still valid.
+
+    Returns:
+        nx.Graph: the cached graph, or None if there is no valid snapshot
+    '''
+    try:
+        with _open_snapshot(file_path, variant) as data:
+            if data is None:
+                return None
+
+            nodes = data['labels'].tolist()
+            src, dst = data['src'].tolist(), data['dst'].tolist()
+            records = {'node': [{} for _ in nodes], 'edge': [{} for _ in src]}
+
+            # Attribute columns are stored as (indices, values) pairs
+            for kind, name, indices, values in _attr_columns(data):
+                target = records[kind]
+                for i, value in zip(indices.tolist(), values.tolist()):
+                    target[i][name] = value
+
+            # Records get their attributes back in the order they were read in
+            for kind, target in records.items():
+                keys = _stored_keys(data, kind)
+                if keys is not None:
+                    signatures, codes = keys
+                    records[kind] = [{key: attrs[key] for key in signatures[code]}
+                                     for attrs, code in zip(target, codes.tolist())]
+
+            g = nx.Graph()
+            g.add_nodes_from(zip(nodes, records['node']))
+            g.add_edges_from((nodes[u], nodes[v], attrs) for u, v, attrs in zip(src, dst, records['edge']))
+            g.graph.update(json.loads(str(data['graph_attrs'])))
+            return g
+    except (OSError, KeyError, ValueError):
+        return None
+
+def load_compact(file_path, variant=''):
+    '''
+    Loads the snapshot cached for file_path as a CompactGraph, straight from its
+    arrays and without building an nx.Graph.
+
+    Returns:
+        CompactGraph: the cached graph, or None if there is no valid snapshot
+    '''
+    try:
+        with _open_snapshot(file_path, variant) as data:
+            if data is None:
+                return None
+
+            labels, offsets, neighbors = data['labels'], data['offsets'], data['neighbors']
+            g = CompactGraph(labels, offsets, neighbors, graph=json.loads(str(data['graph_attrs'])))
+
+            # Snapshot edges are in insertion order; edge columns follow the edge_index numbering
+            n = len(labels)
+            keys = g.src.astype(np.int64) * n + g.dst
+            src, dst = data['src'], data['dst']
+            order = np.argsort(keys)
+            edge_ids = order[np.searchsorted(keys, np.minimum(src, dst) * n + np.maximum(src, dst), sorter=order)]
+
+            for kind, name, indices, values in _attr_columns(data):
+                size, ids = (n, indices) if kind == 'node' else (len(keys), edge_ids[indices])
+                full = np.zeros(size, dtype=values.dtype)
+                full[ids] = values
+                present = None
+                if len(indices) != size:
+                    present = np.zeros(size, dtype=bool)
+                    present[ids] = True
+                columns = g.node_columns if kind == 'node' else g.edge_columns
+                columns[name] = (full, present)
+
+            g.node_keys = _stored_keys(data, 'node')
+            keys = _stored_keys(data, 'edge')
+            if keys is not None:
+                codes = np.empty(len(keys[1]), dtype=np.int32)
+                codes[edge_ids] = keys[1]
+                g.edge_keys = (keys[0], codes)
+            return g
+    except (OSError, KeyError, ValueError):
+        return None
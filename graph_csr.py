@@ -0,0 +1,578 @@
+import networkx as nx
+import numpy as np
+from itertools import chain
+
+def build_csr(graph, nodes=None):
+    '''
+    Builds an integer-indexed CSR (compressed sparse row) adjacency for the graph.
+    Nodes are numbered in graph.nodes() order.
+
+    Arguments:
+        graph (nx.Graph): the graph to convert (a CompactGraph returns its own arrays)
+        nodes (iterable): optional node set closed under adjacency (e.g. a connected
+                          component) to convert instead of the whole graph, in this order
+
+    Returns:
+        tuple: (nodes, index, offsets, neighbors) where nodes is the list of node IDs,
+               index maps node ID -> integer position, and the neighbors of node i are
+               neighbors[offsets[i]:offsets[i + 1]]
+    '''
+    if isinstance(graph, CompactGraph):
+        return graph.csr if nodes is None else graph.subgraph_csr(nodes)
+
+    adjacency = graph.adj
+    if nodes is None:
+        nodes = list(graph.nodes())
+        rows = adjacency.values()
+    else:
+        nodes = list(nodes)
+        rows = [adjacency[node] for node in nodes]
+    index = {node: i for i, node in enumerate(nodes)}
+
+    # Degrees are the number of distinct neighbors (a self-loop counts once)
+    degrees = np.fromiter(map(len, rows), dtype=np.int64, count=len(nodes))
+    offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=offsets[1:])
+
+    dtype = np.int32 if len(nodes) < 2**31 else np.int64
+    entries = chain.from_iterable(rows)
+    if not _is_identity(nodes):
+        entries = map(index.__getitem__, entries)
+    neighbors = np.fromiter(entries, dtype=dtype, count=int(offsets[-1]))
+    return nodes, index, offsets, neighbors
+
+def _is_identity(nodes):
+    '''
+    Checks whether the node IDs are already the integers 0..n-1 in order.
+    '''
+    return all(type(node) is int and node == i for i, node in enumerate(nodes))
+
+def expand_frontier(offsets, neighbors, frontier, positions=False):
+    '''
+    Gathers the neighbors of every node in the frontier in one vectorized step.
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        frontier (np.ndarray): node indices to expand
+        positions (bool): also return the position of every gathered entry in neighbors
+
+    Returns:
+        tuple: (sources, targets) arrays where targets[j] is a neighbor of sources[j],
+               listed in frontier order and then adjacency order
+               ((sources, targets, positions) when positions=True)
+    '''
+    starts = offsets[frontier]
+    counts = offsets[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=neighbors.dtype)
+        return (empty, empty, np.empty(0, dtype=np.int64)) if positions else (empty, empty)
+
+    # Position of each gathered entry inside the neighbor array
+    row_starts = np.cumsum(counts) - counts
+    entries = np.repeat(starts - row_starts, counts) + np.arange(total)
+    if positions:
+        return np.repeat(frontier, counts), neighbors[entries], entries
+    return np.repeat(frontier, counts), neighbors[entries]
+
+def edge_list(offsets, neighbors):
+    '''
+    (src, dst) int64 arrays of the undirected edges of a CSR adjacency, in the
+    edge_index numbering: row-major entry order, keeping the entries with src <= dst.
+    '''
+    n = len(offsets) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    forward = rows <= neighbors
+    return rows[forward], neighbors[forward].astype(np.int64)
+
+def edge_index(offsets, neighbors):
+    '''
+    Numbers the undirected edges of a CSR adjacency (each stored as two entries,
+    a self-loop as one).
+
+    Returns:
+        tuple: (entry_edges, src, dst) where entry_edges[j] is the edge ID of adjacency
+               entry j and edge e joins src[e] and dst[e], with src[e] <= dst[e]
+    '''
+    n = len(offsets) - 1
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    cols = neighbors.astype(np.int64)
+    forward = rows <= cols
+    src, dst = rows[forward], cols[forward]
+
+    # Both entries of an edge share its key; sorting the entry keys lines them up with
+    # the sorted edge keys, so no per-entry binary search is needed
+    order = np.argsort(src * n + dst)
+    entry_keys = np.minimum(rows, cols) * n + np.maximum(rows, cols)
+    entry_order = np.argsort(entry_keys)
+    sorted_keys = entry_keys[entry_order]
+    rank = np.zeros(len(cols), dtype=np.int64)
+    np.cumsum(sorted_keys[1:] != sorted_keys[:-1], out=rank[1:])
+    entry_edges = np.empty(len(cols), dtype=np.int64)
+    entry_edges[entry_order] = order[rank]
+    return entry_edges, src, dst
+
+def encode_column(values):
+    '''
+    Converts attribute values into a typed NumPy column, or None if they are not
+    all of one supported scalar type.
+    '''
+    kinds = set(map(type, values))
+    if kinds == {bool}:
+        return np.array(values, dtype=bool)
+    if kinds == {int} and all(-2**63 <= value < 2**63 for value in values):
+        return np.array(values, dtype=np.int64)
+    if kinds == {float}:
+        return np.array(values, dtype=np.float64)
+    if kinds == {str}:
+        return np.array(values, dtype=str)
+    return None
+
+def insertion_order(offsets, neighbors, src, dst):
+    '''
+    Finds an order for adding the edges that reproduces every node's neighbor order.
+    Consecutive neighbors of a node constrain their edges to be added in that order;
+    the constraints are resolved level by level like a topological sort. If they
+    contradict each other, the edges left over by the sort follow in ID order.
+    '''
+    n = len(offsets) - 1
+    m = len(src)
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    keys = lo * n + hi
+    key_order = np.argsort(keys)
+
+    # Edge ID of every adjacency entry
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    cols = neighbors.astype(np.int64)
+    entry_keys = np.minimum(rows, cols) * n + np.maximum(rows, cols)
+    entry_edges = key_order[np.searchsorted(keys, entry_keys, sorter=key_order)]
+
+    same_row = rows[1:] == rows[:-1]
+    before, after = entry_edges[:-1][same_row], entry_edges[1:][same_row]
+    indegree = np.bincount(after, minlength=m)
+    successors = np.argsort(before, kind='stable')
+    succ_offsets = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(np.bincount(before, minlength=m), out=succ_offsets[1:])
+    succ_edges = after[successors]
+
+    order = []
+    frontier = np.flatnonzero(indegree == 0)
+    while frontier.size:
+        order.append(frontier)
+        starts, ends = succ_offsets[frontier], succ_offsets[frontier + 1]
+        counts = ends - starts
+        positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        released = succ_edges[positions]
+        np.subtract.at(indegree, released, 1)
+        frontier = np.unique(released[indegree[released] == 0])
+
+    # Edges on a cycle of constraints never reach indegree 0
+    order.append(np.flatnonzero(indegree > 0))
+    return np.concatenate(order)
+
+def edge_arrays(graph):
+    '''
+    Node list, node index and (src, dst) int64 index arrays of the edges of a graph.
+    '''
+    if isinstance(graph, CompactGraph):
+        return graph.nodes, graph.index, graph.src.astype(np.int64), graph.dst.astype(np.int64)
+    nodes = list(graph.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    m = graph.number_of_edges()
+    src = np.fromiter((index[u] for u, _ in graph.edges()), dtype=np.int64, count=m)
+    dst = np.fromiter((index[v] for _, v in graph.edges()), dtype=np.int64, count=m)
+    return nodes, index, src, dst
+
+def _column(size, ids, values):
+    '''
+    Full-length attribute column of the given values at positions ids: typed when the
+    values share one scalar type (see encode_column), an object array otherwise.
+
+    Returns:
+        tuple: (values, present) where present is None when every position has a value
+    '''
+    column = encode_column(values)
+    if column is None:
+        column = np.fromiter(values, dtype=object, count=len(values))
+    if len(ids) == size:
+        return column, None
+    full = np.zeros(size, dtype=column.dtype)
+    full[ids] = column
+    present = np.zeros(size, dtype=bool)
+    present[ids] = True
+    return full, present
+
+# Default of a column without a value for its missing positions
+_OMIT = object()
+
+def _key_order(records, names):
+    '''
+    Per-record attribute order of a list of attribute dicts, as (signatures, codes):
+    record i has the attributes signatures[codes[i]], in that order. None when every
+    record lists its attributes in the column order (names).
+    '''
+    position = {name: i for i, name in enumerate(names)}
+    signatures, codes = {}, np.empty(len(records), dtype=np.int32)
+    consistent = True
+    for i, data in enumerate(records):
+        key = tuple(data)
+        code = signatures.get(key)
+        if code is None:
+            code = signatures[key] = len(signatures)
+            ranks = [position[name] for name in key]
+            consistent = consistent and ranks == sorted(ranks)
+        codes[i] = code
+    return None if consistent else (list(signatures), codes)
+
+def _columns_from_records(records):
+    '''
+    Attribute columns of a list of attribute dicts (one per node or edge).
+
+    Returns:
+        tuple: (columns, key order) where the key order is None or see _key_order
+    '''
+    names = {}
+    for data in records:
+        names.update(dict.fromkeys(data))
+    columns = {}
+    for name in names:
+        ids = [i for i, data in enumerate(records) if name in data]
+        columns[name] = _column(len(records), ids, [records[i][name] for i in ids])
+    return columns, _key_order(records, names)
+
+def _has_key(columns, defaults, name, size):
+    '''
+    Mask of the records that have an attribute (a value, or the column's default).
+    '''
+    if name not in columns:
+        return np.zeros(size, dtype=bool)
+    present = columns[name][1]
+    if present is None or name in defaults:
+        return np.ones(size, dtype=bool)
+    return present
+
+def _materialize_keys(columns, defaults, size):
+    '''
+    Explicit key order (see _key_order) of records that follow the column order.
+    '''
+    names = list(columns)
+    if not names:
+        return [()], np.zeros(size, dtype=np.int32)
+    masks = np.stack([_has_key(columns, defaults, name, size) for name in names], axis=1)
+    rows, codes = np.unique(masks, axis=0, return_inverse=True)
+    signatures = [tuple(name for name, has in zip(names, row) if has) for row in rows.tolist()]
+    return signatures, codes.ravel().astype(np.int32)
+
+def _update_keys(keys, name, before, after):
+    '''
+    Key order after an attribute is set: like a dict, records that gain the attribute
+    get it last, records that lose it drop it, and the others keep their order.
+    '''
+    signatures, codes = list(keys[0]), keys[1].copy()
+    index = {signature: i for i, signature in enumerate(signatures)}
+    edits = ((after & ~before, lambda signature: signature + (name,)),
+             (before & ~after, lambda signature: tuple(key for key in signature if key != name)))
+    for changed, edit in edits:
+        if not changed.any():
+            continue
+        old, inverse = np.unique(codes[changed], return_inverse=True)
+        new = []
+        for code in old.tolist():
+            signature = edit(signatures[code])
+            if signature not in index:
+                index[signature] = len(signatures)
+                signatures.append(signature)
+            new.append(index[signature])
+        codes[changed] = np.array(new, dtype=np.int32)[inverse.ravel()]
+    return signatures, codes
+
+def _records_from_columns(columns, defaults, keys, size):
+    '''
+    Attribute dicts (one per node or edge) of a set of columns. Missing values take
+    the column's default, or are left out when it has none.
+    '''
+    records = [{} for _ in range(size)]
+    for name, (values, present) in columns.items():
+        ids = np.arange(size) if present is None else np.flatnonzero(present)
+        for i, value in zip(ids.tolist(), values[ids].tolist()):
+            records[i][name] = value
+        if present is not None and name in defaults:
+            default = defaults[name]
+            for i in np.flatnonzero(~present).tolist():
+                records[i][name] = default
+    if keys is not None:
+        signatures, codes = keys
+        records = [{key: data[key] for key in signatures[code]} for data, code in zip(records, codes.tolist())]
+    return records
+
+class NodeTable:
+    '''
+    Node labels interned once: node ID i -> label, backed by one typed NumPy array.
+    Labels are returned as plain Python values, and label -> ID lookups go through a
+    sorted order that is built on first use (see NodeIndex).
+    '''
+    __slots__ = ('labels', '_order')
+
+    def __init__(self, labels):
+        if not isinstance(labels, np.ndarray):
+            labels = encode_column(list(labels)) if len(labels) else np.array([], dtype=str)
+            if labels is None or labels.dtype == bool:
+                raise ValueError("node labels must be all str or all int")
+        self.labels = labels
+        self._order = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return self.labels[i].item()
+        return self.labels[i].tolist()
+
+    def __iter__(self):
+        for start in range(0, len(self.labels), 1 << 16):
+            yield from self.labels[start:start + (1 << 16)].tolist()
+
+    def __eq__(self, other):
+        if not isinstance(other, NodeTable):
+            return NotImplemented
+        return self is other or np.array_equal(self.labels, other.labels)
+
+    __hash__ = None
+
+    def ids(self, labels):
+        '''
+        Node IDs of an array of labels, -1 for labels that are not in the table.
+        '''
+        query = np.asarray(labels)
+        if not len(self.labels) or (query.dtype.kind == 'U') != (self.labels.dtype.kind == 'U'):
+            return np.full(query.shape, -1, dtype=np.int64)
+        if self._order is None:
+            self._order = np.argsort(self.labels, kind='stable')
+        positions = np.minimum(np.searchsorted(self.labels, query, sorter=self._order), len(self.labels) - 1)
+        found = self._order[positions]
+        return np.where(self.labels[found] == query, found, -1)
+
+class NodeIndex:
+    '''
+    Read-only mapping label -> node ID over a NodeTable, usable wherever build_csr's
+    index dict is expected.
+    '''
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = table
+
+    def _find(self, label):
+        if not isinstance(label, (str, int, np.integer, np.str_)) or isinstance(label, bool):
+            return -1
+        return int(self.table.ids([label])[0])
+
+    def __getitem__(self, label):
+        i = self._find(label)
+        if i < 0:
+            raise KeyError(label)
+        return i
+
+    def __contains__(self, label):
+        return self._find(label) >= 0
+
+    def get(self, label, default=None):
+        i = self._find(label)
+        return default if i < 0 else i
+
+    def __len__(self):
+        return len(self.table)
+
+class CompactGraph:
+    '''
+    Compact undirected graph: labels interned in a NodeTable, the adjacency as CSR
+    arrays (int32 neighbors below 2^31 nodes), the edge list in graph_csr.edge_index
+    numbering and attributes as NumPy columns. A 10M-edge graph takes about 24 bytes
+    per edge, against roughly 1 KB in an nx.Graph.
+
+    build_csr returns its arrays directly, so BFS, components, triangles and the
+    failure simulations run on it without networkx; to_networkx/from_networkx convert
+    for everything else. Node attributes are read from node_columns (name -> (values,
+    present mask or None)) and written with set_node_column, edge attributes likewise.
+    node_defaults/edge_defaults hold the values of masked-out positions (e.g. inf for
+    unreachable BFS distances), and node_keys/edge_keys the per-record attribute order
+    when it differs from the column order, so to_networkx reproduces an nx.Graph's
+    attribute dicts exactly.
+    '''
+    __slots__ = ('nodes', 'offsets', 'neighbors', 'src', 'dst', 'node_columns', 'edge_columns',
+                 'node_defaults', 'edge_defaults', 'node_keys', 'edge_keys', 'graph')
+
+    def __init__(self, nodes, offsets, neighbors, src=None, dst=None, graph=None):
+        self.nodes = nodes if isinstance(nodes, NodeTable) else NodeTable(nodes)
+        self.offsets = offsets
+        self.neighbors = neighbors
+        if src is None:
+            src, dst = edge_list(offsets, neighbors)
+        self.src, self.dst = src.astype(neighbors.dtype), dst.astype(neighbors.dtype)
+        self.node_columns, self.edge_columns = {}, {}
+        self.node_defaults, self.edge_defaults = {}, {}
+        self.node_keys, self.edge_keys = None, None
+        self.graph = {} if graph is None else graph
+
+    @classmethod
+    def from_edges(cls, labels, src, dst, graph=None):
+        '''
+        Builds a graph from node labels and (src, dst) index arrays. Duplicate edges are
+        merged as in nx.Graph, and every node's neighbors are sorted by ID.
+        '''
+        n = len(labels)
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        keys = np.sort(np.minimum(src, dst) * n + np.maximum(src, dst))
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+        low, high = keys // n, keys % n
+
+        # Both directions of every edge, sorted by (row, neighbor)
+        proper = low != high
+        entries = np.sort(np.concatenate([keys, high[proper] * n + low[proper]]))
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(entries // n, minlength=n), out=offsets[1:])
+        neighbors = (entries % n).astype(np.int32 if n < 2**31 else np.int64)
+
+        # With sorted rows, the edge_index numbering is the sorted key order
+        return cls(labels, offsets, neighbors, low, high, graph=graph)
+
+    @classmethod
+    def from_networkx(cls, g):
+        '''
+        Converts an undirected nx.Graph whose labels are all str or all int, keeping
+        its node and adjacency order and all node, edge and graph attributes.
+        '''
+        if g.is_directed() or g.is_multigraph():
+            raise ValueError("CompactGraph only holds undirected simple graphs")
+        nodes, _, offsets, neighbors = build_csr(g)
+        compact = cls(nodes, offsets, neighbors, graph=dict(g.graph))
+        compact.node_columns, compact.node_keys = _columns_from_records([data for _, data in g.nodes(data=True)])
+        adjacency = g.adj
+        compact.edge_columns, compact.edge_keys = _columns_from_records(
+            [adjacency[nodes[u]][nodes[v]] for u, v in zip(compact.src.tolist(), compact.dst.tolist())])
+        return compact
+
+    def to_networkx(self):
+        '''
+        Converts to an nx.Graph with the same node order, neighbor order and attributes.
+        '''
+        g = nx.Graph()
+        g.graph.update(self.graph)
+        labels = self.nodes.labels.tolist()
+        g.add_nodes_from(zip(labels, _records_from_columns(self.node_columns, self.node_defaults, self.node_keys, len(labels))))
+        records = _records_from_columns(self.edge_columns, self.edge_defaults, self.edge_keys, len(self.src))
+        src, dst = self.src.astype(np.int64), self.dst.astype(np.int64)
+        order = insertion_order(self.offsets, self.neighbors, src, dst).tolist()
+        src, dst = src.tolist(), dst.tolist()
+        g.add_edges_from((labels[src[e]], labels[dst[e]], records[e]) for e in order)
+        return g
+
+    @property
+    def index(self):
+        return NodeIndex(self.nodes)
+
+    @property
+    def csr(self):
+        '''
+        (nodes, index, offsets, neighbors), as returned by build_csr.
+        '''
+        return self.nodes, self.index, self.offsets, self.neighbors
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.src)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    def subgraph_csr(self, nodes):
+        '''
+        build_csr of a node set closed under adjacency (e.g. a connected component).
+        '''
+        ids = self.nodes.ids(list(nodes))
+        position = np.full(len(self.nodes), -1, dtype=np.int64)
+        position[ids] = np.arange(len(ids))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(self.offsets[ids + 1] - self.offsets[ids], out=offsets[1:])
+        _, targets = expand_frontier(self.offsets, self.neighbors, ids)
+        table = NodeTable(self.nodes.labels[ids])
+        return table, NodeIndex(table), offsets, position[targets].astype(self.neighbors.dtype)
+
+    def _set_column(self, kind, name, values, present, default):
+        columns, defaults = getattr(self, f"{kind}_columns"), getattr(self, f"{kind}_defaults")
+        keys = getattr(self, f"{kind}_keys")
+        size = len(values)
+        before = _has_key(columns, defaults, name, size)
+        after = present if present is not None and default is _OMIT else np.ones(size, dtype=bool)
+
+        # Records keep the column order unless an existing attribute is added to or dropped from some
+        if keys is None and name in columns and not np.array_equal(before, after):
+            keys = _materialize_keys(columns, defaults, size)
+        columns[name] = (np.asarray(values), present)
+        defaults.pop(name, None)
+        if default is not _OMIT:
+            defaults[name] = default
+        setattr(self, f"{kind}_keys", None if keys is None else _update_keys(keys, name, before, after))
+
+    def set_node_column(self, name, values, present=None, default=_OMIT):
+        '''
+        Sets a node attribute for all nodes (present=None) or where the present mask is
+        True. Elsewhere the attribute is `default`, or left out when none is given.
+        '''
+        self._set_column('node', name, values, present, default)
+
+    def set_edge_column(self, name, values, present=None, default=_OMIT):
+        '''
+        Sets an edge attribute, indexed by edge ID (see set_node_column).
+        '''
+        self._set_column('edge', name, values, present, default)
+
+    def _get_column(self, kind, name):
+        columns, defaults = getattr(self, f"{kind}_columns"), getattr(self, f"{kind}_defaults")
+        if name not in columns:
+            return None
+        values, present = columns[name]
+        if present is not None and name in defaults:
+            values, present = np.where(present, values, defaults[name]), None
+        return values, present
+
+    def node_column(self, name):
+        '''
+        Values of a node attribute as (values, present), with missing positions filled
+        by the column's default if it has one, or None if no node has the attribute.
+        '''
+        return self._get_column('node', name)
+
+    def edge_column(self, name):
+        '''
+        Values of an edge attribute, indexed by edge ID (see node_column).
+        '''
+        return self._get_column('edge', name)
+
+    def without_edges(self, edge_ids):
+        '''
+        Copy of the graph with the given edges (IDs into src/dst) removed; the other
+        edges keep their neighbor order and attributes.
+        '''
+        keep = np.ones(len(self.src), dtype=bool)
+        keep[edge_ids] = False
+        entry_edges, _, _ = edge_index(self.offsets, self.neighbors)
+        kept = keep[entry_edges]
+        rows = np.repeat(np.arange(len(self.nodes)), np.diff(self.offsets))
+        offsets = np.zeros_like(self.offsets)
+        np.cumsum(np.bincount(rows[kept], minlength=len(self.nodes)), out=offsets[1:])
+
+        copy = CompactGraph(self.nodes, offsets, self.neighbors[kept], self.src[keep], self.dst[keep], dict(self.graph))
+        copy.node_columns, copy.node_defaults, copy.node_keys = dict(self.node_columns), dict(self.node_defaults), self.node_keys
+        copy.edge_columns = {name: (values[keep], None if present is None else present[keep])
+                             for name, (values, present) in self.edge_columns.items()}
+        copy.edge_defaults = dict(self.edge_defaults)
+        copy.edge_keys = None if self.edge_keys is None else (self.edge_keys[0], self.edge_keys[1][keep])
+        return copy
@@ -0,0 +1,157 @@
+import networkx as nx
+import numpy as np
+
+from graph_csr import CompactGraph
+
+def erdos_renyi_edges(n, p, seed=None):
+    '''
+    Samples the edges of an Erdos-Renyi G(n, p) graph in O(n + m) expected time.
+    Uses geometric skip sampling (Batagelj-Brandes): instead of testing all n^2 pairs,
+    the gap to the next present pair is drawn from a geometric distribution, in
+    vectorized NumPy batches.
+
+    Arguments:
+        n (int): number of nodes
+        p (float): edge probability
+        seed (int): optional seed for reproducible graphs
+
+    Returns:
+        tuple: (u, v) int64 arrays of edge endpoints with u > v
+    '''
+    rng = np.random.default_rng(seed)
+    total = n * (n - 1) // 2
+    if n < 2 or p <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    if p >= 1:
+        v, u = np.triu_indices(n, k=1)
+        return u.astype(np.int64), v.astype(np.int64)
+
+    # Draw skips in batches sized around the expected number of edges
+    batch = int(min(max(total * p * 1.1, 1024), 1 << 22))
+    chunks = []
+    position = -1
+    while position < total:
+        positions = position + np.cumsum(rng.geometric(p, size=batch), dtype=np.int64)
+        position = int(positions[-1])
+        chunks.append(positions[positions < total])
+    pairs = np.concatenate(chunks)
+
+    # Pair index k -> (u, v) with u > v, where k = u * (u - 1) / 2 + v
+    u = ((1 + np.sqrt(1 + 8 * pairs.astype(np.float64))) // 2).astype(np.int64)
+    u[u * (u - 1) // 2 > pairs] -= 1
+    u[(u + 1) * u // 2 <= pairs] += 1
+    v = pairs - u * (u - 1) // 2
+    return u, v
+
+def _labeled_graph(n, u, v):
+    '''
+    Builds a graph with nodes labeled "0", "1", ..., "n-1" from edge index arrays,
+    creating the string labels once.
+    '''
+    labels = [str(i) for i in range(n)]
+
+    graph = nx.Graph()
+    graph.add_nodes_from(labels)
+    graph.add_edges_from(zip(map(labels.__getitem__, u.tolist()), map(labels.__getitem__, v.tolist())))
+    return graph
+
+def erdos_renyi_graph(n, p, seed=None, compact=False):
+    '''
+    Generates an Erdos-Renyi graph with nodes labeled "0", "1", ..., "n-1".
+    Edges are sampled into arrays first and the string labels are created once,
+    without building an integer-labeled graph and relabeling a copy of it.
+
+    Arguments:
+        n (int): number of nodes
+        p (float): edge probability
+        seed (int): optional seed for reproducible graphs
+        compact (bool): return a graph_csr.CompactGraph instead of an nx.Graph
+
+    Returns:
+        nx.Graph: the generated graph
+    '''
+    u, v = erdos_renyi_edges(n, p, seed)
+    if compact:
+        return CompactGraph.from_edges(np.arange(n).astype(str), u, v)
+    return _labeled_graph(n, u, v)
+
+def _unique_pairs(n, u, v):
+    '''
+    Drops self-loops and duplicate pairs, returning (u, v) arrays with u > v.
+    '''
+    proper = u != v
+    keys = np.unique(np.maximum(u, v)[proper] * n + np.minimum(u, v)[proper])
+    return keys // n, keys % n
+
+def scale_free_edges(n, average_degree, exponent=2.5, seed=None):
+    '''
+    Samples the edges of a Chung-Lu graph whose expected degrees follow a power law
+    with the given exponent: both endpoints of every edge are drawn with probability
+    proportional to the node weights (i + 1) ^ (-1 / (exponent - 1)), in O(n + m log n).
+    Self-loops and duplicates are dropped, so hubs end up with slightly fewer edges.
+
+    Arguments:
+        n (int): number of nodes
+        average_degree (float): expected average degree
+        exponent (float): power-law exponent of the degree distribution (> 2)
+        seed (int): optional seed for reproducible graphs
+
+    Returns:
+        tuple: (u, v) int64 arrays of edge endpoints with u > v
+    '''
+    rng = np.random.default_rng(seed)
+    weights = np.arange(1, n + 1, dtype=np.float64) ** (-1 / (exponent - 1))
+    m = int(n * average_degree / 2)
+    u = rng.choice(n, size=m, p=weights / weights.sum())
+    v = rng.choice(n, size=m, p=weights / weights.sum())
+    return _unique_pairs(n, u, v)
+
+def scale_free_graph(n, average_degree, exponent=2.5, seed=None):
+    '''
+    Generates a scale-free (Chung-Lu) graph with nodes labeled "0", ..., "n-1".
+    See scale_free_edges.
+    '''
+    u, v = scale_free_edges(n, average_degree, exponent, seed)
+    return _labeled_graph(n, u, v)
+
+def community_edges(n, communities, average_degree, mixing=0.1, seed=None):
+    '''
+    Samples the edges of a planted-partition graph: nodes are split into equally sized
+    blocks of consecutive indices, and every edge joins a random node to a random node
+    of its own block, or (with probability mixing) to any random node.
+
+    Arguments:
+        n (int): number of nodes
+        communities (int): number of blocks
+        average_degree (float): expected average degree
+        mixing (float): share of edges between random nodes
+        seed (int): optional seed for reproducible graphs
+
+    Returns:
+        tuple: (u, v, membership) with u > v and membership[i] the block of node i
+    '''
+    rng = np.random.default_rng(seed)
+    communities = max(1, min(communities, n))
+    membership = np.arange(n, dtype=np.int64) * communities // max(n, 1)
+    starts = np.searchsorted(membership, np.arange(communities))
+    sizes = np.diff(np.append(starts, n))
+
+    m = int(n * average_degree / 2)
+    u = rng.integers(0, n, size=m)
+    block = membership[u]
+    v = starts[block] + (rng.random(m) * sizes[block]).astype(np.int64)
+    mixed = rng.random(m) < mixing
+    v[mixed] = rng.integers(0, n, size=int(mixed.sum()))
+    u, v = _unique_pairs(n, u, v)
+    return u, v, membership
+
+def community_graph(n, communities, average_degree, mixing=0.1, seed=None):
+    '''
+    Generates a planted-partition graph with nodes labeled "0", ..., "n-1", storing
+    every node's block in its 'community' attribute. See community_edges.
+    '''
+    u, v, membership = community_edges(n, communities, average_degree, mixing, seed)
+    graph = _labeled_graph(n, u, v)
+    nx.set_node_attributes(graph, dict(zip(graph.nodes(), membership.tolist())), 'community')
+    return graph
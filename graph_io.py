@@ -1,61 +1,426 @@
 import networkx as nx
+import numpy as np
+import bz2
+import gzip
+import html
+import os
 import re
 
-def readGraph(file_path):
+import graph_cache
+import profiler
+from graph_csr import CompactGraph
+
+# Value written/read in place of an infinite distance
+INF_VALUE = 999999999
+INF = float('inf')
+
+# Token patterns of the GML grammar, one group per token kind
+_TOKENS = re.compile(r'''
+    (?P<inf>[+-]?inf\b)
+  | (?P<key>[A-Za-z_][0-9A-Za-z_]*)
+  | (?P<real>[+-]?(?:[0-9]*\.[0-9]+|[0-9]+\.[0-9]*|INF)(?:[Ee][+-]?[0-9]+)?)
+  | (?P<int>[+-]?[0-9]+)
+  | (?P<string>"[^"]*")
+  | (?P<start>\[)
+  | (?P<end>\])
+  | (?P<skip>\#[^\n]*|\s+)
+''', re.VERBOSE)
+
+# Tokens ending this close to the end of the buffer may continue in the next chunk
+# (e.g. the exponent of a real); only strings can be longer and are checked separately
+_LOOKAHEAD = 64
+
+# Marker networkx uses to write single-element lists
+_LIST_START = "_networkx_list_start"
+
+def _tokenize(f, chunk_size, total_size=None):
+    '''
+    Incrementally tokenizes a GML stream, reading it in fixed-size chunks.
+    Unquoted 'inf' values are turned into 999999999 while tokenizing.
+
+    Arguments:
+        f (file): text file object to read from
+        chunk_size (int): number of characters read per chunk
+        total_size (int): file size in bytes, enables progress reporting
+
+    Yields:
+        tuple: (kind, value) pairs, ending with (None, None) at end of file
+    '''
+    buffer = ''
+    read = 0
+    reported = 0
+    eof = False
+
+    while not eof:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        read += len(chunk)
+
+        if total_size and not eof:
+            percent = min(100, read * 100 // total_size)
+            if percent >= reported + 10:
+                reported = percent - percent % 10
+                print(f"Reading graph: {reported}%")
+
+        pos = 0
+        length = len(buffer)
+        while pos < length:
+            match = _TOKENS.match(buffer, pos)
+
+            # A token cut off at the chunk boundary is finished with the next chunk; anything
+            # else that cannot be tokenized is an error right away
+            if not eof and (length - (match.end() if match else pos) < _LOOKAHEAD
+                            or match is None and buffer[pos] == '"' and buffer.find('"', pos + 1) < 0):
+                break
+            if match is None:
+                raise nx.NetworkXError(f"cannot tokenize {buffer[pos:pos + 20]!r}")
+
+            kind = match.lastgroup
+            text = match.group(kind)
+            pos = match.end()
+            if kind == 'skip':
+                continue
+            if kind == 'inf':
+                yield 'int', -INF_VALUE if text[0] == '-' else INF_VALUE
+            elif kind == 'real':
+                yield 'real', float(text)
+            elif kind == 'int':
+                yield 'int', int(text)
+            else:
+                yield kind, text
+        buffer = buffer[pos:]
+
+    yield None, None
+
+def _parse_value(key, kind, value, tokens):
+    '''
+    Converts the token following a key into its Python value.
+    '''
+    if kind in ('int', 'real'):
+        return value
+    if kind == 'string':
+        value = html.unescape(value[1:-1])
+        if value == "()":
+            return ()
+        if value == "[]":
+            return []
+        return value
+    if kind == 'start':
+        return _parse_list(tokens)
+    # Allow unquoted ids and labels, and NAN/INF keywords
+    if kind == 'key' and key in ("id", "label", "source", "target"):
+        return html.unescape(value)
+    if kind == 'key' and value in ("NAN", "INF"):
+        return float(value)
+    raise nx.NetworkXError(f"expected a value for {key!r}, found {value!r}")
+
+def _parse_list(tokens):
+    '''
+    Parses the key/value pairs of a '[ ... ]' block into a dict.
+    Repeated keys are collected into lists, as networkx does.
+    '''
+    entries = {}
+    for kind, value in tokens:
+        if kind == 'end':
+            break
+        if kind != 'key':
+            raise nx.NetworkXError(f"expected a key or ']', found {value!r}")
+        entries.setdefault(value, []).append(_parse_value(value, *next(tokens), tokens))
+    else:
+        raise nx.NetworkXError("unexpected end of file")
+
+    return {key: _clean_value(values) for key, values in entries.items()}
+
+def _clean_value(values):
+    '''
+    Unwraps single values and networkx list markers.
+    '''
+    if len(values) == 1:
+        return values[0]
+    if values[0] == _LIST_START:
+        return values[1:]
+    return values
+
+def _pop_attr(entry, kind, attr, i):
+    try:
+        return entry.pop(attr)
+    except KeyError:
+        raise nx.NetworkXError(f"{kind} #{i} has no {attr!r} attribute")
+
+def _new_graph(graph_attrs):
+    '''
+    Creates an empty graph of the type given by the 'directed'/'multigraph' attributes.
+    '''
+    directed = graph_attrs.pop("directed", False)
+    multigraph = graph_attrs.pop("multigraph", False)
+    if multigraph:
+        return nx.MultiDiGraph() if directed else nx.MultiGraph()
+    return nx.DiGraph() if directed else nx.Graph()
+
+def _build_graph(tokens):
+    '''
+    Builds the graph while the token stream is consumed: nodes and edges are
+    added as soon as their block is parsed, keyed by their 'label' attribute.
+    '''
+    kind, value = next(tokens)
+    if (kind, value) != ('key', 'graph') or next(tokens)[0] != 'start':
+        raise nx.NetworkXError("input contains no graph")
+
+    graph_attrs = {}
+    g = None
+    labels = {}
+    pending = []
+    node_count = 0
+    edge_count = 0
+
+    def add_edge(edge, i):
+        source = _pop_attr(edge, "edge", "source", i)
+        target = _pop_attr(edge, "edge", "target", i)
+        if source not in labels:
+            raise nx.NetworkXError(f"edge #{i} has undefined source {source!r}")
+        if target not in labels:
+            raise nx.NetworkXError(f"edge #{i} has undefined target {target!r}")
+        u, v = labels[source], labels[target]
+        if g.is_multigraph():
+            g.add_edge(u, v, edge.pop("key", None), **edge)
+        elif g.has_edge(u, v):
+            raise nx.NetworkXError(f"edge #{i} ({u!r}--{v!r}) is duplicated")
+        else:
+            g.add_edge(u, v, **edge)
+
+    for kind, value in tokens:
+        if kind == 'end':
+            break
+        if kind != 'key':
+            raise nx.NetworkXError(f"expected a key or ']', found {value!r}")
+
+        # Graph type comes from the header attributes seen so far
+        if value in ('node', 'edge') and g is None:
+            g = _new_graph(graph_attrs)
+            if next(tokens)[0] != 'start':
+                raise nx.NetworkXError(f"expected '[' after {value!r}")
+        elif value in ('node', 'edge') and next(tokens)[0] != 'start':
+            raise nx.NetworkXError(f"expected '[' after {value!r}")
+
+        if value == 'node':
+            node = _parse_list(tokens)
+            node_id = _pop_attr(node, "node", "id", node_count)
+            if node_id in labels:
+                raise nx.NetworkXError(f"node id {node_id!r} is duplicated")
+            label = _pop_attr(node, "node", "label", node_count)
+            if label in g:
+                raise nx.NetworkXError(f"node label {label!r} is duplicated")
+            labels[node_id] = label
+            g.add_node(label, **node)
+            node_count += 1
+        elif value == 'edge':
+            edge = _parse_list(tokens)
+
+            # Edges listed before their nodes are added once all nodes are known
+            if edge.get("source") in labels and edge.get("target") in labels:
+                add_edge(edge, edge_count)
+            else:
+                pending.append((edge, edge_count))
+            edge_count += 1
+        else:
+            graph_attrs[value] = _parse_value(value, *next(tokens), tokens)
+    else:
+        raise nx.NetworkXError("unexpected end of file")
+
+    if next(tokens)[0] is not None:
+        raise nx.NetworkXError("input contains more than one graph")
+
+    if g is None:
+        g = _new_graph(graph_attrs)
+    for edge, i in pending:
+        add_edge(edge, i)
+    g.graph.update(graph_attrs)
+    return g
+
+def _open_text(file_path, mode):
+    '''
+    Opens a text file, compressing/decompressing transparently for .gz and .bz2 paths.
+    '''
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, mode + 't')
+    if file_path.endswith('.bz2'):
+        return bz2.open(file_path, mode + 't')
+    return open(file_path, mode)
+
+def normalize_signs(graph):
+    '''
+    Converts string edge signs ('+', '-', '1', ...) into the integers 1/-1.
+    Unrecognized values default to positive with a warning.
+    '''
+    for u, v, data in graph.edges(data=True):
+        sign = data.get('sign')
+        if not isinstance(sign, str):
+            continue
+        if sign == '+':
+            data['sign'] = 1
+        elif sign == '-':
+            data['sign'] = -1
+        else:
+            # Handle other string representations
+            try:
+                data['sign'] = int(sign)
+            except ValueError:
+                print(f"Warning: Could not convert sign value '{sign}' to integer")
+                data['sign'] = 1  # Default to positive
+
+def readGraph(file_path, chunk_size=1 << 20, progress=False, cache=False, signed=False, trace=None, compact=False):
     '''
     Reads a graph from a .gml file.
+    The file is tokenized and parsed incrementally in chunks, so memory use is
+    bounded by the graph itself rather than by several copies of the text.
+    With cache=True a binary snapshot stored next to the file is used when it is
+    still valid, and written after a full parse otherwise.
 
     Arguments:
         file_path(str): the path to the .gml file.
+        chunk_size(int): number of characters read at a time
+        progress(bool): prints the percentage of the file read so far
+        cache(bool): load from/save to the binary snapshot cache
+        signed(bool): converts string edge signs to integers (see normalize_signs)
+        trace(dict): optional profiler trace recording the snapshot, parse and sign stages
+        compact(bool): returns a graph_csr.CompactGraph (loaded from the snapshot without
+                       networkx when cached)
 
     Returns:
-        nx.Graph: the graph object
+        nx.Graph: the graph object (CompactGraph with compact=True)
 
     Raises:
         FileNotFoundError: if the file cannot be found/does not exist
     '''
+    variant = '.signed' if signed else ''
+    if cache and os.path.exists(file_path):
+        with profiler.stage(trace, 'snapshot load'):
+            load = graph_cache.load_compact if compact else graph_cache.load_snapshot
+            graph = load(file_path, variant)
+        if graph is not None:
+            return graph
+
     # Reads the graph file inputted and returns an error if the file cannot be found
     try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        # Rewrites 'inf' into 999999999
-        content = re.sub(r'\binf\b', '999999999', content)
-        return nx.parse_gml(content)
+        with profiler.stage(trace, 'parse'):
+            total_size = os.path.getsize(file_path) if progress else None
+            with _open_text(file_path, 'r') as f:
+                graph = _build_graph(_tokenize(f, chunk_size, total_size))
     except FileNotFoundError:
         raise FileNotFoundError(f"Error: file '{file_path}' could not be found")
 
-def writeGraph(graph, file_path):
+    if signed:
+        with profiler.stage(trace, 'sign normalization'):
+            normalize_signs(graph)
+    if cache:
+        with profiler.stage(trace, 'snapshot save'):
+            graph_cache.save_snapshot(graph, file_path, variant)
+    if compact:
+        with profiler.stage(trace, 'compact'):
+            graph = CompactGraph.from_networkx(graph)
+    return graph
+
+def _format_float(value):
+    if value != value:
+        return 'NAN'
+    if value in (INF, -INF):
+        return str(-INF_VALUE if value < 0 else INF_VALUE)
+    return repr(value)
+
+def _format_string(value):
+    if '&' in value or '"' in value:
+        value = html.escape(value)
+    return f'"{value}"'
+
+# Formatters for the common scalar types, looked up by exact type
+_FORMATTERS = {int: str, float: _format_float, str: _format_string, bool: lambda value: str(int(value))}
+
+def _format_entry(name, value, indent):
+    '''
+    Formats one attribute of any type as GML line(s), or returns None for values that are skipped.
     '''
-    Saves the graph to a .gml file
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        inner = [_format_entry(key, item, indent + '  ') for key, item in value.items()]
+        return "\n".join([f"{indent}{name} ["] + [line for line in inner if line is not None] + [f"{indent}]"])
+    if isinstance(value, (list, tuple)):
+        # Lists are written as repeated keys, with networkx's marker for short lists
+        items = [_LIST_START] + list(value) if len(value) < 2 else value
+        lines = [_format_entry(name, item, indent) for item in items]
+        return "\n".join(line for line in lines if line is not None)
+
+    if isinstance(value, (bool, np.bool_, int, np.integer)):
+        text = str(int(value))
+    elif isinstance(value, (float, np.floating)):
+        text = _format_float(float(value))
+    else:
+        text = _format_string(str(value))
+    return f"{indent}{name} {text}"
+
+def _format_attrs(data, reserved):
+    '''
+    Formats the attributes of one node/edge as a block of GML lines.
+    Scalars go through a type-keyed table; other values fall back to _format_entry.
     '''
+    try:
+        return ''.join([f"    {name} {_FORMATTERS[type(value)](value)}\n"
+                        for name, value in data.items() if value is not None and name not in reserved])
+    except KeyError:
+        lines = [_format_entry(name, value, '    ') for name, value in data.items() if name not in reserved]
+        return ''.join(line + "\n" for line in lines if line is not None)
+
+def writeGraph(graph, file_path, batch_size=10000):
+    '''
+    Saves the graph to a .gml file.
+    Nodes and edges (with their attributes) are formatted through a type-keyed
+    table and written in large batches with a single call each. Paths ending in
+    .gz or .bz2 are compressed transparently.
+
+    Arguments:
+        graph (nx.Graph): the graph to save (a CompactGraph is converted first)
+        file_path (str): output path (.gml, .gml.gz or .gml.bz2)
+        batch_size (int): number of nodes/edges formatted per write
+
+    Returns:
+        bool: True if the graph was saved, False otherwise
+    '''
+    if isinstance(graph, CompactGraph):
+        graph = graph.to_networkx()
     try:
         # Creates the .gml file
-        with open(file_path, 'w') as f:
-            f.write('graph [\n')
-            
-            # Write nodes
-            for node in graph.nodes():
-                f.write(f'  node [\n')
-                f.write(f'    id {node}\n')
-                f.write(f'    label "{node}"\n')
-                
-                # Write all attributes
-                for attr_name, attr_value in graph.nodes[node].items():
-                    if attr_value is not None:
-                        if attr_value == float('inf'):
-                            attr_value = 999999999
-                        f.write(f'    {attr_name} {attr_value}\n')
-                
-                f.write('  ]\n')
-            
-            # Write edges
-            for edge in graph.edges():
-                f.write('  edge [\n')
-                f.write(f'    source {edge[0]}\n')
-                f.write(f'    target {edge[1]}\n')
-                f.write('  ]\n')
-            
-            f.write(']\n')
+        with _open_text(file_path, 'w') as f:
+            header = ['graph [']
+            if graph.is_directed():
+                header.append('  directed 1')
+            if graph.is_multigraph():
+                header.append('  multigraph 1')
+            for name, value in graph.graph.items():
+                line = _format_entry(name, value, '  ')
+                if line is not None and name not in ('directed', 'multigraph', 'node', 'edge'):
+                    header.append(line)
+            f.write("\n".join(header) + "\n")
+
+            # Write nodes, numbered in graph order, one write call per batch
+            ids = {}
+            parts = []
+            for i, (node, data) in enumerate(graph.nodes(data=True)):
+                ids[node] = i
+                parts.append(f'  node [\n    id {i}\n    label {_format_string(str(node))}\n{_format_attrs(data, ("id", "label"))}  ]\n')
+                if len(parts) >= batch_size:
+                    f.write(''.join(parts))
+                    parts = []
+
+            # Write edges with their attributes
+            for u, v, data in graph.edges(data=True):
+                parts.append(f'  edge [\n    source {ids[u]}\n    target {ids[v]}\n{_format_attrs(data, ("source", "target"))}  ]\n')
+                if len(parts) >= batch_size:
+                    f.write(''.join(parts))
+                    parts = []
+
+            parts.append(']\n')
+            f.write(''.join(parts))
         # Prints if graph is saved successfully
         print(f"Graph successfully saved to {file_path}")
         return True
@@ -63,4 +428,4 @@ def writeGraph(graph, file_path):
     except Exception as e:
         # Outputs that the graph could not be saved
         print(f"Could not save graph. Error: {e}")
-        return False
\ No newline at end of file
+        return False
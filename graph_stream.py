@@ -0,0 +1,566 @@
+'''
+Out-of-core structural analysis of graphs too large to load into networkx.
+
+Edges are streamed in chunks from a GML file or a plain edge list ("u v" per line,
+whitespace or comma separated, # or % comments, a single label declares a node) and
+folded into array-backed union-find forests. Node labels are interned to compact
+indices: non-negative integer labels (written in canonical form, so "007" and "7"
+stay different nodes) are used as indices directly as long as they are dense
+enough, any other labels go through a label -> index table. Node arrays move to
+memory-mapped files, and the label table to an SQLite file, once they would
+exceed the memory limit.
+
+Examples:
+    python graph_stream.py edges.txt.gz
+    python graph_stream.py huge.gml --failures 100 --runs 10 --seed 1 --memory_limit 512
+'''
+import argparse
+import itertools
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from graph_algorithms import component_labels
+from graph_io import _open_text, _parse_list, _parse_value, _tokenize
+
+# Number of edges read and merged per chunk
+STREAM_CHUNK = 1 << 20
+
+# Node arrays larger than this (in bytes) are kept in memory-mapped files
+MEMORY_LIMIT = 1 << 30
+
+# Integer labels are used as indices while the largest one stays below
+# DENSE_SLACK times the number of nodes seen (or DENSE_MIN)
+DENSE_SLACK = 4
+DENSE_MIN = 1 << 20
+
+# Estimated bytes per entry of the in-memory label table, on top of the label itself
+LABEL_OVERHEAD = 120
+
+# Number of nodes per block when node arrays are scanned for the final statistics
+SCAN_BLOCK = 1 << 22
+
+# Number of isolated nodes listed in a summary
+ISOLATED_EXAMPLES = 10
+
+def read_chunks(path, chunk_size=STREAM_CHUNK):
+    '''
+    Streams the nodes and edges of a GML file (.gml, .gml.gz, .gml.bz2) or an edge
+    list (any other file) in chunks. Edge endpoints are GML node ids or edge-list labels
+    (see gml_labels for the labels of GML ids).
+
+    Yields:
+        tuple: (node labels, edge endpoints) where the endpoints of a chunk's edges are
+               all sources followed by all targets (at most chunk_size edges per chunk)
+    '''
+    if path.endswith(('.gml', '.gml.gz', '.gml.bz2')):
+        yield from _gml_chunks(path, chunk_size)
+        return
+
+    with _open_text(path, 'r') as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                return
+            text = ''.join(lines).replace(',', ' ')
+
+            # Blocks of plain "u v" integer lines are parsed with array operations
+            if '#' not in text and '%' not in text:
+                values = _integer_pairs(text, len(lines))
+                if values is not None:
+                    yield [], np.concatenate([values[0::2], values[1::2]])
+                    continue
+
+            nodes, src, dst = [], [], []
+            for line in text.splitlines():
+                fields = line.split()
+                if not fields or fields[0][0] in '#%':
+                    continue
+                if len(fields) == 1:
+                    nodes.append(fields[0])
+                else:
+                    src.append(fields[0])
+                    dst.append(fields[1])
+            yield nodes, src + dst
+
+def _integer_pairs(text, lines):
+    '''
+    Parses a block of "u v" lines of integers written in canonical form (no sign other
+    than '-', no leading zeros, no "-0"), without creating a Python object per value.
+
+    Returns:
+        np.ndarray: int64 values in file order, or None if some line is not such a pair
+    '''
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    space = np.ones(len(data) + 2, dtype=bool)
+    space[1:-1] = data <= 32
+    bounds = np.flatnonzero(space[1:] != space[:-1])
+    start, end = bounds[0::2], bounds[1::2]
+    if not lines or len(start) != 2 * lines:
+        return None
+    if not np.array_equal(np.searchsorted(np.flatnonzero(data == 10), start), np.arange(len(start)) // 2):
+        return None
+
+    negative = data[start] == ord('-')
+    first = start + negative
+    length = end - first
+    if length.min() < 1 or length.max() > 18:
+        return None
+    if ((data[first] == ord('0')) & ((length > 1) | negative)).any():
+        return None
+
+    # Horner's rule over the k-th digit of every token at once
+    digits = data - np.uint8(ord('0'))
+    values = np.zeros(len(start), dtype=np.int64)
+    for k in range(int(length.max())):
+        inside = k < length
+        digit = digits[np.where(inside, first + k, first)]
+        if (digit > 9).any():
+            return None
+        values = np.where(inside, values * 10 + digit, values)
+    return np.where(negative, -values, values)
+
+def _gml_chunks(path, chunk_size):
+    '''
+    Streams the node ids and (source, target) pairs of a GML file. Only one node or
+    edge block is parsed at a time; graph attributes are skipped.
+    '''
+    with _open_text(path, 'r') as f:
+        tokens = _tokenize(f, 1 << 20)
+        if next(tokens) != ('key', 'graph') or next(tokens)[0] != 'start':
+            raise ValueError("input contains no graph")
+
+        nodes, src, dst = [], [], []
+        for kind, value in tokens:
+            if kind == 'end':
+                break
+            if kind != 'key':
+                raise ValueError(f"expected a key or ']', found {value!r}")
+            if value not in ('node', 'edge'):
+                _parse_value(value, *next(tokens), tokens)
+                continue
+            if next(tokens)[0] != 'start':
+                raise ValueError(f"expected '[' after {value!r}")
+            entry = _parse_list(tokens)
+            try:
+                if value == 'node':
+                    nodes.append(entry['id'])
+                else:
+                    src.append(entry['source'])
+                    dst.append(entry['target'])
+            except KeyError as error:
+                raise ValueError(f"{value} without {error} attribute")
+            if len(nodes) >= chunk_size or len(src) >= chunk_size:
+                yield nodes, src + dst
+                nodes, src, dst = [], [], []
+        else:
+            raise ValueError("unexpected end of file")
+        yield nodes, src + dst
+
+def _new_state(forests, memory_limit, spill_dir):
+    '''
+    Empty streaming state with the given number of union-find forests.
+    '''
+    return {'dense': True, 'labels': {}, 'label_bytes': 0, 'table': None, 'interned': 0,
+            'nodes': 0, 'capacity': 0, 'edges': 0, 'self_loops': 0,
+            'degree': np.zeros(0, dtype=np.int64),
+            'forests': [{'parent': np.zeros(0, dtype=np.int64), 'size': np.zeros(0, dtype=np.int64)}
+                        for _ in range(forests)],
+            'memory_limit': memory_limit, 'spill_dir': spill_dir, 'spill': None, 'files': 0}
+
+def _spill(state):
+    '''
+    Temporary directory for the spilled node arrays and label table, created on first use.
+    '''
+    if state['spill'] is None:
+        state['spill'] = tempfile.mkdtemp(prefix='graph_stream_', dir=state['spill_dir'])
+    return state['spill']
+
+def _allocate(state, capacity, bytes_per_node):
+    '''
+    Uninitialized int64 node array, memory-mapped once all node arrays together
+    (bytes_per_node for every node) would exceed the memory limit.
+    '''
+    if not state['files'] and capacity * bytes_per_node <= state['memory_limit']:
+        return np.empty(capacity, dtype=np.int64)
+    if not state['files']:
+        _spill(state)
+    state['files'] += 1
+    return np.memmap(os.path.join(state['spill'], f"array_{state['files']}.bin"), dtype=np.int64,
+                     mode='w+', shape=(capacity,))
+
+def _release(array):
+    '''
+    Deletes the file behind a memory-mapped array (the mapping itself goes away with
+    its last reference). In-memory arrays are left to the garbage collector.
+    '''
+    if isinstance(array, np.memmap) and array.filename:
+        os.remove(array.filename)
+
+def _grow(state, needed):
+    '''
+    Grows every node array to hold at least `needed` nodes. New slots are unseen:
+    their own parent, size 0 and degree 0.
+    '''
+    old = state['capacity']
+    if needed <= old:
+        return
+    capacity = max(needed, 2 * old, 1024)
+    bytes_per_node = 8 * (1 + 2 * len(state['forests']))
+    fresh = np.arange(old, capacity, dtype=np.int64)
+
+    def grown(array, fill):
+        new = _allocate(state, capacity, bytes_per_node)
+        new[:old] = array
+        new[old:] = fill
+        _release(array)
+        return new
+
+    state['degree'] = grown(state['degree'], 0)
+    for forest in state['forests']:
+        forest['parent'] = grown(forest['parent'], fresh)
+        forest['size'] = grown(forest['size'], 0)
+    state['capacity'] = capacity
+
+def _compact(state):
+    '''
+    Switches from integer labels used as indices to the label table: seen nodes are
+    renumbered 0..n-1 in label order and the node arrays are compacted.
+    '''
+    seen = np.flatnonzero(state['forests'][0]['size'][:state['capacity']] > 0)
+    index = np.zeros(state['capacity'], dtype=np.int64)
+    index[seen] = np.arange(len(seen))
+    state['dense'] = False
+    _table_ids(state, seen.astype(str))
+
+    degree = state['degree'][seen]
+    forests = [(index[forest['parent'][seen]], forest['size'][seen]) for forest in state['forests']]
+    _release(state['degree'])
+    for forest in state['forests']:
+        _release(forest['parent'])
+        _release(forest['size'])
+    state['capacity'] = 0
+    state['degree'] = np.zeros(0, dtype=np.int64)
+    for forest in state['forests']:
+        forest['parent'], forest['size'] = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    _grow(state, len(seen))
+    state['degree'][:len(seen)] = degree
+    for forest, (parent, size) in zip(state['forests'], forests):
+        forest['parent'][:len(seen)] = parent
+        forest['size'][:len(seen)] = size
+
+def _spill_labels(state):
+    '''
+    Moves the label table from a dict to an SQLite file in the spill directory.
+    '''
+    table = sqlite3.connect(os.path.join(_spill(state), 'labels.sqlite'))
+    table.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;"
+                        "CREATE TABLE labels (id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL);"
+                        "CREATE TEMP TABLE chunk (position INTEGER PRIMARY KEY, label TEXT NOT NULL);")
+    table.executemany("INSERT INTO labels VALUES (?, ?)", ((i, label) for label, i in state['labels'].items()))
+    state['table'], state['labels'] = table, {}
+
+def _table_ids(state, unique):
+    '''
+    Indices of distinct labels (a str array) in the label table, adding new labels with
+    the next free indices. The table is a dict until its estimated size exceeds the
+    memory limit, an SQLite file afterwards.
+    '''
+    table = state['table']
+    if table is None:
+        labels = state['labels']
+        ids = np.fromiter((labels.setdefault(label, len(labels)) for label in unique.tolist()),
+                          dtype=np.int64, count=len(unique))
+        added = len(labels) - state['interned']
+        if added:
+            fresh = unique[ids >= state['interned']]
+            state['label_bytes'] += int(np.char.str_len(fresh).sum()) + LABEL_OVERHEAD * added
+        state['interned'] = len(labels)
+        if state['label_bytes'] > state['memory_limit']:
+            _spill_labels(state)
+        return ids
+
+    rows = [(label,) for label in unique.tolist()]
+    state['interned'] += table.executemany("INSERT OR IGNORE INTO labels (label) VALUES (?)", rows).rowcount
+    table.executemany("INSERT INTO chunk (label) VALUES (?)", rows)
+    ids = np.fromiter((i for i, in table.execute("SELECT labels.id FROM chunk JOIN labels USING (label) "
+                                                 "ORDER BY chunk.position")), dtype=np.int64, count=len(rows))
+    table.execute("DELETE FROM chunk")
+    return ids
+
+def intern(state, labels):
+    '''
+    Compact indices of a chunk of node labels, registering new nodes.
+
+    Returns:
+        np.ndarray: int64 index of every label
+    '''
+    if not len(labels):
+        return np.zeros(0, dtype=np.int64)
+    labels = np.asarray(labels)
+    if state['dense']:
+        try:
+            ids = labels.astype(np.int64) if labels.dtype.kind in 'iuU' else None
+        except (ValueError, OverflowError):
+            ids = None
+        # Labels are only used as indices in canonical form ("7", not "007" or "+7")
+        if ids is not None and labels.dtype.kind == 'U' and not np.array_equal(ids.astype(str), labels):
+            ids = None
+        if ids is not None and ids.min() >= 0 and ids.max() < max(DENSE_MIN, DENSE_SLACK * (state['nodes'] + len(ids))):
+            _grow(state, int(ids.max()) + 1)
+            _mark_seen(state, ids)
+            return ids
+        _compact(state)
+
+    unique, inverse = np.unique(labels.astype(str), return_inverse=True)
+    indices = _table_ids(state, unique)
+    _grow(state, state['interned'])
+    _mark_seen(state, indices)
+    return indices[inverse.ravel()]
+
+def _mark_seen(state, indices):
+    new = np.sort(indices[state['forests'][0]['size'][indices] == 0])
+    for forest in state['forests']:
+        forest['size'][new] = 1
+    state['nodes'] += int(np.count_nonzero(new[1:] != new[:-1])) + 1 if len(new) else 0
+
+def _find(parent, nodes):
+    '''
+    Roots of the given nodes, following parent pointers for all of them at once.
+    '''
+    roots = parent[nodes]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            return roots
+        roots = up
+
+def union(forest, src, dst):
+    '''
+    Merges the components joined by a chunk of edges. Only the roots the chunk touches
+    are relabeled (by graph_algorithms.component_labels on the small graph of those
+    roots), every root keeps the smallest index of its component and the chunk's
+    nodes point straight to their root afterwards.
+    '''
+    if not len(src):
+        return
+    parent, size = forest['parent'], forest['size']
+    root_u, root_v = _find(parent, src), _find(parent, dst)
+    joining = root_u != root_v
+    if joining.any():
+        roots, inverse = np.unique(np.concatenate([root_u[joining], root_v[joining]]), return_inverse=True)
+        half = int(joining.sum())
+        merged = roots[component_labels(len(roots), inverse[:half], inverse[half:])]
+        moved = merged != roots
+        np.add.at(size, merged[moved], size[roots[moved]])
+        parent[roots[moved]] = merged[moved]
+    touched = np.concatenate([src, dst])
+    parent[touched] = _find(parent, touched)
+
+def _reservoir_step(run, positions, src, dst):
+    '''
+    Keeps a uniform random sample of `failures` edges out of all edges streamed so far
+    (reservoir sampling). Returns the edges of the chunk that are definitely kept:
+    those never sampled, and those pushed out of the sample by later edges.
+    '''
+    k = len(run['src'])
+    filling = positions < k
+    run['src'][positions[filling]] = src[filling]
+    run['dst'][positions[filling]] = dst[filling]
+    positions, src, dst = positions[~filling], src[~filling], dst[~filling]
+
+    slots = run['rng'].integers(0, positions + 1) if len(positions) else positions
+    accepted = np.flatnonzero(slots < k)
+    if not len(accepted):
+        return src, dst
+
+    # The last accepted edge of each slot stays in the sample
+    reversed_slots = slots[accepted][::-1]
+    taken, last = np.unique(reversed_slots, return_index=True)
+    stays = accepted[len(accepted) - 1 - last]
+    kept = np.ones(len(src), dtype=bool)
+    kept[stays] = False
+    replaced_src, replaced_dst = run['src'][taken].copy(), run['dst'][taken].copy()
+    run['src'][taken], run['dst'][taken] = src[stays], dst[stays]
+    return np.concatenate([src[kept], replaced_src]), np.concatenate([dst[kept], replaced_dst])
+
+def _forest_stats(state, forest):
+    '''
+    Number of components and largest component size of a forest, scanned in blocks.
+    '''
+    components, largest = 0, 0
+    for start in range(0, state['capacity'], SCAN_BLOCK):
+        end = min(start + SCAN_BLOCK, state['capacity'])
+        size = forest['size'][start:end]
+        roots = (forest['parent'][start:end] == np.arange(start, end)) & (size > 0)
+        components += int(roots.sum())
+        largest = max(largest, int(size[roots].max(initial=0)))
+    return components, largest
+
+def _node_labels(state, indices):
+    if state['dense']:
+        return [str(i) for i in indices]
+    if state['table'] is not None:
+        return [state['table'].execute("SELECT label FROM labels WHERE id = ?", (i,)).fetchone()[0] for i in indices]
+    wanted = set(indices)
+    found = {i: label for label, i in state['labels'].items() if i in wanted}
+    return [found[i] for i in indices]
+
+def gml_labels(path, ids):
+    '''
+    Labels of the given GML node ids (as strings), read from the node blocks of the
+    file. Reading stops as soon as all of them are found, which with nodes written
+    before edges (as networkx and graph_io do) is the end of the node section.
+    '''
+    wanted = dict.fromkeys(ids)
+    missing = len(wanted)
+    with _open_text(path, 'r') as f:
+        tokens = _tokenize(f, 1 << 20)
+        next(tokens), next(tokens)
+        for kind, value in tokens:
+            if kind != 'key' or not missing:
+                break
+            if value != 'node':
+                _parse_value(value, *next(tokens), tokens)
+                continue
+            next(tokens)
+            entry = _parse_list(tokens)
+            key = str(entry.get('id'))
+            if key in wanted and wanted[key] is None:
+                wanted[key] = entry.get('label', entry['id'])
+                missing -= 1
+    return [wanted[key] for key in ids]
+
+def stream_graph(path, failures=0, runs=0, seed=None, chunk_size=STREAM_CHUNK, memory_limit=MEMORY_LIMIT, spill_dir=None):
+    '''
+    Structural summary of a graph file in one streaming pass: connected components,
+    isolated nodes, cycle presence (m > n - c), density and degree statistics, and
+    optionally robustness_check-style runs that each remove `failures` random edges.
+    Every edge record counts, so repeated edges in an edge list count as parallel
+    edges (and a cycle), and directed graphs are treated as undirected.
+
+    Arguments:
+        path (str): GML file or edge list (optionally .gz/.bz2)
+        failures (int): number of random edge failures per run
+        runs (int): number of failure runs (0 = no robustness runs)
+        seed (int): seed for the failure runs
+        chunk_size (int): number of edges read per chunk
+        memory_limit (int): node arrays beyond this many bytes are memory-mapped, and a label
+                            table beyond it is moved to an SQLite file
+        spill_dir (str): directory of the spilled files (default: the system temp directory)
+
+    Returns:
+        dict: nodes, edges, components, largest_component, cyclic, isolated (count),
+              isolated_examples (node labels), self_loops, density, degree_min/max/mean and, with runs > 0,
+              'robustness': {'components': [...], 'largest': [...]} (None if there are not enough edges)
+    '''
+    runs = runs if failures > 0 else 0
+    state = _new_state(1 + runs, memory_limit, spill_dir)
+    streams = [{'rng': rng, 'src': np.zeros(failures, dtype=np.int64), 'dst': np.zeros(failures, dtype=np.int64)}
+               for rng in map(np.random.default_rng, np.random.SeedSequence(seed).spawn(runs))]
+    try:
+        for nodes, ends in read_chunks(path, chunk_size):
+            intern(state, nodes)
+            indices = intern(state, ends)
+            src, dst = indices[:len(ends) // 2], indices[len(ends) // 2:]
+
+            ends, counts = np.unique(indices, return_counts=True)
+            state['degree'][ends] += counts
+            state['self_loops'] += int(np.count_nonzero(src == dst))
+            positions = np.arange(state['edges'], state['edges'] + len(src))
+            state['edges'] += len(src)
+
+            union(state['forests'][0], src, dst)
+            for run, forest in zip(streams, state['forests'][1:]):
+                union(forest, *_reservoir_step(run, positions, src, dst))
+
+        summary = _summary(state, failures, runs)
+        if path.endswith(('.gml', '.gml.gz', '.gml.bz2')) and summary['isolated_examples']:
+            summary['isolated_examples'] = gml_labels(path, summary['isolated_examples'])
+        return summary
+    finally:
+        if state['table'] is not None:
+            state['table'].close()
+        if state['spill']:
+            shutil.rmtree(state['spill'], ignore_errors=True)
+
+def _summary(state, failures, runs):
+    n, m = state['nodes'], state['edges']
+    components, largest = _forest_stats(state, state['forests'][0])
+
+    isolated, examples = 0, []
+    degree_min, degree_max, degree_sum = None, 0, 0
+    for start in range(0, state['capacity'], SCAN_BLOCK):
+        end = min(start + SCAN_BLOCK, state['capacity'])
+        seen = state['forests'][0]['size'][start:end] > 0
+        degree = state['degree'][start:end][seen]
+        if not len(degree):
+            continue
+        lonely = np.flatnonzero(seen)[degree == 0] + start
+        isolated += len(lonely)
+        examples += lonely[:ISOLATED_EXAMPLES - len(examples)].tolist()
+        degree_min = int(degree.min()) if degree_min is None else min(degree_min, int(degree.min()))
+        degree_max = max(degree_max, int(degree.max()))
+        degree_sum += int(degree.sum())
+
+    summary = {'nodes': n, 'edges': m, 'components': components, 'largest_component': largest,
+               'cyclic': m > n - components, 'isolated': isolated, 'isolated_examples': _node_labels(state, examples),
+               'self_loops': state['self_loops'], 'density': m / (n * (n - 1) / 2) if n > 1 else 0.0,
+               'degree_min': degree_min or 0, 'degree_max': degree_max, 'degree_mean': degree_sum / n if n else 0.0}
+    if runs:
+        summary['robustness'] = None
+        if m >= failures:
+            stats = [_forest_stats(state, forest) for forest in state['forests'][1:]]
+            summary['robustness'] = {'components': [c for c, _ in stats], 'largest': [size for _, size in stats]}
+    return summary
+
+def print_summary(summary, failures=0):
+    '''
+    Prints a stream_graph summary in the format of graph.py --analyze and robustness_check.
+    '''
+    print(f"Nodes: {summary['nodes']}, Edges: {summary['edges']}")
+    print(f"Number of Connected Components: {summary['components']} (largest: {summary['largest_component']} nodes)")
+    if summary['cyclic']:
+        print("The inputted graph contains cycles.")
+    else:
+        print("The inputted graph does not contain cycles.")
+    examples = ', '.join(map(str, summary['isolated_examples']))
+    more = ', ...' if summary['isolated'] > len(summary['isolated_examples']) else ''
+    print(f"The graph contains {summary['isolated']} isolated nodes" + (f": {examples}{more}." if examples else "."))
+    print(f"Graph Density: {summary['density']:.4f}")
+    print(f"Degree: min {summary['degree_min']}, max {summary['degree_max']}, mean {summary['degree_mean']:.4f}")
+
+    if 'robustness' in summary:
+        robustness = summary['robustness']
+        print(f"\n===== Streaming Robustness Check ({failures} Failures, "
+              f"{len(robustness['components']) if robustness else 0} Runs) =====")
+        if robustness is None:
+            print("Not enough edges to run simulation")
+            return
+        print(f"Average number of connected components: {np.mean(robustness['components']):.2f}")
+        print(f"Max component size over all runs: {max(robustness['largest'])}")
+        print(f"Min components size over all runs: {min(robustness['largest'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming component, cycle, density and robustness analysis of a graph file.')
+    parser.add_argument('graph_file', type=str, help='GML file or edge list (optionally .gz/.bz2)')
+    parser.add_argument('--failures', type=int, default=0, help='Random edge failures per robustness run')
+    parser.add_argument('--runs', type=int, default=10, help='Number of robustness runs')
+    parser.add_argument('--seed', type=int, help='Seed for the robustness runs')
+    parser.add_argument('--chunk_size', type=int, default=STREAM_CHUNK, help='Number of edges read per chunk')
+    parser.add_argument('--memory_limit', type=int, default=MEMORY_LIMIT >> 20, help='Spill node arrays and labels beyond this many MB to disk')
+    parser.add_argument('--spill_dir', type=str, help='Directory for the spilled node arrays and labels')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.graph_file):
+        print(f"Error: File '{args.graph_file}' does not exist")
+        return
+    summary = stream_graph(args.graph_file, args.failures, args.runs, args.seed, args.chunk_size,
+                           args.memory_limit << 20, args.spill_dir)
+    print_summary(summary, args.failures)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import networkx as nx
+import numpy as np
+import hashlib
+import json
+import os
+
+from graph_csr import build_csr
+
+# Bumped whenever the layout algorithms change, so old cached layouts are ignored
+LAYOUT_VERSION = 1
+
+# Graphs with more nodes than this use the NumPy grid force layout instead of nx.spring_layout
+LAYOUT_THRESHOLD = 1000
+
+CACHE_DIR = '.layout_cache'
+
+# Number of cached layouts kept on disk (oldest are removed first)
+CACHE_LIMIT = 32
+
+# Minimum share of nodes a cached layout must have in common to warm-start from it
+WARM_START_OVERLAP = 0.5
+
+def structure_hash(graph, csr=None):
+    '''
+    Hash of a graph's node labels (in order) and adjacency, used as its layout cache key.
+    '''
+    nodes, _, offsets, neighbors = csr if csr is not None else build_csr(graph)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([repr(node) for node in nodes]).encode())
+    digest.update(offsets.tobytes())
+    digest.update(neighbors.tobytes())
+    return digest.hexdigest()
+
+def _params_hash(**params):
+    text = json.dumps(dict(params, version=LAYOUT_VERSION), sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+def _cache_file(cache_dir, params_key, structure_key):
+    return os.path.join(cache_dir, f"{params_key}_{structure_key}.npz")
+
+def _load_positions(path):
+    '''
+    Loads a cached layout as (repr labels, positions), or None if it cannot be read.
+    '''
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return data['labels'], data['positions']
+    except (OSError, KeyError, ValueError):
+        return None
+
+def _save_positions(path, labels, positions):
+    '''
+    Writes a layout to the cache (through a temporary file) and prunes old entries.
+    '''
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, labels=labels, positions=positions)
+        os.replace(path + '.tmp', path)
+
+        entries = sorted((os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.npz')),
+                         key=os.path.getmtime, reverse=True)
+        for old in entries[CACHE_LIMIT:]:
+            os.remove(old)
+    except OSError:
+        pass
+
+def _warm_start(cache_dir, params_key, labels, offsets, neighbors, rng):
+    '''
+    Initial positions from the most recent cached layout (with the same parameters)
+    that shares enough nodes with this graph. Nodes missing from it are placed at the
+    mean position of their placed neighbors, or randomly.
+
+    Returns:
+        np.ndarray: (n, 2) initial positions, or None if no cached layout is close enough
+    '''
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.startswith(params_key + '_')]
+    except OSError:
+        return None
+    paths = sorted((os.path.join(cache_dir, name) for name in names), key=os.path.getmtime, reverse=True)
+
+    for path in paths:
+        cached = _load_positions(path)
+        if cached is None:
+            continue
+        cached_labels, cached_positions = cached
+        if not len(cached_labels):
+            continue
+        order = np.argsort(cached_labels)
+        found = order[np.minimum(np.searchsorted(cached_labels, labels, sorter=order), len(order) - 1)]
+        known = cached_labels[found] == labels
+        if known.mean() < WARM_START_OVERLAP:
+            continue
+
+        positions = np.zeros((len(labels), 2))
+        positions[known] = cached_positions[found[known]]
+        rows = np.repeat(np.arange(len(labels)), np.diff(offsets))
+        for _ in range(3):
+            placed = known[neighbors]
+            counts = np.bincount(rows[placed], minlength=len(labels))
+            sums = np.stack([np.bincount(rows[placed], weights=positions[neighbors[placed], axis],
+                                         minlength=len(labels)) for axis in (0, 1)], axis=1)
+            newly = ~known & (counts > 0)
+            positions[newly] = sums[newly] / counts[newly, None]
+            known = known | newly
+        positions[~known] = rng.uniform(positions[known].min(axis=0), positions[known].max(axis=0),
+                                        size=(len(labels) - known.sum(), 2))
+        return positions
+    return None
+
+def _repulsion_kernel(grid):
+    '''
+    Fourier transforms of the (x, y) repulsion kernel r / |r|^2 on a zero-padded
+    2*grid x 2*grid mesh, in cell units.
+    '''
+    offsets = np.fft.fftfreq(2 * grid, 1 / (2 * grid))
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    distance2 = dx ** 2 + dy ** 2
+    distance2[0, 0] = 1.0
+    kx, ky = dx / distance2, dy / distance2
+    kx[0, 0] = ky[0, 0] = 0.0
+    return np.fft.rfft2(kx), np.fft.rfft2(ky)
+
+def _mesh_repulsion(positions, k, grid, kernel):
+    '''
+    Approximate Fruchterman-Reingold repulsion (k^2 / d between every pair of nodes)
+    with a particle-mesh scheme: node masses are spread bilinearly onto a grid x grid
+    mesh, convolved with the repulsion kernel by FFT and interpolated back, so one
+    evaluation costs O(n + grid^2 log grid) instead of O(n^2).
+    '''
+    low = positions.min(axis=0)
+    cell = max(float(np.ptp(positions, axis=0).max()), 1e-9) / (grid - 1)
+    scaled = (positions - low) / cell
+    base = np.minimum(scaled.astype(np.int64), grid - 2)
+    frac = scaled - base
+
+    # Bilinear (cloud-in-cell) weights of the four surrounding mesh points
+    corners = [(0, 0, (1 - frac[:, 0]) * (1 - frac[:, 1])), (1, 0, frac[:, 0] * (1 - frac[:, 1])),
+               (0, 1, (1 - frac[:, 0]) * frac[:, 1]), (1, 1, frac[:, 0] * frac[:, 1])]
+    size = 2 * grid
+    density = np.zeros(size * size)
+    for ox, oy, weight in corners:
+        density += np.bincount((base[:, 0] + ox) * size + base[:, 1] + oy, weights=weight, minlength=size * size)
+    density = np.fft.rfft2(density.reshape(size, size))
+
+    force = np.zeros_like(positions)
+    for axis, transform in enumerate(kernel):
+        field = np.fft.irfft2(density * transform, s=(size, size)).ravel()
+        for ox, oy, weight in corners:
+            force[:, axis] += field[(base[:, 0] + ox) * size + base[:, 1] + oy] * weight
+    return force * k * k / cell
+
+def force_layout(offsets, neighbors, positions=None, iterations=50, k=None, seed=None, temperature=0.1):
+    '''
+    Fruchterman-Reingold force layout in NumPy for large graphs. Attraction is exact
+    over all edges; repulsion is approximated on a mesh (see _mesh_repulsion), so an
+    iteration costs O(n + m + grid^2 log grid) instead of O(n^2).
+
+    Arguments:
+        offsets (np.ndarray): CSR row offsets
+        neighbors (np.ndarray): CSR neighbor array
+        positions (np.ndarray): optional (n, 2) initial positions (warm start)
+        iterations (int): number of iterations
+        k (float): optimal distance between nodes (default 1 / sqrt(n))
+        seed (int): seed for the random initial positions
+        temperature (float): initial maximum displacement, cooled linearly to 0
+
+    Returns:
+        np.ndarray: (n, 2) positions rescaled to [-1, 1]
+    '''
+    n = len(offsets) - 1
+    rng = np.random.default_rng(seed)
+    positions = rng.random((n, 2)) if positions is None else positions.astype(np.float64)
+    if n < 2:
+        return np.zeros((n, 2))
+    k = 1 / np.sqrt(n) if k is None else k
+    grid = int(2 ** np.clip(np.ceil(np.log2(np.sqrt(n))), 5, 8))
+    kernel = _repulsion_kernel(grid)
+
+    rows = np.repeat(np.arange(n), np.diff(offsets))
+    cols = neighbors.astype(np.int64)
+    proper = rows != cols
+    rows, cols = rows[proper], cols[proper]
+
+    # Positions are kept in a unit box so k and the temperature keep their meaning
+    positions = (positions - positions.min(axis=0)) / np.maximum(np.ptp(positions, axis=0), 1e-9)
+    for step in range(iterations):
+        force = _mesh_repulsion(positions, k, grid, kernel)
+        delta = positions[rows] - positions[cols]
+        distance = np.sqrt((delta ** 2).sum(axis=1))[:, None]
+        pull = delta * distance / k
+        force[:, 0] -= np.bincount(rows, weights=pull[:, 0], minlength=n)
+        force[:, 1] -= np.bincount(rows, weights=pull[:, 1], minlength=n)
+
+        length = np.maximum(np.sqrt((force ** 2).sum(axis=1)), 1e-9)[:, None]
+        t = temperature * (1 - step / iterations)
+        positions += force / length * np.minimum(length, t)
+
+    positions -= positions.mean(axis=0)
+    return positions / max(np.abs(positions).max(), 1e-9)
+
+def get_layout(graph, k=None, seed=None, iterations=50, cache=True, cache_dir=CACHE_DIR):
+    '''
+    Node positions for plotting, served from a disk cache keyed by the graph's
+    structure hash and the layout parameters. On a miss, small graphs use
+    nx.spring_layout and larger ones force_layout; both start from the most recent
+    cached layout of a graph sharing most of the nodes, if any, with fewer iterations.
+
+    Arguments:
+        graph (nx.Graph): graph to lay out
+        k (float): optimal distance between nodes
+        seed (int): seed for the initial positions
+        iterations (int): number of layout iterations for a cold start
+        cache (bool): read and write the layout cache
+        cache_dir (str): directory of the layout cache
+
+    Returns:
+        dict: node -> np.ndarray position
+    '''
+    csr = build_csr(graph)
+    nodes, _, offsets, neighbors = csr
+    labels = np.array([repr(node) for node in nodes], dtype=str)
+    method = 'spring' if len(nodes) <= LAYOUT_THRESHOLD else 'force'
+    params_key = _params_hash(k=k, seed=seed, iterations=iterations, method=method)
+    path = _cache_file(cache_dir, params_key, structure_hash(graph, csr))
+
+    if cache and os.path.exists(path):
+        cached = _load_positions(path)
+        if cached is not None and np.array_equal(cached[0], labels):
+            return dict(zip(nodes, cached[1]))
+
+    rng = np.random.default_rng(seed)
+    initial = _warm_start(cache_dir, params_key, labels, offsets, neighbors, rng) if cache and len(nodes) else None
+    steps = iterations if initial is None else max(1, iterations // 4)
+
+    if method == 'spring':
+        start = None if initial is None else dict(zip(nodes, initial))
+        pos = nx.spring_layout(graph, k=k, seed=seed, pos=start, iterations=steps)
+        positions = np.array([pos[node] for node in nodes]).reshape(len(nodes), 2)
+    else:
+        positions = force_layout(offsets, neighbors, initial, steps, k, seed,
+                                 temperature=0.1 if initial is None else 0.02)
+
+    if cache:
+        _save_positions(path, labels, positions)
+    return dict(zip(nodes, positions))
@@ -1,92 +1,237 @@
 import networkx as nx
 import numpy as np
+import math
 
-def metrics_computation(g):
+import graph_algorithms
+import triangles
+from graph_csr import CompactGraph, build_csr, edge_arrays, expand_frontier
+
+def metrics_computation(g, workers=1):
     '''
     Computes and adds clustering coefficient and neighborhood overlap as node/edge attributes.
+    Both come from one triangle count (see triangles.count_triangles), optionally split
+    across worker processes. A CompactGraph gets them as node/edge columns.
     '''
 
     if g.number_of_nodes() == 0:
         print("Graph empty: No metrics computed")
         return
-    
+
+    nodes, _, offsets, neighbors = build_csr(g)
+    node_triangles, edge_triangles, src, dst = triangles.count_triangles(offsets, neighbors, workers=workers)
+
     # Clustering Coefficient
-    cluster_coef = nx.clustering(g)
-    nx.set_node_attributes(g, cluster_coef, 'clustering_coefficient')
+    cluster_coef, transitivity = triangles.clustering(offsets, neighbors, node_triangles)
+    if isinstance(g, CompactGraph):
+        g.set_node_column('clustering_coefficient', cluster_coef)
+    else:
+        nx.set_node_attributes(g, dict(zip(nodes, cluster_coef.tolist())), 'clustering_coefficient')
     print("Clustering coefficients successfully computed.")
+    print(f"Global transitivity: {transitivity:.4f}")
 
     # Neighborhood Overlap
-    for u, v in g.edges():
-        u_neighbors = set(g.neighbors(u))
-        v_neighbors = set(g.neighbors(v))
-        common = len(u_neighbors.intersection(v_neighbors))
-        all = len(u_neighbors.union(v_neighbors))
-    
-        overlap = common / all if all > 0 else 0.0
-        g.edges[u,v]['neighborhood_overlap'] = overlap
+    overlap = neighborhood_overlap(offsets, src, dst, edge_triangles)
+    if isinstance(g, CompactGraph):
+        # count_triangles numbers edges like CompactGraph.src/dst (graph_csr.edge_index)
+        g.set_edge_column('neighborhood_overlap', overlap)
+    else:
+        edges = zip(map(nodes.__getitem__, src.tolist()), map(nodes.__getitem__, dst.tolist()))
+        nx.set_edge_attributes(g, dict(zip(edges, overlap.tolist())), 'neighborhood_overlap')
     print("Neighborhood overlap computed")
 
-def verify_homophily(g, attribute_key='color'):
+def _incomplete_beta(a, b, x):
+    '''
+    Regularized incomplete beta function I_x(a, b), evaluated with Lentz's
+    continued fraction (used for Student t tail probabilities).
+    '''
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _incomplete_beta(b, a, 1.0 - x)
+
+    tiny = 1e-300
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)) / a
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for i in range(1, 300):
+        for numerator in (i * (b - i) * x / ((a + 2 * i - 1) * (a + 2 * i)),
+                          -(a + i) * (a + b + i) * x / ((a + 2 * i) * (a + 2 * i + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * result
+
+def welch_t_test(a, b):
+    '''
+    Welch's unequal-variance t-test of H1: mean(a) < mean(b).
+
+    Returns:
+        tuple: (t statistic, degrees of freedom, one-sided p-value)
+    '''
+    var_a, var_b = np.var(a, ddof=1) / len(a), np.var(b, ddof=1) / len(b)
+    if var_a + var_b == 0:
+        return 0.0, float('nan'), 0.0 if np.mean(a) < np.mean(b) else 1.0
+    t = float((np.mean(a) - np.mean(b)) / math.sqrt(var_a + var_b))
+    df = float((var_a + var_b) ** 2 / (var_a ** 2 / (len(a) - 1) + var_b ** 2 / (len(b) - 1)))
+    tail = 0.5 * _incomplete_beta(df / 2, 0.5, df / (df + t * t))
+    return t, df, tail if t < 0 else 1.0 - tail
+
+def permutation_test(a, b, rounds=1000, rng=None, batch_size=1 << 22):
+    '''
+    Permutation test of H1: mean(a) < mean(b). The pooled values are shuffled
+    in batches of permutations (about batch_size values at a time).
+
+    Returns:
+        tuple: (observed mean difference, number of rounds, one-sided p-value)
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    pooled = np.concatenate([a, b])
+    observed = float(np.mean(a) - np.mean(b))
+    batch = max(1, min(rounds, batch_size // len(pooled)))
+    extreme = 0
+    for start in range(0, rounds, batch):
+        shuffled = rng.permuted(np.broadcast_to(pooled, (min(batch, rounds - start), len(pooled))), axis=1)
+        differences = shuffled[:, :len(a)].mean(axis=1) - shuffled[:, len(a):].mean(axis=1)
+        extreme += int(np.count_nonzero(differences <= observed + 1e-12))
+    return observed, rounds, (extreme + 1) / (rounds + 1)
+
+def sample_non_edges(n, src, dst, size, rng):
+    '''
+    Draws size distinct node pairs that are not edges, uniformly at random.
+    Random pairs are rejected against a sorted array of edge keys, so memory stays
+    O(n + m); only when non-edges are scarce (a dense graph) are they listed directly.
+
+    Returns:
+        tuple: (u, v) index arrays of the sampled non-edges
+    '''
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    edge_keys = np.unique(lo[lo != hi] * n + hi[lo != hi])
+    available = n * (n - 1) // 2 - len(edge_keys)
+    size = min(size, available)
+    if size <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    if available < 2 * size:
+        u, v = np.triu_indices(n, k=1)
+        keys = u * n + v
+        keys = rng.choice(keys[~np.isin(keys, edge_keys)], size=size, replace=False)
+        return keys // n, keys % n
+
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < size:
+        u = rng.integers(0, n, size=2 * (size - len(keys)) + 16)
+        v = rng.integers(0, n, size=len(u))
+        candidates = np.minimum(u, v) * n + np.maximum(u, v)
+        candidates = candidates[(u != v) & ~np.isin(candidates, edge_keys)]
+        # Duplicates are dropped keeping the first draw, so the order stays random
+        keys = np.concatenate([keys, candidates])
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]
+    keys = keys[:size]
+    return keys // n, keys % n
+
+def neighborhood_overlap(offsets, src, dst, edge_triangles):
+    '''
+    Neighborhood overlap |N(u) & N(v)| / |N(u) | N(v)| of every edge (src[e], dst[e]),
+    from the number of triangles through it (see triangles.count_triangles).
+    '''
+    # Besides the triangles through the edge, N(u) & N(v) holds an endpoint with a
+    # self-loop (a self-loop edge overlaps fully with itself)
+    degrees = np.diff(offsets)
+    looped = np.zeros(len(degrees), dtype=np.int64)
+    looped[src[src == dst]] = 1
+    common = np.where(src == dst, degrees[src], edge_triangles + looped[src] + looped[dst])
+    union = degrees[src] + degrees[dst] - common
+    return np.divide(common, union, out=np.zeros(len(common)), where=union > 0)
+
+def _node_attribute(g, index, key):
+    '''
+    IDs of the nodes that have an attribute, and its values at those nodes.
+    '''
+    if isinstance(g, CompactGraph):
+        column = g.node_column(key)
+        if column is None:
+            return [], []
+        values, present = column
+        ids = np.arange(len(values)) if present is None else np.flatnonzero(present)
+        return ids.tolist(), values[ids].tolist()
+    node_attrs = nx.get_node_attributes(g, key)
+    return [index[node] for node in node_attrs], list(node_attrs.values())
+
+def verify_homophily(g, attribute_key='color', test='welch', rounds=1000, alpha=0.05, seed=None):
     '''
-    Perform homophily check based on the mean attribute differences
+    Perform homophily check based on the mean attribute differences.
+    Numeric attributes are compared between edges and an equally large random sample
+    of non-edges with a one-sided Welch t-test (or a permutation test): homophily means
+    connected nodes differ less than unconnected ones.
     '''
-    node_attrs = nx.get_node_attributes(g, attribute_key)
-    if not node_attrs:
+    nodes, index, src, dst = edge_arrays(g)
+    ids, attr_values = _node_attribute(g, index, attribute_key)
+    if not ids:
         print(f"Nodes lack the '{attribute_key}' attribute. Homophily check failed.")
         return
-    
-    sample_value = list(node_attrs.values())[0]
-    
+
+    sample_value = attr_values[0]
+    rng = np.random.default_rng(seed)
+
     if isinstance(sample_value, (int, float)):
-        connected_diffs = []
-        for u, v in g.edges():
-            if attribute_key in g.nodes[u] and attribute_key in g.nodes[v]:
-                try:
-                    diff = abs(float(g.nodes[u][attribute_key]) - float(g.nodes[v][attribute_key]))
-                    connected_diffs.append(diff)
-                except ValueError:
-                    print(f"Skipping homophily check. Attribute '{attribute_key}' is not consistently numeric.")
-                    return
-    
-        disconnected = list(nx.non_edges(g))
-        samplesize = min(len(disconnected), len(connected_diffs))
-
-        disconnected_diffs = []
-        if samplesize > 0:
-            indices = np.random.choice(len(disconnected), size=samplesize, replace=False)
-            disconnected_samp = [disconnected[i] for i in indices]
-
-            for u, v in disconnected_samp:
-                if attribute_key in g.nodes[u] and attribute_key in g.nodes[v]:
-                    diff = abs(float(g.nodes[u][attribute_key]) - float(g.nodes[v][attribute_key]))
-                    disconnected_diffs.append(diff)
-    
-        if len(connected_diffs) == 0 or len(disconnected_diffs) == 0:
+        # Attribute column, NaN where a node lacks the attribute
+        values = np.full(len(nodes), np.nan)
+        try:
+            for i, value in zip(ids, attr_values):
+                values[i] = float(value)
+        except (TypeError, ValueError):
+            print(f"Skipping homophily check. Attribute '{attribute_key}' is not consistently numeric.")
+            return
+
+        connected_diffs = np.abs(values[src] - values[dst])
+        connected_diffs = connected_diffs[~np.isnan(connected_diffs)]
+
+        u, v = sample_non_edges(len(nodes), src, dst, len(connected_diffs), rng)
+        disconnected_diffs = np.abs(values[u] - values[v])
+        disconnected_diffs = disconnected_diffs[~np.isnan(disconnected_diffs)]
+
+        if len(connected_diffs) < 2 or len(disconnected_diffs) < 2:
             print("Not enough data points for homophily check")
             return
-        
-        conn_diff_mean = np.mean(connected_diffs)
-        unconn_diff_mean = np.mean(disconnected_diffs)
+
+        conn_diff_mean = connected_diffs.mean()
+        unconn_diff_mean = disconnected_diffs.mean()
 
         print("\n===== Homophily Check Results =====")
         print(f"Attribute Key: {attribute_key}")
         print(f"Connected Node Mean Difference: {conn_diff_mean:.4f}")
         print(f"Unconnected Node Mean Difference: {unconn_diff_mean:.4f}")
 
-        if conn_diff_mean > unconn_diff_mean:
+        if test == 'permutation':
+            _, _, p_value = permutation_test(connected_diffs, disconnected_diffs, rounds, rng)
+            print(f"Permutation test: {rounds} rounds, p-value = {p_value:.4g}")
+        else:
+            t, df, p_value = welch_t_test(connected_diffs, disconnected_diffs)
+            print(f"Welch t-test: t = {t:.4f}, df = {df:.1f}, p-value = {p_value:.4g}")
+
+        if p_value < alpha:
             print("Graph shows evidence of homophily")
         else:
             print("Graph does not show evidence of homophily")
     else:
-        # Categorical attributes - check for same attribute values
-        same_attr_count = 0
+        # Categorical attributes - check for same attribute values, compared as integer codes
+        codes = {}
+        column = np.full(len(nodes), -1, dtype=np.int64)
+        for i, value in zip(ids, attr_values):
+            column[i] = codes.setdefault(value, len(codes))
+
         total_edges = g.number_of_edges()
-        
-        for u, v in g.edges():
-            if (attribute_key in g.nodes[u] and attribute_key in g.nodes[v] and 
-                g.nodes[u][attribute_key] == g.nodes[v][attribute_key]):
-                same_attr_count += 1
-        
+        same_attr_count = int(np.count_nonzero((column[src] >= 0) & (column[src] == column[dst])))
+
         homophily_ratio = same_attr_count / total_edges if total_edges > 0 else 0
         
         print("\n===== Homophily Check Results =====")
@@ -99,35 +244,141 @@ def verify_homophily(g, attribute_key='color'):
         else:
             print("Graph does not show evidence of homophily")
 
-def verify_balanced_graph(g, sign_attribute='sign'):
+def _signed_csr(n, src, dst, negative):
+    '''
+    CSR adjacency of an edge list (both directions) with the sign of every entry.
+    '''
+    rows = np.concatenate([src, dst])
+    order = np.argsort(rows, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, np.concatenate([dst, src])[order], np.concatenate([negative, negative])[order]
+
+def balance_coloring(n, src, dst, negative):
     '''
-    Checks if a signed graph is balanced
+    Splits every connected component into two camps in O(n + m): a BFS from each
+    component's smallest node puts a node in the same camp as its discoverer across
+    a positive edge and in the other camp across a negative one. The graph is
+    balanced exactly when no edge contradicts this coloring. Self-loops are ignored.
+
+    Arguments:
+        n (int): number of nodes
+        src (np.ndarray): edge source indices
+        dst (np.ndarray): edge target indices
+        negative (np.ndarray): True for negative edges
+
+    Returns:
+        tuple: (camp of every node (0/1), boolean mask of the conflicting edges)
+    '''
+    offsets, heads, signs = _signed_csr(n, src, dst, negative.astype(np.int64))
+    camps = np.full(n, -1, dtype=np.int64)
+    frontier = np.unique(graph_algorithms.component_labels(n, src, dst))
+    camps[frontier] = 0
+    while frontier.size:
+        tails, targets, positions = expand_frontier(offsets, heads, frontier, positions=True)
+        unvisited = camps[targets] < 0
+        tails, targets, positions = tails[unvisited], targets[unvisited], positions[unvisited]
+        frontier, first = np.unique(targets, return_index=True)
+        camps[frontier] = camps[tails[first]] ^ signs[positions[first]]
+
+    conflicts = (src != dst) & ((camps[src] ^ camps[dst]) != negative)
+    return camps, conflicts
+
+def reduce_frustration(n, src, dst, negative, camps, rounds=100):
+    '''
+    Bounded local search for a coloring with fewer conflicting edges. Each round moves
+    every node that would fix more incident conflicts than it creates and whose gain is
+    the largest in its neighborhood (so no two moved nodes are adjacent), until no move
+    helps or the rounds run out. The final number of conflicts is an upper bound on the
+    frustration index.
+
+    Returns:
+        tuple: (improved camps, boolean mask of the conflicting edges)
+    '''
+    camps = camps.copy()
+    proper = src != dst
+    src, dst, negative = src[proper], dst[proper], negative[proper]
+    for _ in range(rounds):
+        conflicts = (camps[src] ^ camps[dst]) != negative
+        weight = np.where(conflicts, 1, -1)
+        gain = np.bincount(src, weights=weight, minlength=n) + np.bincount(dst, weights=weight, minlength=n)
+
+        # A node moves only if it beats every neighbor (ties broken by index)
+        priority = gain * (n + 1) + np.arange(n)
+        best = priority.copy()
+        np.maximum.at(best, src, priority[dst])
+        np.maximum.at(best, dst, priority[src])
+        moving = (gain > 0) & (best == priority)
+        if not moving.any():
+            break
+        camps[moving] ^= 1
+
+    conflicts = np.zeros(len(proper), dtype=bool)
+    conflicts[proper] = (camps[src] ^ camps[dst]) != negative
+    return camps, conflicts
+
+def _negative_signs(g, sign_attribute):
+    '''
+    Boolean column marking the negative edges of g, in edge_arrays order (missing
+    signs count as positive).
+    '''
+    if isinstance(g, CompactGraph):
+        signs = [1] * g.number_of_edges()
+        column = g.edge_column(sign_attribute)
+        if column is not None:
+            values, present = column
+            ids = np.arange(len(values)) if present is None else np.flatnonzero(present)
+            for i, sign in zip(ids.tolist(), values[ids].tolist()):
+                signs[i] = sign
+    else:
+        signs = (sign for _, _, sign in g.edges(data=sign_attribute, default=1))
+
+    negative = np.zeros(g.number_of_edges(), dtype=bool)
+    for i, sign in enumerate(signs):
+        if isinstance(sign, str):
+            if sign.strip() not in ('+', '-'):
+                sign = float(sign)
+            else:
+                sign = -1 if sign.strip() == '-' else 1
+        negative[i] = sign < 0
+    return negative
+
+def verify_balanced_graph(g, sign_attribute='sign', frustration_rounds=0):
+    '''
+    Checks if a signed graph is balanced, over every connected component.
+    Nodes get a 'camp' attribute (0/1 within their component) and edges a 'frustrated'
+    attribute (1 for edges that contradict the camps). With frustration_rounds > 0 an
+    unbalanced graph's frustration index is estimated by a bounded local search.
     '''
     print(f"\n=== Structural Balance Check with attribute '{sign_attribute}' ===")
     try:
-        g_target = g.subgraph(max(nx.connected_components(g), key=len)).copy() if not nx.is_connected(g) else g
-        is_balanced = _is_balanced(g_target)
-        if is_balanced:
-            print("The graph is structurally balanced.")
-        else:
-            print("The graph is not structurally balanced.")
-    except nx.NetworkXException:
-        print(f"Error: Edges must have the '{sign_attribute}' attribute.")
-    except Exception as e:
-        print(f"An expected error occured: {e}")
+        negative = _negative_signs(g, sign_attribute)
+    except (TypeError, ValueError) as e:
+        print(f"Error: Edge attribute '{sign_attribute}' must be a sign ('+', '-' or a number): {e}")
+        return
 
-def _is_balanced(graph):
-    try:
-        # Check if all cycles have even number of negative edges
-        for cycle in nx.cycle_basis(graph):
-            if len(cycle) > 2:  # Only consider cycles of length 3+
-                negative_count = 0
-                for i in range(len(cycle)):
-                    u, v = cycle[i], cycle[(i + 1) % len(cycle)]
-                    if graph[u][v].get('sign', 1) == -1:
-                        negative_count += 1
-                if negative_count % 2 != 0:
-                    return False
-        return True
-    except:
-        return False
\ No newline at end of file
+    nodes, _, src, dst = edge_arrays(g)
+    camps, conflicts = balance_coloring(len(nodes), src, dst, negative)
+    if conflicts.any() and frustration_rounds > 0:
+        camps, conflicts = reduce_frustration(len(nodes), src, dst, negative, camps, frustration_rounds)
+
+    if isinstance(g, CompactGraph):
+        g.set_node_column('camp', camps)
+        g.set_edge_column('frustrated', conflicts.astype(int))
+    else:
+        nx.set_node_attributes(g, dict(zip(nodes, camps.tolist())), 'camp')
+        edges = zip(map(nodes.__getitem__, src.tolist()), map(nodes.__getitem__, dst.tolist()))
+        nx.set_edge_attributes(g, dict(zip(edges, conflicts.astype(int).tolist())), 'frustrated')
+
+    if not conflicts.any():
+        print("The graph is structurally balanced.")
+        return
+
+    print("The graph is not structurally balanced.")
+    conflicting = np.flatnonzero(conflicts)
+    label = "Frustration index estimate (local search)" if frustration_rounds > 0 else "Conflicting edges"
+    print(f"{label}: {len(conflicting)}")
+    for i in conflicting[:10].tolist():
+        print(f" -> {nodes[src[i]]} -- {nodes[dst[i]]}")
+    if len(conflicting) > 10:
+        print(f" ... and {len(conflicting) - 10} more")
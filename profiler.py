@@ -0,0 +1,146 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+def new_trace(cprofile_stages=(), cprofile_prefix='profile', memory=True):
+    '''
+    Starts a profiling trace that profiler.stage records into.
+
+    Arguments:
+        cprofile_stages (iterable): names of the stages to run under cProfile ('all' for every stage)
+        cprofile_prefix (str): cProfile dumps are written to {prefix}_{stage}.prof
+        memory (bool): measure peak memory with tracemalloc (slows down Python-heavy stages)
+
+    Returns:
+        dict: the trace
+    '''
+    return {'command': sys.argv, 'started': datetime.now().isoformat(timespec='seconds'),
+            'start_wall': time.perf_counter(), 'memory': memory, 'cprofile': set(cprofile_stages),
+            'cprofile_prefix': cprofile_prefix, 'stages': [], 'active': []}
+
+def _cpu_time():
+    '''
+    CPU time of this process plus its finished worker processes.
+    '''
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+def _traced_peak():
+    return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+
+@contextmanager
+def stage(trace, name):
+    '''
+    Measures one stage of a run: wall time, CPU time (including worker processes)
+    and the tracemalloc peak above the memory in use when the stage started.
+    Stages can be nested; a nested stage is recorded with its parent's name.
+    With trace=None nothing is measured.
+
+    Arguments:
+        trace (dict): trace from new_trace, or None
+        name (str): name of the stage
+    '''
+    if trace is None:
+        yield
+        return
+
+    record = {'stage': name, 'parent': trace['active'][-1]['stage'] if trace['active'] else None,
+              'status': 'ok'}
+    trace['stages'].append(record)
+
+    started_tracing = trace['memory'] and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace['active']:
+        # The parent's peak so far is kept before the peak is reset for this stage
+        parent = trace['active'][-1]
+        parent['_peak'] = max(parent['_peak'], _traced_peak())
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    record['_base'] = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    record['_peak'] = 0
+    trace['active'].append(record)
+
+    # Only one cProfile can be active, so stages nested in a profiled stage are part of its dump
+    profile = None
+    if (name in trace['cprofile'] or 'all' in trace['cprofile']) and not trace.get('profiling'):
+        profile = cProfile.Profile()
+        trace['profiling'] = True
+    start_wall, start_cpu = time.perf_counter(), _cpu_time()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    except BaseException as error:
+        record['status'] = 'error'
+        record['error'] = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        if profile is not None:
+            profile.disable()
+            trace['profiling'] = False
+        record['wall'] = time.perf_counter() - start_wall
+        record['cpu'] = _cpu_time() - start_cpu
+
+        trace['active'].pop()
+        peak = max(record.pop('_peak'), _traced_peak())
+        base = record.pop('_base')
+        record['peak_mb'] = (peak - base) / 2 ** 20 if tracemalloc.is_tracing() else None
+        if trace['active']:
+            parent = trace['active'][-1]
+            parent['_peak'] = max(parent['_peak'], peak)
+        if started_tracing:
+            tracemalloc.stop()
+
+        if profile is not None:
+            path = f"{trace['cprofile_prefix']}_{name.replace(' ', '_')}.prof"
+            profile.dump_stats(path)
+            record['cprofile'] = path
+
+def summary(trace):
+    '''
+    Prints the stages of a trace as a table, nested stages indented under their parent.
+    '''
+    total = time.perf_counter() - trace['start_wall']
+    print(f"\n===== Profile ({total:.3f}s total) =====")
+    print(f"{'Stage':<32} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak (MB)':>10} {'Share':>7}")
+    depth = {}
+    for record in trace['stages']:
+        depth[record['stage']] = depth.get(record['parent'], -1) + 1 if record['parent'] else 0
+        label = '  ' * depth[record['stage']] + record['stage']
+        peak = f"{record['peak_mb']:10.1f}" if record['peak_mb'] is not None else f"{'-':>10}"
+        share = record['wall'] / total * 100 if total > 0 else 0.0
+        line = f"{label:<32} {record['wall']:10.3f} {record['cpu']:10.3f} {peak} {share:6.1f}%"
+        if record['status'] != 'ok':
+            line += f"  ({record['error']})"
+        print(line)
+    for record in trace['stages']:
+        if 'cprofile' in record:
+            print(f"cProfile of '{record['stage']}' saved to {record['cprofile']}")
+
+def write_trace(trace, path):
+    '''
+    Writes a trace as JSON: the command line, the start time, the total wall time
+    and one entry per stage (in start order).
+    '''
+    report = {'command': trace['command'], 'started': trace['started'],
+              'total_wall': time.perf_counter() - trace['start_wall'], 'stages': trace['stages']}
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Profile trace saved to {path}")
+
+def report(trace, path=None):
+    '''
+    Prints the summary table of a trace and writes it to path (if given).
+    Does nothing with trace=None.
+    '''
+    if trace is None:
+        return
+    summary(trace)
+    if path:
+        write_trace(trace, path)
@@ -0,0 +1,343 @@
+'''
+Persistent analysis server: loads a graph once, keeps it (and its CSR adjacency,
+structural summary, BFS trees and triangle counts) in memory, and answers queries
+with JSON over HTTP on 127.0.0.1 or over a Unix socket.
+
+Examples:
+    python server.py graph.gml --port 8765
+    curl 'http://127.0.0.1:8765/bfs?source=0&target=42'
+    python server.py graph.gml --socket /tmp/graph.sock
+    curl --unix-socket /tmp/graph.sock 'http://localhost/components?node=7'
+
+Queries (GET):
+    /info                                   graph size and load time
+    /components[?node=x]                    components, isolates, cycles, density, degrees
+    /bfs?source=a[&source=b][&target=t]     BFS depth profile, and distance/path to targets
+    /metrics[?node=x][&u=a&v=b]             transitivity, node clustering, edge overlap
+    /path_length[?samples=K&seed=S]         average shortest path (largest component)
+    /betweenness[?k=K&seed=S&top=10]        most central nodes
+    /homophily[?attribute=color&test=welch&seed=S]
+    /robustness?failures=k[&runs=10&seed=S]
+    /failures?k=K[&path_samples=..&betweenness_samples=..&seed=S]
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import socketserver
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import centrality
+import graph_algorithms
+import graph_io
+import triangles
+from metrics import neighborhood_overlap, verify_homophily
+from simulation import failure_sim, robustness_check
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Number of BFS trees kept in memory
+BFS_CACHE_SIZE = 16
+
+def load_state(graph_file, cache=True, workers=1, graph=None):
+    '''
+    Loads a graph (unless an already loaded one is given) and precomputes what every
+    query needs: the CSR adjacency and the structural summary (which also labels
+    component_id).
+
+    Returns:
+        dict: server state
+    '''
+    start = time.perf_counter()
+    if graph is None:
+        graph = graph_io.readGraph(graph_file, cache=cache, signed=True)
+    summary = graph_algorithms.structural_summary(graph)
+    return {'file': graph_file, 'graph': graph, 'summary': summary, 'csr': summary['csr'],
+            'workers': workers, 'bfs': {}, 'triangles': None, 'load_time': time.perf_counter() - start}
+
+def _quiet(function, *args, **kwargs):
+    '''
+    Calls a function with its printed output captured.
+
+    Returns:
+        tuple: (return value, list of printed lines)
+    '''
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        result = function(*args, **kwargs)
+    return result, [line for line in output.getvalue().splitlines() if line.strip()]
+
+def _jsonable(value):
+    '''
+    Converts NumPy values for JSON; infinite or NaN floats become null.
+    '''
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+def _param(params, name, kind=str, default=None, required=False):
+    if name not in params:
+        if required:
+            raise ValueError(f"missing parameter '{name}'")
+        return default
+    try:
+        return kind(params[name][0])
+    except ValueError:
+        raise ValueError(f"parameter '{name}' must be {kind.__name__}")
+
+def _node(state, label):
+    '''
+    Index of a node given by its label (string labels first, then integers).
+    '''
+    index = state['csr'][1]
+    if label in index:
+        return index[label]
+    with contextlib.suppress(ValueError):
+        if int(label) in index:
+            return index[int(label)]
+    raise KeyError(f"node '{label}' not found")
+
+def _bfs(state, source):
+    '''
+    BFS tree of one source, from the cache or computed with graph_algorithms.bfs_arrays.
+    '''
+    cache = state['bfs']
+    if source in cache:
+        cache[source] = cache.pop(source)
+    else:
+        _, _, offsets, neighbors = state['csr']
+        cache[source] = graph_algorithms.bfs_arrays(offsets, neighbors, source)
+        while len(cache) > BFS_CACHE_SIZE:
+            del cache[next(iter(cache))]
+    return cache[source]
+
+def _triangles(state):
+    '''
+    Triangle counts, clustering coefficients and edge overlaps, computed on first use.
+    '''
+    if state['triangles'] is None:
+        _, _, offsets, neighbors = state['csr']
+        node_triangles, edge_triangles, src, dst = triangles.count_triangles(offsets, neighbors, workers=state['workers'])
+        coefficients, transitivity = triangles.clustering(offsets, neighbors, node_triangles)
+        n = len(offsets) - 1
+        keys = src.astype(np.int64) * n + dst
+        order = np.argsort(keys)
+        state['triangles'] = {'nodes': node_triangles, 'clustering': coefficients, 'transitivity': transitivity,
+                              'overlap': neighborhood_overlap(offsets, src, dst, edge_triangles)[order],
+                              'keys': keys[order], 'edge_triangles': edge_triangles[order]}
+    return state['triangles']
+
+def query_info(state, params):
+    graph = state['graph']
+    return {'file': state['file'], 'nodes': graph.number_of_nodes(), 'edges': graph.number_of_edges(),
+            'load_time': state['load_time']}
+
+def query_components(state, params):
+    summary = state['summary']
+    result = {key: summary[key] for key in ('nodes', 'edges', 'components', 'cyclic', 'self_loops', 'density',
+                                            'degree_min', 'degree_max', 'degree_mean')}
+    result['largest_components'] = summary['component_sizes'][:10].tolist()
+    result['isolated'] = len(summary['isolated'])
+    label = _param(params, 'node')
+    if label is not None:
+        labels = summary['labels']
+        i = _node(state, label)
+        result['node'] = {'node': label, 'component_id': state['graph'].nodes[state['csr'][0][i]]['component_id'],
+                          'component_size': int(np.count_nonzero(labels == labels[i]))}
+    return result
+
+def query_bfs(state, params):
+    nodes = state['csr'][0]
+    targets = params.get('target', [])
+    results = []
+    for label in params.get('source', []) or [None]:
+        if label is None:
+            raise ValueError("missing parameter 'source'")
+        distances, parents = _bfs(state, _node(state, label))
+        reached = distances[distances >= 0]
+        result = {'source': label, 'reached': int(reached.size), 'depth': int(reached.max()),
+                  'levels': np.bincount(reached).tolist(), 'targets': []}
+        for target in targets:
+            t = _node(state, target)
+            path = []
+            if distances[t] >= 0:
+                while t >= 0:
+                    path.append(nodes[t])
+                    t = int(parents[t])
+                path.reverse()
+            result['targets'].append({'target': target, 'distance': len(path) - 1 if path else None, 'path': path})
+        results.append(result)
+    return {'bfs': results}
+
+def query_metrics(state, params):
+    counts = _triangles(state)
+    result = {'transitivity': counts['transitivity'], 'average_clustering': float(counts['clustering'].mean())
+              if len(counts['clustering']) else 0.0}
+    label = _param(params, 'node')
+    if label is not None:
+        i = _node(state, label)
+        offsets = state['csr'][2]
+        result['node'] = {'node': label, 'degree': int(offsets[i + 1] - offsets[i]),
+                          'triangles': int(counts['nodes'][i]), 'clustering': float(counts['clustering'][i])}
+    if 'u' in params or 'v' in params:
+        u, v = _node(state, _param(params, 'u', required=True)), _node(state, _param(params, 'v', required=True))
+        key = min(u, v) * len(counts['nodes']) + max(u, v)
+        position = int(np.searchsorted(counts['keys'], key))
+        if position == len(counts['keys']) or counts['keys'][position] != key:
+            raise KeyError(f"edge ({params['u'][0]}, {params['v'][0]}) not found")
+        result['edge'] = {'u': params['u'][0], 'v': params['v'][0], 'triangles': int(counts['edge_triangles'][position]),
+                          'neighborhood_overlap': float(counts['overlap'][position])}
+    return result
+
+def query_path_length(state, params):
+    return graph_algorithms.average_path_length(state['graph'], samples=_param(params, 'samples', int),
+                                                workers=state['workers'], seed=_param(params, 'seed', int),
+                                                csr=state['csr'], labels=state['summary']['labels'])
+
+def query_betweenness(state, params):
+    scores = centrality.betweenness_centrality(state['graph'], k=_param(params, 'k', int), seed=_param(params, 'seed', int),
+                                               workers=state['workers'], csr=state['csr'])
+    top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:_param(params, 'top', int, 10)]
+    return {'top': [[node, value] for node, value in top]}
+
+def query_homophily(state, params):
+    _, output = _quiet(verify_homophily, state['graph'], attribute_key=_param(params, 'attribute', str, 'color'),
+                       test=_param(params, 'test', str, 'welch'), seed=_param(params, 'seed', int))
+    return {'output': output}
+
+def query_robustness(state, params):
+    result, output = _quiet(robustness_check, state['graph'], _param(params, 'failures', int, required=True), 0,
+                            num_sims=_param(params, 'runs', int, 10), workers=state['workers'], seed=_param(params, 'seed', int))
+    if result is None:
+        return {'output': output}
+    counts, largest = result
+    return {'components_mean': float(np.mean(counts)), 'largest_component_max': int(max(largest)),
+            'largest_component_min': int(min(largest)), 'output': output}
+
+def query_failures(state, params):
+    _, output = _quiet(failure_sim, state['graph'], _param(params, 'k', int, required=True),
+                       path_samples=_param(params, 'path_samples', int), workers=state['workers'],
+                       seed=_param(params, 'seed', int), betweenness_samples=_param(params, 'betweenness_samples', int))
+    return {'output': output}
+
+QUERIES = {
+    '/info': query_info,
+    '/components': query_components,
+    '/bfs': query_bfs,
+    '/metrics': query_metrics,
+    '/path_length': query_path_length,
+    '/betweenness': query_betweenness,
+    '/homophily': query_homophily,
+    '/robustness': query_robustness,
+    '/failures': query_failures,
+}
+
+def make_handler(state, verbose=False):
+    '''
+    Request handler answering the QUERIES on the given state. Requests are served
+    one at a time, so queries never see the graph while another one changes it.
+    '''
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = QUERIES.get(url.path.rstrip('/') or '/info')
+            if query is None:
+                return self._send(404, {'error': f"unknown query '{url.path}'", 'queries': sorted(QUERIES)})
+            start = time.perf_counter()
+            try:
+                result = query(state, parse_qs(url.query))
+            except (KeyError, ValueError) as error:
+                return self._send(400, {'error': str(error).strip("'\"")})
+            except Exception as error:
+                return self._send(500, {'error': f"{type(error).__name__}: {error}"})
+            result['time'] = time.perf_counter() - start
+            self._send(200, result)
+
+        def _send(self, status, body):
+            data = json.dumps(_jsonable(body), default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            # Unix socket clients have no address
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+    return QueryHandler
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    '''
+    HTTPServer counterpart listening on a Unix socket.
+    '''
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+def create_server(state, port=PORT, socket_path=None, verbose=False):
+    '''
+    Creates (without starting) the server for a loaded state: HTTP on 127.0.0.1:port,
+    or on a Unix socket when socket_path is given (any stale socket file is replaced).
+    '''
+    handler = make_handler(state, verbose)
+    if socket_path:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return HTTPServer((HOST, port), handler)
+
+def serve(graph_file, port=PORT, socket_path=None, cache=True, workers=1, verbose=False, graph=None):
+    '''
+    Loads the graph (or takes the given one) and serves queries until interrupted (Ctrl+C).
+    '''
+    print(f"Preparing {graph_file} for queries ...")
+    state = load_state(graph_file, cache=cache, workers=workers, graph=graph)
+    graph = state['graph']
+    print(f"Graph ready in {state['load_time']:.2f}s: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+
+    server = create_server(state, port, socket_path, verbose)
+    where = f"unix socket {socket_path}" if socket_path else f"http://{HOST}:{server.server_address[1]}"
+    print(f"Serving queries on {where} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    finally:
+        server.server_close()
+        if socket_path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(socket_path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load a graph once and answer analysis queries with JSON.')
+    parser.add_argument('graph_file', type=str, help='Path to the .gml graph file')
+    parser.add_argument('--port', type=int, default=PORT, help='HTTP port on 127.0.0.1')
+    parser.add_argument('--socket', type=str, help='Listen on this Unix socket instead of a TCP port')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for parallel computations')
+    parser.add_argument('--no_cache', action='store_true', help='Always parse the .gml file instead of using its binary snapshot')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.graph_file):
+        print(f"Error: File '{args.graph_file}' does not exist")
+        return
+    serve(args.graph_file, args.port, args.socket, cache=not args.no_cache, workers=args.workers, verbose=args.verbose)
+
+if __name__ == '__main__':
+    main()
@@ -1,72 +1,153 @@
-import networkx as nx
 import random
 import numpy as np
+from multiprocessing import Pool
 
-def _calculate_metrics(g):
+import centrality
+import graph_algorithms
+from graph_csr import CompactGraph, edge_arrays
+
+def _calculate_metrics(g, path_samples=None, workers=1, seed=None, betweenness_samples=None):
     '''
-    Calculates key metrics for comparison
+    Calculates key metrics for comparison.
+    The average shortest path is measured on the largest component, exactly or
+    from path_samples sampled BFS sources. Betweenness is exact or estimated from
+    betweenness_samples pivots; results for an unchanged structure are reused.
+    All three share one CSR adjacency and one component labeling.
     '''
     if g.number_of_nodes() == 0:
-        return 'N/A', 0, {}
+        return None, 0, {}
     
-    conn = nx.is_connected(g)
-    avg_path = nx.average_shortest_path_length(g) if conn else 'Disconnected'
-    comps = nx.number_connected_components(g)
-    betweenness = nx.betweenness_centrality(g)
+    summary = graph_algorithms.structural_summary(g, store=False)
+    csr = summary['csr']
+    avg_path = graph_algorithms.average_path_length(g, samples=path_samples, workers=workers, seed=seed,
+                                                    csr=csr, labels=summary['labels'])
+    comps = summary['components']
+    betweenness = centrality.betweenness_centrality(g, k=betweenness_samples, seed=seed, workers=workers, csr=csr)
     return avg_path, comps, betweenness
 
-def failure_sim(g, k):
+def failure_sim(g, k, path_samples=None, workers=1, seed=None, betweenness_samples=None):
     '''
     Randomly removes k edges and analyzes the impact on network.
+    With a seed, the removed edges are reproducible and repeated simulations on the
+    same graph reuse its centrality.
+    A CompactGraph is copied without the removed edges instead of through networkx.
     '''
-    original_avg, original_comps, original_betweenness = _calculate_metrics(g)
+    # Both graphs sample the same sources/pivots so the estimates are comparable
+    seed = random.randrange(2**32) if seed is None else seed
+    rng = random.Random(seed)
+    original_avg, original_comps, original_betweenness = _calculate_metrics(g, path_samples, workers, seed, betweenness_samples)
 
-    g_copy = g.copy()
-    remove_edges = random.sample(list(g_copy.edges()), k)
-    g_copy.remove_edges_from(remove_edges)
+    if isinstance(g, CompactGraph):
+        g_copy = g.without_edges(rng.sample(range(g.number_of_edges()), k))
+    else:
+        g_copy = g.copy()
+        remove_edges = rng.sample(list(g_copy.edges()), k)
+        g_copy.remove_edges_from(remove_edges)
 
-    new_avg, new_comps, new_betweenness = _calculate_metrics(g_copy)
+    new_avg, new_comps, new_betweenness = _calculate_metrics(g_copy, path_samples, workers, seed, betweenness_samples)
 
     print(f"Original Connected Components: {original_comps}")
     print(f"New Connected Components: {new_comps}")
 
-    if original_avg != 'Disconnected' and new_avg != 'Disconnected':
-        path_change = (new_avg - original_avg) / original_avg * 100
-        print(f"Average Shortest Path Change: {path_change:.2f}%")
+    if original_avg is not None and new_avg is not None and original_avg['value'] > 0:
+        path_change = (new_avg['value'] - original_avg['value']) / original_avg['value'] * 100
+        print(f"Average Shortest Path Change (largest component): {path_change:.2f}%")
+        if not (original_avg['exact'] and new_avg['exact']):
+            print(f"  Original: {original_avg['value']:.4f} ± {original_avg['error']:.4f}, "
+                  f"New: {new_avg['value']:.4f} ± {new_avg['error']:.4f} (95% CI, {path_samples} sampled sources)")
     else:
-        print("Average Shortest Path: N/A (disconnected graph).")
+        print("Average Shortest Path: N/A (no paths in graph).")
 
-    bc_diffs = {node: original_betweenness.get(node, 0) - new_betweenness.get(node, 0) for node in g.nodes()}
+    bc_diffs = {node: original_betweenness.get(node, 0) - new_betweenness.get(node, 0) for node in original_betweenness}
     max_nodes_drop = max(bc_diffs, key=bc_diffs.get) if bc_diffs else 'N/A'
     print(f"Node with Max Betweenness Centrality Drop: {max_nodes_drop}")
     print(f"Drop: {bc_diffs.get(max_nodes_drop, 0):.4f}")
 
-def robustness_check(g, num_fails, num_comps, num_sims=10):
+def _failure_sets(rng, m, k, runs):
+    '''
+    Draws k distinct edge indices for each of the runs as one (runs, k) array,
+    using the k smallest of m random keys per run.
+    '''
+    if k == 0:
+        return np.empty((runs, 0), dtype=np.int64)
+    keys = rng.random((runs, m))
+    return np.argpartition(keys, k - 1, axis=1)[:, :k]
+
+def _simulate_failures(n, src, dst, num_fails, runs, seed):
     '''
-    Performs multiple simulations of k random edge failures and reports robustness
+    Runs a batch of random edge-failure simulations without copying the graph.
+    All runs of a batch are stacked into one block-diagonal edge list (run r uses
+    node indices r*n .. r*n + n - 1) and labeled by a single array-based union-find.
+
+    Returns:
+        tuple: (component counts, largest component sizes), one entry per run
+    '''
+    rng = np.random.default_rng(seed)
+    m = len(src)
+    counts, largest = [], []
+
+    # Batches keep the (runs x edges) key matrix and the (runs x nodes) labels around 16M entries
+    batch = max(1, min(runs, (1 << 24) // max(m, n, 1)))
+    for start in range(0, runs, batch):
+        size = min(batch, runs - start)
+        keep = np.ones((size, m), dtype=bool)
+        np.put_along_axis(keep, _failure_sets(rng, m, num_fails, size), False, axis=1)
+
+        run_ids, edge_ids = np.nonzero(keep)
+        labels = graph_algorithms.component_labels(size * n, src[edge_ids] + run_ids * n, dst[edge_ids] + run_ids * n)
+        sizes = np.bincount(labels, minlength=size * n).reshape(size, n)
+        counts.extend(np.count_nonzero(sizes, axis=1).tolist())
+        largest.extend(sizes.max(axis=1, initial=0).tolist())
+    return counts, largest
+
+# Edge arrays shared with robustness worker processes
+_robustness_graph = {}
+
+def _attach_edges(n, src, dst):
+    _robustness_graph.update(n=n, src=src, dst=dst)
+
+def _robustness_task(task):
+    num_fails, runs, seed = task
+    return _simulate_failures(_robustness_graph['n'], _robustness_graph['src'], _robustness_graph['dst'], num_fails, runs, seed)
+
+def robustness_check(g, num_fails, num_comps, num_sims=10, workers=1, seed=None):
+    '''
+    Performs multiple simulations of k random edge failures and reports robustness.
+    The edge list is kept as index arrays, every run's failure set is drawn as a
+    NumPy index array, and components are counted with an array-based union-find,
+    so the graph is never copied. With workers > 1 the runs are split across a
+    process pool (each worker receives the edge arrays once).
     '''
     print(f"\n===== Running Robustness Check ({num_fails} Failures, {num_sims} Runs) =====")
-    comp_counts = []
-    max_comp_sizes = []
 
     if g.number_of_edges() < num_fails:
         print("Not enough edges to run simulation")
         return
-    
-    for _ in range(num_sims):
-        g_temp = g.copy()
-        edges_remove = random.sample(list(g_temp.edges()), num_fails)
-        g_temp.remove_edges_from(edges_remove)
+    if num_sims < 1:
+        print("At least one run is needed for the simulation")
+        return
+
+    nodes, _, src, dst = edge_arrays(g)
 
-        comps = list(nx.connected_components(g_temp))
-        comp_counts.append(len(comps))
+    # Independent, reproducible random streams for each chunk of runs
+    chunks = max(1, min(num_sims, workers))
+    runs = [num_sims // chunks + (i < num_sims % chunks) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    tasks = [(num_fails, r, s) for r, s in zip(runs, seeds)]
+
+    if workers > 1 and chunks > 1:
+        with Pool(processes=chunks, initializer=_attach_edges, initargs=(len(nodes), src, dst)) as pool:
+            results = pool.map(_robustness_task, tasks)
+    else:
+        results = [_simulate_failures(len(nodes), src, dst, *task) for task in tasks]
 
-        comp_size = [len(c) for c in comps]
-        max_comp_sizes.append(max(comp_size) if comp_size else 0)
+    comp_counts = [count for counts, _ in results for count in counts]
+    max_comp_sizes = [size for _, sizes in results for size in sizes]
 
     print(f"Average number of connected components: {np.mean(comp_counts):.2f}")
     print(f"Max component size over all runs: {max(max_comp_sizes)}")
     print(f"Min components size over all runs: {min(max_comp_sizes)}")
 
     if num_comps and max(comp_counts) > 1:
-        print(f"Note: The high component count suggests that the network's structure is vulnerable to {num_fails} failures.")
\ No newline at end of file
+        print(f"Note: The high component count suggests that the network's structure is vulnerable to {num_fails} failures.")
+    return comp_counts, max_comp_sizes
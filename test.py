@@ -1,7 +1,27 @@
+import io
+import json
 import networkx as nx
+import numpy as np
+import os
+import benchmark
 import graph_io
 import graph_algorithms
+import graph_cache
+import graph_csr
+import graph_generator
+import graph_stream
+import centrality
+import detect_community
 import graph_analysis  # Import the graph_analysis module
+import layout
+import metrics
+import profiler
+import server
+import simulation
+import triangles
+import visualization
+import visualizerBFS
+from graph_csr import CompactGraph, build_csr
 import pytest
 
 def test_io():
@@ -40,10 +60,578 @@ def test_algorithms():
     
     # Test Cycle Detection
     g_cycle = nx.cycle_graph(4)  # Creates a 4-node cycle
-    num_comp_cycle = graph_algorithms.connectedComp(g_cycle)
-    assert graph_algorithms.findCycles(g_cycle, num_comp_cycle), "Cycle detection test failed."
+    assert graph_algorithms.findCycles(g_cycle), "Cycle detection test failed."
+    assert not graph_algorithms.findCycles(nx.path_graph(4)), "Cycle detection test failed for a tree."
     print("Cycle detection test passed.")
 
+def test_structural_summary():
+    print("\n--- Testing fused structural summary ---")
+
+    # A triangle, a path, an isolated node and a self-loop on a lone node
+    g = nx.Graph([('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'e')])
+    g.add_node('f')
+    g.add_edge('g', 'g')
+    summary = graph_algorithms.structural_summary(g)
+    assert summary['components'] == 4 and summary['component_sizes'].tolist() == [3, 2, 1, 1]
+    assert summary['cyclic'] and summary['isolated'] == ['f'] and summary['self_loops'] == 1
+    assert summary['edges'] == 5 and summary['density'] == nx.density(g)
+    assert (summary['degree_min'], summary['degree_max']) == (0, 2)
+    assert [g.nodes[v]['component_id'] for v in 'abcdefg'] == [0, 0, 0, 1, 1, 2, 3]
+
+    # A forest has exactly n - c edges; the self-loop alone makes the graph cyclic
+    g.remove_edge('c', 'a')
+    assert graph_algorithms.findCycles(g)
+    g.remove_edge('g', 'g')
+    assert not graph_algorithms.findCycles(g)
+    print("Structural summary test passed.")
+
+def test_bfs_arrays():
+    print("\n--- Testing array-backed BFS ---")
+
+    # Unreachable nodes keep inf/None attributes and -1 in the arrays
+    g = nx.Graph()
+    nx.add_path(g, ['0', '1', '2'])
+    g.add_node('3')
+    results = graph_algorithms.multi_BFS(g, ['x', '1'])
+    assert 0 not in results, "Missing start node should be skipped."
+    distances, parents = results[1]
+    assert distances.tolist() == [1, 0, 1, -1], "BFS distance array test failed."
+    assert parents.tolist() == [1, -1, 1, -1], "BFS parent array test failed."
+    assert g.nodes['3']['distance_1'] == float('inf') and g.nodes['3']['parent_1'] is None
+    assert g.nodes['0']['parent_1'] == '1'
+    print("Array-backed BFS test passed.")
+
+def test_streaming_read(tmp_path):
+    print("\n--- Testing streaming GML reader ---")
+
+    # Tiny chunks force tokens to be split across chunk boundaries
+    path = tmp_path / "stream.gml"
+    path.write_text('graph [\n  name "demo"\n  node [\n    id 0\n    label "a"\n    distance_0 inf\n  ]\n'
+                    '  node [\n    id 1\n    label "b"\n    weight 2.5\n  ]\n'
+                    '  edge [\n    source 0\n    target 1\n    sign "-"\n  ]\n]\n')
+    g = graph_io.readGraph(str(path), chunk_size=3)
+    assert list(g.nodes()) == ['a', 'b']
+    assert g.nodes['a']['distance_0'] == 999999999 and g.nodes['b']['weight'] == 2.5
+    assert g.edges['a', 'b']['sign'] == '-' and g.graph['name'] == 'demo'
+
+    # A real split inside its exponent is still read whole
+    tokens = list(graph_io._tokenize(io.StringIO('x' * 59 + ' 1.5e+3'), 64))
+    assert tokens[1] == ('real', 1500.0)
+
+    # Malformed input fails at once instead of buffering the rest of the file
+    f = io.StringIO('graph [\n  node [ id 0 ] @\n' + '  node [ id 1 ]\n' * 10000 + ']\n')
+    with pytest.raises(nx.NetworkXError):
+        list(graph_io._tokenize(f, 256))
+    assert f.tell() <= 256
+    print("Streaming reader test passed.")
+
+def test_write_compressed(tmp_path):
+    print("\n--- Testing GML writer with edge attributes and compression ---")
+    g = nx.Graph()
+    g.add_edge('A', 'B', sign=-1, neighborhood_overlap=0.5)
+    g.nodes['A']['distance_0'] = float('inf')
+    g.nodes['B']['parent_0'] = 'A'
+    for name in ("out.gml", "out.gml.gz", "out.gml.bz2"):
+        path = str(tmp_path / name)
+        assert graph_io.writeGraph(g, path)
+        read_g = graph_io.readGraph(path)
+        assert read_g.edges['A', 'B'] == {'sign': -1, 'neighborhood_overlap': 0.5}
+        assert read_g.nodes['A']['distance_0'] == 999999999 and read_g.nodes['B']['parent_0'] == 'A'
+    print("Writer test passed.")
+
+def test_snapshot_cache(tmp_path):
+    print("\n--- Testing binary snapshot cache ---")
+    path = str(tmp_path / "cached.gml")
+    g = nx.Graph()
+    g.add_edge('A', 'B', sign='-')
+    g.add_edge('B', 'C', sign='+')
+    g.nodes['A']['color'] = 'r'
+    graph_io.writeGraph(g, path)
+
+    parsed = graph_io.readGraph(path, cache=True, signed=True)
+    cached = graph_io.readGraph(path, cache=True, signed=True)
+    assert list(cached.nodes(data=True)) == list(parsed.nodes(data=True))
+    assert list(cached.edges(data=True)) == list(parsed.edges(data=True))
+    assert cached.edges['A', 'B']['sign'] == -1
+
+    # A touched but unchanged source is matched by its hash once, then by its new mtime
+    graph_cache.save_snapshot(parsed, path)
+    os.utime(path, ns=(0, 10 ** 18))
+    assert graph_cache.load_compact(path) is not None
+    with np.load(graph_cache.snapshot_path(path)) as data:
+        assert data['source'][1] == 10 ** 18
+
+    # Warm loads keep each record's attribute order, so rewritten files are identical
+    ordered = str(tmp_path / "ordered.gml")
+    with open(ordered, 'w') as f:
+        f.write('graph [\n  node [ id 0 label "a" w 2 color "g" ]\n  node [ id 1 label "b" color "r" w 1 ]\n'
+                '  edge [ source 0 target 1 sign 1 weight 3 ]\n  edge [ source 1 target 1 weight 2 sign -1 ]\n]\n')
+    outputs = []
+    for _ in range(2):
+        output = str(tmp_path / f"ordered_{len(outputs)}.gml")
+        graph_io.writeGraph(graph_io.readGraph(ordered, cache=True), output)
+        outputs.append(open(output, 'rb').read())
+    assert outputs[0] == outputs[1]
+
+    # Changing the source file invalidates the snapshot
+    g.add_edge('C', 'D')
+    graph_io.writeGraph(g, path)
+    assert graph_io.readGraph(path, cache=True).has_edge('C', 'D')
+    print("Snapshot cache test passed.")
+
+def test_random_graph():
+    print("\n--- Testing Erdos-Renyi generator ---")
+    g = graph_generator.erdos_renyi_graph(200, 0.05, seed=1)
+    assert set(g.nodes()) == {str(i) for i in range(200)}
+    assert list(g.edges()) == list(graph_generator.erdos_renyi_graph(200, 0.05, seed=1).edges())
+    assert graph_generator.erdos_renyi_graph(6, 1.0).number_of_edges() == 15
+    assert graph_generator.erdos_renyi_graph(6, 0).number_of_edges() == 0
+    print("Random graph test passed.")
+
+def test_average_path_length():
+    print("\n--- Testing exact and sampled average shortest path ---")
+
+    # Disconnected graphs are measured on their largest component
+    g = nx.disjoint_union(nx.path_graph(5), nx.path_graph(2))
+    result = graph_analysis.avgShortestPath(g)
+    assert result['exact'] and abs(result['value'] - 2.0) < 1e-9 and result['nodes'] == 5
+
+    g = nx.connected_watts_strogatz_graph(400, 6, 0.1, seed=1)
+    exact = nx.average_shortest_path_length(g)
+    estimate = graph_analysis.avgShortestPath(g, samples=60, seed=2)
+    assert not estimate['exact'] and estimate['sources'] == 60
+    assert abs(estimate['value'] - exact) <= 3 * estimate['error']
+
+    # A sample needs two BFS sources to bound its error
+    for samples in (0, 1):
+        with pytest.raises(ValueError):
+            graph_analysis.avgShortestPath(g, samples=samples)
+    print("Average shortest path test passed.")
+
+def test_robustness_engine(capsys):
+    print("\n--- Testing vectorized robustness simulation ---")
+
+    # Removing every edge of a path leaves only isolated nodes
+    g = nx.path_graph(6)
+    counts, largest = simulation.robustness_check(g, 5, 2, num_sims=4, seed=1)
+    assert counts == [6] * 4 and largest == [1] * 4
+
+    counts, largest = simulation.robustness_check(nx.cycle_graph(10), 1, 2, num_sims=5, workers=2, seed=1)
+    assert counts == [1] * 5 and largest == [10] * 5
+
+    # Sparse graphs with many nodes are batched by node count as well
+    counts, _ = simulation.robustness_check(nx.empty_graph(1 << 17), 0, 2, num_sims=300, seed=1)
+    assert counts == [1 << 17] * 300
+
+    # A seeded failure simulation removes the same edges every time
+    g = nx.gnm_random_graph(60, 120, seed=3)
+    capsys.readouterr()
+    outputs = []
+    for _ in range(2):
+        simulation.failure_sim(g, 20, seed=4)
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+    print("Robustness engine test passed.")
+
+def test_betweenness():
+    print("\n--- Testing betweenness centrality ---")
+    g = nx.barbell_graph(5, 2)
+    expected = nx.betweenness_centrality(g)
+    for workers in (1, 2):
+        result = centrality.betweenness_centrality(g, workers=workers, cache=False)
+        assert all(abs(result[v] - expected[v]) < 1e-9 for v in g)
+
+    # Sampled pivots give the same values as exact when every node is a pivot
+    result = centrality.betweenness_centrality(g, k=g.number_of_nodes(), seed=1)
+    assert all(abs(result[v] - expected[v]) < 1e-9 for v in g)
+
+    # A single pivot cannot estimate its own score
+    with pytest.raises(ValueError):
+        centrality.betweenness_centrality(g, k=1, seed=1)
+    print("Betweenness centrality test passed.")
+
+def test_partition_graph():
+    print("\n--- Testing incremental Girvan-Newman ---")
+    g = nx.karate_club_graph()
+    iterator = nx.community.girvan_newman(g)
+    for _ in range(3):
+        expected = next(iterator)
+    assert detect_community.girvan_newman(g, 4) == expected
+
+    detect_community.partition_graph(g, 4)
+    assert {g.nodes[node]['community_id'] for node in g} == {0, 1, 2, 3}
+    print("Incremental Girvan-Newman test passed.")
+
+def test_neighborhood_overlap():
+    print("\n--- Testing vectorized neighborhood overlap ---")
+    g = nx.karate_club_graph()
+    g.add_edges_from([(0, 0), (5, 5)])
+    metrics.metrics_computation(g)
+    for u, v in g.edges():
+        a, b = set(g.neighbors(u)), set(g.neighbors(v))
+        assert abs(g.edges[u, v]['neighborhood_overlap'] - len(a & b) / len(a | b)) < 1e-12
+    print("Neighborhood overlap test passed.")
+
+def test_triangles():
+    print("\n--- Testing triangle counting engine ---")
+    g = nx.karate_club_graph()
+    g.add_edge(1, 1)
+    nodes, _, offsets, neighbors = build_csr(g)
+    for workers in (1, 2):
+        node_triangles, edge_triangles, src, dst = triangles.count_triangles(offsets, neighbors, workers=workers)
+        assert dict(zip(nodes, node_triangles.tolist())) == nx.triangles(g)
+        assert edge_triangles[(src == 0) & (dst == 1)].tolist() == [len(set(g[0]) & set(g[1]) - {0, 1})]
+
+    coefficients, transitivity = triangles.clustering(offsets, neighbors, node_triangles)
+    expected = nx.clustering(g)
+    assert all(abs(coefficients[i] - expected[node]) < 1e-12 for i, node in enumerate(nodes))
+    assert abs(transitivity - nx.transitivity(g)) < 1e-12
+    print("Triangle counting test passed.")
+
+def test_homophily_sampling():
+    print("\n--- Testing homophily non-edge sampling and tests ---")
+    rng = np.random.default_rng(1)
+    src, dst = np.array([0, 1, 2]), np.array([1, 2, 3])
+    u, v = metrics.sample_non_edges(5, src, dst, 100, rng)
+    assert sorted(zip(u.tolist(), v.tolist())) == [(0, 2), (0, 3), (0, 4), (1, 3), (1, 4), (2, 4), (3, 4)]
+
+    # Student t with 2 degrees of freedom has a closed-form CDF
+    assert abs(metrics._incomplete_beta(1.0, 0.5, 2 / 6) / 2 - (0.5 - 1 / 6 ** 0.5)) < 1e-12
+    t, _, p_value = metrics.welch_t_test(np.array([0.0, 1.0, 0.0, 1.0]), np.array([3.0, 4.0, 5.0, 4.0]))
+    assert t < 0 and p_value < 0.01
+    print("Homophily sampling test passed.")
+
+def test_structural_balance():
+    print("\n--- Testing structural balance ---")
+    # Two balanced components, then one negative triangle in the second
+    g = nx.Graph()
+    g.add_edge('A', 'B', sign=-1)
+    g.add_edge('C', 'D', sign=1)
+    g.add_edge('D', 'E', sign=-1)
+    g.add_edge('C', 'E', sign=-1)
+    metrics.verify_balanced_graph(g)
+    assert g.nodes['A']['camp'] != g.nodes['B']['camp']
+    assert g.nodes['C']['camp'] == g.nodes['D']['camp'] != g.nodes['E']['camp']
+    assert not any(nx.get_edge_attributes(g, 'frustrated').values())
+
+    g['C']['E']['sign'] = 1
+    metrics.verify_balanced_graph(g, frustration_rounds=10)
+    assert sum(nx.get_edge_attributes(g, 'frustrated').values()) == 1
+    print("Structural balance test passed.")
+
+def test_temporal_replay(tmp_path):
+    print("\n--- Testing headless temporal replay ---")
+    events_file = tmp_path / "events.csv"
+    events_file.write_text("timestamp,source,target,action\n"
+                           "10,A,B,add\n2,A,C,add\n10.5,A,B,remove\n3,C,D,add\n4,A,C,remove\n11,B,D,add\n")
+    events = visualization.load_events(str(events_file), chunk_size=2)
+    assert events['time'].tolist() == [2, 3, 4, 10, 10.5, 11]
+
+    g = nx.Graph()
+    visualization.apply_events(g, events, 0, 5)
+    assert sorted(map(sorted, g.edges())) == [['C', 'D']]
+
+    # Endpoints of an edge added and removed within one batch exist as after one-at-a-time replay
+    one_by_one = nx.Graph()
+    for i in range(5):
+        visualization.apply_events(one_by_one, events, i, i + 1)
+    assert list(g.nodes()) == list(one_by_one.nodes()) == ['A', 'C', 'D', 'B']
+
+    visualization.temporal_sim(nx.Graph(), str(events_file), output=str(tmp_path / "frames"), frame_interval=4)
+    assert sorted(p.name for p in (tmp_path / "frames").iterdir()) == ["frame_00000.png", "frame_00001.png"]
+    print("Temporal replay test passed.")
+
+def test_layout_cache(tmp_path):
+    print("\n--- Testing layout cache ---")
+    cache_dir = str(tmp_path / "layouts")
+    g = nx.karate_club_graph()
+    first = layout.get_layout(g, seed=1, cache_dir=cache_dir)
+    again = layout.get_layout(g, seed=1, cache_dir=cache_dir)
+    assert all((first[node] == again[node]).all() for node in g)
+
+    # A slightly changed graph starts from the cached positions
+    g.add_edge(0, 'new')
+    warm = layout.get_layout(g, seed=1, cache_dir=cache_dir)
+    assert set(warm) == set(g) and len(list((tmp_path / "layouts").iterdir())) == 2
+
+    # Large graphs use the NumPy mesh force layout
+    nodes, _, offsets, neighbors = build_csr(nx.grid_2d_graph(40, 40))
+    positions = layout.force_layout(offsets, neighbors, seed=1, iterations=20)
+    assert positions.shape == (1600, 2) and abs(positions).max() <= 1.0 + 1e-9
+    print("Layout cache test passed.")
+
+def test_plot_graph(tmp_path):
+    """Test batched and rasterized plotting to files without a GUI."""
+    print("\n--- Testing Plot Rendering ---")
+    # A horizontal segment covers one pixel per column of its row
+    segments = np.array([[[0.0, 0.0], [1.0, 0.0]]])
+    density, mean = visualization.rasterize_edges(segments, np.ones(1), np.full(1, 2.0), (0, 1, 0, 1), resolution=8)
+    assert density[0].tolist() == [1.0] * 8 and density[1:].sum() == 0
+    assert np.all(mean[0] == 2.0)
+
+    g = nx.karate_club_graph()
+    metrics.metrics_computation(g)
+    for plot_type, threshold in (('N', visualization.RASTER_THRESHOLD), ('N', 0), ('C', 0)):
+        output = tmp_path / f"{plot_type}_{threshold}.png"
+        visualization.plot_graph(g, plot_type, output=str(output), raster_threshold=threshold)
+        assert output.stat().st_size > 0
+    print("Plot rendering test passed.")
+
+def test_bfs_tree_layout(tmp_path, monkeypatch):
+    """Test the layered BFS tree layout and reuse of stored BFS attributes."""
+    print("\n--- Testing BFS Tree Layout ---")
+    # Depth 0 holds the root and unreachable nodes; deeper levels follow their parents
+    depths = np.array([0, 1, 1, 2, 2, 0])
+    parents = np.array([-1, 0, 0, 2, 1, -1])
+    positions = visualizerBFS.layered_positions(depths, parents, spacing=1.5)
+    assert positions[:, 0].tolist() == [0.0, 1.5, 1.5, 3.0, 3.0, 0.0]
+    assert positions[:, 1].tolist() == [-1.0, -1.0, 0.0, 0.0, -1.0, 0.0]
+
+    g = nx.path_graph(5)
+    csr = build_csr(g)
+    results = graph_algorithms.multi_BFS(g, [2], csr=csr)
+    stored = visualizerBFS._stored_BFS(g, csr[1], 0, 2)
+    assert stored[0].tolist() == results[0][0].tolist() and stored[1].tolist() == results[0][1].tolist()
+    assert visualizerBFS._stored_BFS(g, csr[1], 0, 3) is None
+
+    # Unreachable nodes are written as INF_VALUE and must stay unreachable when read back
+    g.add_node(5)
+    graph_algorithms.multi_BFS(g, [2])
+    path = str(tmp_path / "bfs.gml")
+    graph_io.writeGraph(g, path)
+    g = graph_io.readGraph(path)
+    depths, _ = visualizerBFS._stored_BFS(g, build_csr(g)[1], 0, '2')
+    assert depths.max() == 2 and depths.min() == -1
+    monkeypatch.setattr(visualizerBFS.plt, 'show', lambda: None)
+    visualizerBFS.plotBFStree(g, ['2'], ['5'])
+    visualizerBFS.plt.close('all')
+    print("BFS tree layout test passed.")
+
+def test_benchmark():
+    """Test the seeded benchmark graphs and the baseline comparison."""
+    print("\n--- Testing Benchmark Suite ---")
+    for kind in benchmark.GRAPH_KINDS:
+        g = benchmark.make_graph(kind, 300, seed=3)
+        assert g.number_of_nodes() == 300 and nx.number_of_selfloops(g) == 0
+        assert nx.utils.graphs_equal(g, benchmark.make_graph(kind, 300, seed=3)), "Benchmark graphs must be reproducible."
+
+    results = benchmark.run_benchmarks([200], ['community'], ['connectedComp', 'partition_graph'], memory=True)
+    assert [r['status'] for r in results] == ['ok', 'ok'] and results[0]['peak_mb'] is not None
+
+    # A slower run is only a regression above both the relative and the absolute threshold
+    baseline = [dict(results[0], wall=1.0), dict(results[1], wall=results[1]['wall'] / 10)]
+    current = [dict(results[0], wall=1.1), dict(results[1], wall=results[1]['wall'] + 1.0)]
+    regressions = benchmark.compare_results(current, baseline)
+    assert [r['benchmark'] for r in regressions] == ['partition_graph']
+
+    # Benchmarks that passed before and now fail or did not run are regressions too
+    baseline.append(dict(results[0], benchmark='removed'))
+    current[0] = dict(current[0], status='error', error='RuntimeError: boom')
+    regressions = benchmark.compare_results(current, baseline)
+    assert [(r['benchmark'], r['status']) for r in regressions] == [
+        (results[0]['benchmark'], 'error'), ('partition_graph', 'ok'), ('removed', 'missing')]
+    assert benchmark.compare_results(current[1:], baseline, names=['partition_graph']) == [current[1]]
+    print("Benchmark suite test passed.")
+
+def test_profiler(tmp_path):
+    """Test per-stage profiling with nested stages, failures and cProfile dumps."""
+    print("\n--- Testing Stage Profiler ---")
+    with profiler.stage(None, 'ignored'):
+        pass
+
+    trace = profiler.new_trace(['inner'], cprofile_prefix=str(tmp_path / "run"))
+    with profiler.stage(trace, 'outer'):
+        with profiler.stage(trace, 'inner'):
+            data = np.ones(1 << 20)
+        del data
+    with pytest.raises(ValueError):
+        with profiler.stage(trace, 'failing'):
+            raise ValueError("bad input")
+
+    outer, inner, failing = trace['stages']
+    assert inner['parent'] == 'outer' and outer['parent'] is None
+    assert inner['peak_mb'] >= 8.0 and outer['peak_mb'] >= inner['peak_mb']
+    assert outer['wall'] >= inner['wall'] and failing['status'] == 'error'
+    assert (tmp_path / "run_inner.prof").exists() and 'cprofile' not in outer
+
+    profiler.report(trace, str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json") as f:
+        assert [record['stage'] for record in json.load(f)['stages']] == ['outer', 'inner', 'failing']
+    print("Stage profiler test passed.")
+
+def test_server():
+    """Test queries against an in-memory analysis server."""
+    print("\n--- Testing Analysis Server ---")
+    import threading
+    import urllib.error
+    import urllib.request
+
+    g = nx.Graph([(0, 1), (1, 2), (2, 0), (2, 3), (4, 5)])
+    httpd = server.create_server(server.load_state('memory', graph=g), port=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    def query(path):
+        with urllib.request.urlopen(url + path) as response:
+            return json.load(response)
+    try:
+        assert query('/info')['nodes'] == 6
+        bfs = query('/bfs?source=0&target=3&target=5')['bfs'][0]
+        assert bfs['levels'] == [1, 2, 1] and bfs['targets'][0]['path'] == [0, 2, 3]
+        assert bfs['targets'][1]['distance'] is None
+        assert query('/components?node=5')['node']['component_size'] == 2
+        metrics_result = query('/metrics?node=2&u=0&v=1')
+        assert metrics_result['node']['triangles'] == 1 and metrics_result['edge']['neighborhood_overlap'] == 1 / 3
+        with pytest.raises(urllib.error.HTTPError) as error:
+            query('/bfs?source=9')
+        assert error.value.code == 400
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    print("Analysis server test passed.")
+
+def test_batch_analysis(tmp_path, monkeypatch):
+    """Test analyzing a directory of graphs in a process pool with a combined report."""
+    print("\n--- Testing Batch Analysis ---")
+    import csv
+    import sys
+
+    graph_io.writeGraph(nx.path_graph(4), str(tmp_path / "path.gml"))
+    graph_io.writeGraph(nx.cycle_graph(5), str(tmp_path / "cycle.gml"))
+    (tmp_path / "broken.gml").write_text("graph [")
+    assert graph_analysis.expand_graph_files([str(tmp_path), str(tmp_path / "*.gml")]) == \
+        [str(tmp_path / name) for name in ("broken.gml", "cycle.gml", "path.gml")]
+
+    report = tmp_path / "report.csv"
+    monkeypatch.setattr(sys, 'argv', ['graph_analysis.py', str(tmp_path), '--jobs', '2', '--no_cache',
+                                      '--output', str(tmp_path / "out" / "result.gml"), '--report', str(report)])
+    graph_analysis.main()
+
+    with open(report) as f:
+        rows = {row['file']: row for row in csv.DictReader(f)}
+    assert rows[str(tmp_path / "broken.gml")]['status'] == 'error'
+    cycle = rows[str(tmp_path / "cycle.gml")]
+    assert cycle['status'] == 'ok' and cycle['edges'] == '5' and cycle['cyclic'] == 'True'
+    assert rows[str(tmp_path / "path.gml")]['cyclic'] == 'False'
+    assert (tmp_path / "out" / "result_path.gml").exists() and (tmp_path / "out" / "result_cycle.gml").exists()
+    print("Batch analysis test passed.")
+
+def test_stream_graph(tmp_path, capsys):
+    """Test the streaming summary against the in-memory one, with chunks and spilled arrays."""
+    print("\n--- Testing Streaming Analysis ---")
+    g = nx.gnm_random_graph(200, 180, seed=4)
+    g.add_node(500)
+    expected = graph_algorithms.structural_summary(g, store=False)
+    lines = ["# source target"] + [f"{u},{v}" if u % 3 else f"{u} {v}" for u, v in g.edges()] + [str(v) for v in g]
+    (tmp_path / "edges.txt").write_text("\n".join(lines))
+    graph_io.writeGraph(g, str(tmp_path / "graph.gml"))
+
+    for path, memory_limit in ((tmp_path / "edges.txt", 0), (tmp_path / "graph.gml", graph_stream.MEMORY_LIMIT)):
+        summary = graph_stream.stream_graph(str(path), chunk_size=16, memory_limit=memory_limit)
+        for key in ('nodes', 'edges', 'components', 'cyclic', 'self_loops', 'degree_max'):
+            assert summary[key] == expected[key], key
+        assert summary['isolated'] == len(expected['isolated'])
+        assert set(summary['isolated_examples']) <= set(map(str, expected['isolated']))
+        assert summary['largest_component'] == expected['component_sizes'][0]
+
+    # Every failure on a path splits off one more component
+    (tmp_path / "path.txt").write_text("\n".join(f"v{i} v{i + 1}" for i in range(49)))
+    summary = graph_stream.stream_graph(str(tmp_path / "path.txt"), failures=4, runs=5, seed=2, chunk_size=8)
+    assert summary['components'] == 1 and not summary['cyclic']
+    assert summary['robustness']['components'] == [5] * 5
+
+    # GML nodes are reported by label, and "007" and "7" are different nodes
+    g = nx.Graph([("alice", "bob"), ("bob", "dave")])
+    g.add_node("carol")
+    graph_io.writeGraph(g, str(tmp_path / "named.gml"))
+    assert graph_stream.stream_graph(str(tmp_path / "named.gml"))['isolated_examples'] == ["carol"]
+    (tmp_path / "padded.txt").write_text("007 7\n7 8\n9\n")
+    summary = graph_stream.stream_graph(str(tmp_path / "padded.txt"))
+    assert (summary['nodes'], summary['components'], summary['isolated_examples']) == (4, 2, ["9"])
+
+    # Non-numeric labels spill to an SQLite table past the memory limit, without printing
+    (tmp_path / "words.txt").write_text("".join(f"u{i} v{i}\n" for i in range(50)) + "lone\n")
+    for memory_limit in (0, graph_stream.MEMORY_LIMIT):
+        capsys.readouterr()
+        summary = graph_stream.stream_graph(str(tmp_path / "words.txt"), chunk_size=7, memory_limit=memory_limit)
+        assert (summary['nodes'], summary['components'], summary['isolated_examples']) == (101, 51, ["lone"])
+        assert capsys.readouterr().out == ""
+    print("Streaming analysis test passed.")
+
+def test_compact_graph(tmp_path, capsys):
+    """Test the array-backed graph against networkx: round trip, snapshot load, BFS, summary, metrics and failures."""
+    print("\n--- Testing Compact Graph ---")
+    g = nx.relabel_nodes(nx.gnm_random_graph(120, 300, seed=5), str)
+    g.add_node("iso", color="red")
+    nx.set_edge_attributes(g, 2.5, "weight")
+    compact = CompactGraph.from_networkx(g)
+    h = compact.to_networkx()
+    assert list(h.nodes(data=True)) == list(g.nodes(data=True))
+    assert list(h.edges(data=True)) == list(g.edges(data=True))
+    assert all(list(h.adj[u]) == list(g.adj[u]) for u in g)
+    assert compact.index["7"] == list(g).index("7") and 7 not in compact
+
+    graph_io.writeGraph(g, str(tmp_path / "graph.gml"))
+    graph_io.readGraph(str(tmp_path / "graph.gml"), cache=True)
+    loaded = graph_io.readGraph(str(tmp_path / "graph.gml"), cache=True, compact=True)
+    assert list(loaded.to_networkx().edges(data=True)) == list(g.edges(data=True))
+
+    # Hot paths write the same values as columns that they write as nx attributes
+    graph_algorithms.multi_BFS(compact, ["0"])
+    graph_algorithms.multi_BFS(g, ["0"])
+    expected = graph_algorithms.structural_summary(g)
+    summary = graph_algorithms.structural_summary(compact)
+    assert summary['isolated'] == expected['isolated'] and summary['components'] == expected['components']
+    metrics.metrics_computation(compact)
+    metrics.metrics_computation(g)
+    h = compact.to_networkx()
+    for node, data in g.nodes(data=True):
+        for key in ('distance_0', 'component_id', 'clustering_coefficient'):
+            assert h.nodes[node][key] == pytest.approx(data[key])
+    assert all(h.edges[e]['neighborhood_overlap'] == pytest.approx(g.edges[e]['neighborhood_overlap']) for e in g.edges)
+
+    # Homophily and balance checks read and write columns, with the same results
+    nx.set_node_attributes(g, {node: int(node) % 3 for node in g if node != "iso"}, "score")
+    nx.set_edge_attributes(g, {e: -1 for e in list(g.edges)[::7]}, "sign")
+    compact = CompactGraph.from_networkx(g)
+    outputs = []
+    for graph in (g, compact):
+        capsys.readouterr()
+        metrics.verify_homophily(graph, 'score', seed=1)
+        metrics.verify_homophily(graph, 'color')
+        metrics.verify_balanced_graph(graph, frustration_rounds=5)
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+    assert list(compact.to_networkx().nodes(data=True)) == list(g.nodes(data=True))
+    assert list(compact.to_networkx().edges(data=True)) == list(g.edges(data=True))
+
+    # Written files match byte for byte, also with unreachable nodes and attributes set twice
+    g = nx.relabel_nodes(nx.gnm_random_graph(60, 40, seed=2), str)
+    for roots in (["0", "1"], ["2", "0"]):
+        compact = CompactGraph.from_networkx(g)
+        graph_algorithms.multi_BFS(compact, roots)
+        graph_algorithms.multi_BFS(g, roots)
+        graph_io.writeGraph(g, str(tmp_path / "nx.gml"))
+        graph_io.writeGraph(compact, str(tmp_path / "compact.gml"))
+        assert (tmp_path / "nx.gml").read_bytes() == (tmp_path / "compact.gml").read_bytes()
+        g = graph_io.readGraph(str(tmp_path / "nx.gml"))
+    compact = CompactGraph.from_networkx(g)
+
+    reduced = compact.without_edges([0, 1, 2])
+    assert reduced.number_of_edges() == g.number_of_edges() - 3
+    assert simulation.robustness_check(compact, 10, 1, 3, seed=1) == simulation.robustness_check(g, 10, 1, 3, seed=1)
+
+    # Contradictory neighbor orders still give every edge an insertion position
+    offsets, neighbors = np.array([0, 2, 4, 6]), np.array([1, 2, 2, 0, 0, 1])
+    order = graph_csr.insertion_order(offsets, neighbors, np.array([0, 0, 1]), np.array([1, 2, 2]))
+    assert sorted(order.tolist()) == [0, 1, 2]
+
+    # 16 bytes of CSR and edge arrays per edge
+    large = graph_generator.erdos_renyi_graph(20000, 0.001, seed=1, compact=True)
+    assert large.neighbors.nbytes + large.src.nbytes + large.dst.nbytes == 16 * large.number_of_edges()
+    print("Compact graph test passed.")
+
 def test_file_not_found():
     """Test that graph_io.read_graph raises an error for a non-existent file."""
     print("\n--- Testing File Not Found Error Handling ---")
@@ -58,7 +646,7 @@ def test_metrics():
     # Test Case 1: A complete graph (density should be 1.0)
     print("\nTesting a complete graph...")
     g_complete = nx.complete_graph(5)
-    density_complete = graph_analysis.get_graph_density(g_complete)
+    density_complete = graph_analysis.graph_density(g_complete)
     assert density_complete == 1.0, f"Density of complete graph is incorrect. Expected 1.0, got {density_complete}"
     print("Density test for complete graph passed.")
 
@@ -66,25 +654,25 @@ def test_metrics():
     print("\nTesting a disconnected graph...")
     g_disconnected = nx.Graph()
     g_disconnected.add_nodes_from(['A', 'B', 'C'])
-    density_disconnected = graph_analysis.get_graph_density(g_disconnected)
+    density_disconnected = graph_analysis.graph_density(g_disconnected)
     assert density_disconnected == 0.0, f"Density of disconnected graph is incorrect. Expected 0.0, got {density_disconnected}"
     print("Density test for disconnected graph passed.")
 
     # Test Case 3: A path graph (connected, avg shortest path is predictable)
     print("\nTesting a path graph for average shortest path length...")
     g_path = nx.path_graph(5)
-    avg_path_path = graph_analysis.get_average_shortest_path_length(g_path)
+    avg_path_path = graph_analysis.avgShortestPath(g_path)['value']
     assert abs(avg_path_path - 2.0) < 1e-9, f"Avg path length for path graph is incorrect. Expected 2.0, got {avg_path_path}"
     print("Average shortest path test for path graph passed.")
 
-    # Test Case 4: A disconnected graph (avg shortest path should be 'N/A')
+    # Test Case 4: A disconnected graph (avg shortest path is measured on the largest component)
     print("\nTesting a disconnected graph for average shortest path...")
     g_disconnected_path = nx.Graph()
     g_disconnected_path.add_nodes_from(['A', 'B'])
     g_disconnected_path.add_nodes_from(['C', 'D'])
     g_disconnected_path.add_edge('A', 'B')
-    avg_path_disconnected = graph_analysis.get_average_shortest_path_length(g_disconnected_path)
-    assert avg_path_disconnected == "N/A (graph is not connected)", f"Avg path length for disconnected graph is incorrect. Expected 'N/A', got {avg_path_disconnected}"
+    avg_path_disconnected = graph_analysis.avgShortestPath(g_disconnected_path)
+    assert avg_path_disconnected['value'] == 1.0 and avg_path_disconnected['nodes'] == 2, f"Avg path length for disconnected graph is incorrect. Expected 1.0 on 2 nodes, got {avg_path_disconnected}"
     print("Average shortest path test for disconnected graph passed.")
 
 def guide_visualization_test():
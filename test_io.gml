@@ -0,0 +1,22 @@
+graph [
+  node [
+    id 0
+    label "A"
+  ]
+  node [
+    id 1
+    label "B"
+  ]
+  node [
+    id 2
+    label "C"
+  ]
+  edge [
+    source 0
+    target 1
+  ]
+  edge [
+    source 1
+    target 2
+  ]
+]
@@ -2,123 +2,345 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import time
 import numpy as np
+import contextlib
 import csv
+import itertools
+import os
+from datetime import datetime
+from matplotlib import animation
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cm import ScalarMappable
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LinearSegmentedColormap, ListedColormap, Normalize
+from matplotlib.figure import Figure
 
-def plot_graph(g, plot_type):
+import layout
+
+# Node labels are only drawn for graphs up to this size
+LABEL_LIMIT = 200
+
+# Graphs with more edges than this have their edges rasterized into a pixel buffer
+RASTER_THRESHOLD = 100000
+RASTER_RESOLUTION = 1024
+
+def rasterize_edges(segments, weights, values, extent, resolution=RASTER_RESOLUTION, batch_size=1 << 22):
+    '''
+    Rasterizes line segments straight into a NumPy pixel buffer: every segment is
+    sampled once per pixel along its longer axis, and the samples are accumulated
+    with bincount in batches.
+
+    Arguments:
+        segments (np.ndarray): (m, 2, 2) segment end points
+        weights (np.ndarray): weight (e.g. line width) of every segment
+        values (np.ndarray): color value of every segment
+        extent (tuple): (x0, x1, y0, y1) of the image
+        resolution (int): image width and height in pixels
+
+    Returns:
+        tuple: (density, mean value) images of shape (resolution, resolution),
+               with row 0 at the bottom
+    '''
+    x0, x1, y0, y1 = extent
+    scale = np.array([(resolution - 1) / max(x1 - x0, 1e-12), (resolution - 1) / max(y1 - y0, 1e-12)])
+    pixels = (segments - np.array([x0, y0])) * scale
+    lengths = np.ceil(np.abs(pixels[:, 1] - pixels[:, 0]).max(axis=1)).astype(np.int64) + 1
+
+    density = np.zeros(resolution * resolution)
+    value_sum = np.zeros(resolution * resolution)
+    work = np.cumsum(lengths)
+    start = 0
+    while start < len(segments):
+        done = work[start - 1] if start else 0
+        end = max(int(np.searchsorted(work, done + batch_size, side='right')), start + 1)
+        counts = lengths[start:end]
+        owner = np.repeat(np.arange(start, end), counts)
+        step = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = (step / np.maximum(np.repeat(counts, counts) - 1, 1))[:, None]
+        points = np.rint(pixels[owner, 0] + t * (pixels[owner, 1] - pixels[owner, 0])).astype(np.int64)
+        index = np.clip(points[:, 1], 0, resolution - 1) * resolution + np.clip(points[:, 0], 0, resolution - 1)
+        density += np.bincount(index, weights=weights[owner], minlength=len(density))
+        value_sum += np.bincount(index, weights=weights[owner] * values[owner], minlength=len(density))
+        start = end
+
+    mean = np.divide(value_sum, density, out=np.zeros_like(density), where=density > 0)
+    return density.reshape(resolution, resolution), mean.reshape(resolution, resolution)
+
+def _draw_edges(ax, segments, widths, values, colors, cmap, norm, alpha, raster):
+    '''
+    Draws all edges as one LineCollection, or as a rasterized density image whose
+    color is the weighted mean edge value and whose opacity grows with density.
+
+    Returns:
+        the artist carrying the edge color mapping (for a colorbar)
+    '''
+    if not raster:
+        lines = LineCollection(segments, linewidths=widths, alpha=alpha, zorder=1)
+        if colors is None:
+            lines.set_array(values)
+            lines.set_cmap(cmap)
+            lines.set_norm(norm)
+        else:
+            lines.set_color(colors)
+        ax.add_collection(lines)
+        ax.autoscale_view()
+        return lines
+
+    # The image is padded so nodes on the boundary are not clipped by the axis limits
+    low, high = segments.reshape(-1, 2).min(axis=0), segments.reshape(-1, 2).max(axis=0)
+    pad = 0.05 * np.maximum(high - low, 1e-9)
+    extent = (low[0] - pad[0], high[0] + pad[0], low[1] - pad[1], high[1] + pad[1])
+    density, mean = rasterize_edges(segments, widths, values, extent)
+    image = cmap(norm(mean))
+    image[..., 3] = alpha * np.log1p(density) / max(np.log1p(density.max()), 1e-12)
+    ax.imshow(image, extent=extent, origin='lower', interpolation='nearest', aspect='auto', zorder=0)
+    return ScalarMappable(norm=norm, cmap=cmap)
+
+def plot_graph(g, plot_type, output=None, raster_threshold=RASTER_THRESHOLD):
     '''
     Plots graph based on visualization type.
+    Edges are drawn as one batched collection, or rasterized into a pixel buffer for
+    graphs with more than raster_threshold edges. With output (a .png/.svg path) the
+    image is written without a GUI instead of being shown.
     '''
-    plt.figure(figsize=(12, 9))
-    pos = nx.spring_layout(g)
+    if output is None:
+        fig = plt.figure(figsize=(12, 9))
+    else:
+        fig = Figure(figsize=(12, 9))
+        FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    pos = layout.get_layout(g)
+    nodes = list(g.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    points = np.array([pos[node] for node in nodes]).reshape(len(nodes), 2)
+    edges = list(g.edges(data=True))
+    src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    segments = np.stack([points[src], points[dst]], axis=1)
+    raster = len(edges) > raster_threshold
+    degrees = np.fromiter((d for _, d in g.degree(nodes)), dtype=np.float64, count=len(nodes))
 
     if plot_type == 'C':
         cc_attr = nx.get_node_attributes(g, 'clustering_coefficient')
-        degrees = dict(g.degree())
 
+        node_sizes = [cc_attr.get(node, 0) * 1000 + 50 for node in nodes]
         
-        node_sizes = [cc_attr.get(node, 0) * 1000 + 50 for node in g.nodes()]
-        node_colors = [degrees.get(node, 0) for node in g.nodes]
-        
-        nodes = nx.draw_networkx_nodes(g, pos, node_size=node_sizes, node_color=node_colors, cmap=plt.cm.viridis)
-        nx.draw_networkx_edges(g, pos, alpha=0.5)
+        drawn = nx.draw_networkx_nodes(g, pos, ax=ax, node_size=node_sizes, node_color=degrees, cmap=plt.cm.viridis)
+        if len(edges):
+            _draw_edges(ax, segments, np.ones(len(edges)), np.zeros(len(edges)), 'black',
+                        ListedColormap(['black']), Normalize(0, 1), 0.5, raster)
 
-        if nodes:
-            plt.colorbar(nodes, label='Node Degree')
-        plt.title('Visualization C: Node Size = Clustering Coefficient, Color = Degree')
+        if drawn:
+            fig.colorbar(drawn, ax=ax, label='Node Degree')
+        ax.set_title('Visualization C: Node Size = Clustering Coefficient, Color = Degree')
 
     elif plot_type == 'N':
-        for u, v, d in g.edges(data=True):
-            edge_widths = [d.get('neighborhood_overlap', 0) * 8 + 0.5]
-        for u, v in g.edges():
-            edge_colors = g.degree(u) + g.degree(v)
-        nx.draw_networkx_nodes(g, pos, node_color='lightgray', node_size=300)
-        edges = nx.draw_networkx_edges(g, pos, width=edge_widths, edge_color=edge_colors, edge_cmap=plt.cm.cividis, alpha=0.8)
-
-        if edges:
-            plt.colorbar(edges, label='Sum of Degrees (Edge Color)')
-        plt.title("Visualization N: Edge Thickness = Neighborhood Overlap, Color = Sum of Degrees")
+        edge_widths = np.array([d.get('neighborhood_overlap', 0) * 8 + 0.5 for _, _, d in edges])
+        edge_colors = degrees[src] + degrees[dst]
+        nx.draw_networkx_nodes(g, pos, ax=ax, node_color='lightgray', node_size=300)
+        if len(edges):
+            norm = Normalize(edge_colors.min(), edge_colors.max())
+            drawn = _draw_edges(ax, segments, edge_widths, edge_colors, None, plt.cm.cividis, norm, 0.8, raster)
+            fig.colorbar(drawn, ax=ax, label='Sum of Degrees (Edge Color)')
+        ax.set_title("Visualization N: Edge Thickness = Neighborhood Overlap, Color = Sum of Degrees")
 
     elif plot_type == 'P':
-        node_colors = ['gray'] * g.number_of_nodes()
+        node_colors, node_cmap = 'gray', None
         node_labels = nx.get_node_attributes(g, 'community_id')
 
         if node_labels:
-            node_colors = [d.get('community_id', 0) for n, d in g.nodes(data=True)]
+            node_colors, node_cmap = [d.get('community_id', 0) for n, d in g.nodes(data=True)], colormaps['Set1']
             print("Plotting nodes colored by 'community_id'.")
-        edge_colors = ['gray'] * g.number_of_edges()
-        if any('sign' in d for u, v, d in g.edges(data=True)):
-            edge_colors = ['red' if d.get('sign', 1) == -1 else 'blue' for u, v, d in g.edges(data=True)]
+
+        # Sign -1 maps to red and every other value to blue; unsigned graphs are gray
+        signs = np.zeros(len(edges))
+        cmap, norm = ListedColormap(['gray']), Normalize(0, 1)
+        if any('sign' in d for u, v, d in edges):
+            signs = np.array([-1.0 if d.get('sign', 1) == -1 else 1.0 for _, _, d in edges])
+            cmap, norm = LinearSegmentedColormap.from_list('sign', ['red', 'blue']), Normalize(-1, 1)
             print("Plotting edges colored by 'sign' attribute.")
             print("Key: Blue = Positive, Red = Negative")
 
-        nx.draw_networkx_nodes(g, pos, node_color=node_colors, cmap=plt.cm.get_cmap('Set1'), node_size=400)
-        nx.draw_networkx_edges(g, pos, edge_color=edge_colors, alpha=0.7)
-        plt.title('Visualization P: Plotting Graph Attributes (Community ID/Edge Sign)')
+        nx.draw_networkx_nodes(g, pos, ax=ax, node_color=node_colors, cmap=node_cmap, node_size=400)
+        if len(edges):
+            _draw_edges(ax, segments, np.ones(len(edges)), signs, cmap(norm(signs)), cmap, norm, 0.7, raster)
+        ax.set_title('Visualization P: Plotting Graph Attributes (Community ID/Edge Sign)')
 
-    plt.axis('off')
-    plt.show()
+    ax.axis('off')
+    if output is None:
+        plt.show()
+    else:
+        fig.savefig(output, dpi=100)
+        print(f"Plot saved to {output}")
 
-def temporal_sim(g_base, csv_file):
+def _parse_timestamps(values):
+    '''
+    Parses a chunk of timestamps as numbers, or as ISO 8601 datetimes (in seconds).
+
+    Returns:
+        tuple: (float64 array, True if the values were datetimes)
+    '''
+    try:
+        return np.array(values, dtype=np.float64), False
+    except ValueError:
+        return np.array([datetime.fromisoformat(value.strip()).timestamp() for value in values]), True
+
+def load_events(csv_file, chunk_size=100000):
+    '''
+    Streams an edge-event CSV (timestamp, source, target, action columns) in chunks
+    into compact arrays: node labels are interned to integer codes and actions stored
+    as 1 (add), -1 (remove) or 0 (ignored). Events are stably sorted by time.
+
+    Arguments:
+        csv_file (str): path of the CSV file
+        chunk_size (int): number of rows parsed at a time
+
+    Returns:
+        dict: 'time', 'source', 'target', 'action' arrays, the 'labels' list of node
+              labels by code, and 'datetime' (True if timestamps were datetimes)
+    '''
+    codes = {}
+    actions = {'add': 1, 'remove': -1}
+    chunks = {'time': [], 'source': [], 'target': [], 'action': []}
+    datetimes = False
+
+    with open(csv_file, mode='r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        columns = [header.index(name) for name in ('timestamp', 'source', 'target', 'action') if name in header]
+        if len(columns) < 4:
+            raise KeyError('timestamp')
+        time_col, source_col, target_col, action_col = columns
+
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            times, is_datetime = _parse_timestamps([row[time_col] for row in rows])
+            datetimes = datetimes or is_datetime
+            chunks['time'].append(times)
+            chunks['source'].append(np.fromiter((codes.setdefault(row[source_col], len(codes)) for row in rows), dtype=np.int64, count=len(rows)))
+            chunks['target'].append(np.fromiter((codes.setdefault(row[target_col], len(codes)) for row in rows), dtype=np.int64, count=len(rows)))
+            chunks['action'].append(np.fromiter((actions.get(row[action_col].lower(), 0) for row in rows), dtype=np.int8, count=len(rows)))
+
+    events = {key: np.concatenate(values) if values else np.empty(0) for key, values in chunks.items()}
+    order = np.argsort(events['time'], kind='stable')
+    events = {key: values[order] for key, values in events.items()}
+    events['labels'] = list(codes)
+    events['datetime'] = datetimes
+    return events
+
+def _format_time(events, i):
+    value = events['time'][i]
+    return datetime.fromtimestamp(value).isoformat() if events['datetime'] else f"{value:g}"
+
+def apply_events(g, events, start, end):
+    '''
+    Applies events start..end-1 to g in one batch. Nodes of every added edge are
+    created in event order (even if the edge is removed again within the batch), and
+    only the last add/remove of each edge decides its state, which gives the same
+    graph as applying the events one at a time.
+    '''
+    labels = events['labels']
+    actions = events['action'][start:end]
+    valid = np.flatnonzero(actions != 0)
+    sources, targets = events['source'][start:end][valid], events['target'][start:end][valid]
+
+    adding = actions[valid] > 0
+    ends = np.stack([sources[adding], targets[adding]], axis=1).ravel()
+    g.add_nodes_from(map(labels.__getitem__, ends.tolist()))
+
+    keys = np.minimum(sources, targets) * len(labels) + np.maximum(sources, targets)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    final = actions[valid][last]
+    removed, added = last[final < 0], last[final > 0]
+    g.remove_edges_from(zip(map(labels.__getitem__, sources[removed].tolist()), map(labels.__getitem__, targets[removed].tolist())))
+    g.add_edges_from(zip(map(labels.__getitem__, sources[added].tolist()), map(labels.__getitem__, targets[added].tolist())))
+
+def _draw_frame(ax, g, pos, title):
+    current_pos = {n: pos[n] for n in g.nodes()}
+    nx.draw_networkx_nodes(g, current_pos, ax=ax, node_color='skyblue', node_size=400)
+    nx.draw_networkx_edges(g, current_pos, ax=ax, edge_color='black')
+    if g.number_of_nodes() <= LABEL_LIMIT:
+        nx.draw_networkx_labels(g, current_pos, ax=ax)
+    ax.set_title(title)
+    ax.axis('off')
+
+def _event_title(events, i):
+    labels = events['labels']
+    action = {1: 'ADD', -1: 'REMOVE'}.get(int(events['action'][i]), 'IGNORED')
+    return f"Time: {_format_time(events, i)} | Action: {action} ({labels[events['source'][i]]}-{labels[events['target'][i]]})"
+
+def temporal_sim(g_base, csv_file, output=None, frame_interval=1, fps=5, chunk_size=100000):
     '''
     Loads a time series of edge changes and animates graph evolution.
+    Without output, every event is drawn in an interactive window. With output, the
+    replay is headless (Agg): events are applied in batches of frame_interval and one
+    frame is rendered per batch, written as PNG files into the output directory or,
+    for .gif/.mp4 paths, as an animation.
     '''
     print(f"\n===== Starting Temporal Simulation from {csv_file} =====")
 
-    events = []
-
     try:
-        with open(csv_file, mode='r', newline='') as file:
-            reader = csv.DictReader(file)
-
-            for row in reader:
-                events.append({
-                    'timestamp': row['timestamp'],
-                    'source': row['source'],
-                    'target': row['target'],
-                    'action': row['action'].lower()
-                })
+        events = load_events(csv_file, chunk_size)
     except FileNotFoundError:
         print(f"Error: {csv_file} could not be found")
         return
     except KeyError:
         print("Error: CSV must contain 'timestamp', 'source', 'target', and 'action' columns")
         return
-    
-    events.sort(key=lambda x: x['timestamp'])
+    except (ValueError, IndexError) as e:
+        print(f"Error: Could not parse {csv_file} - {e}")
+        return
 
     g = g_base.copy()
+    total = len(events['time'])
 
-    plt.figure(figsize=(10,8))
-
-    all_nodes = set(g.nodes())
-    for event in events:
-        all_nodes.add(event['source'])
-        all_nodes.add(event['target'])
-    
     temp_g = nx.Graph()
-    temp_g.add_nodes_from(all_nodes)
-    pos = nx.spring_layout(temp_g)
-    
-    for row in events:
-        source, target, action = row['source'], row['target'], row['action']
-
-        if action == 'add':
-            g.add_edge(source, target)
-        elif action == 'remove':
-            if g.has_edge(source, target):
-                g.remove_edge(source, target)
-        
-        plt.clf
-        current_nodes = list(g.nodes())
-        current_pos = {n: pos[n] for n in current_nodes}
-
-        nx.draw_networkx_nodes(g, current_pos, node_color='skyblue', node_size=400)
-        nx.draw_networkx_edges(g, current_pos, edge_color='black')
-        nx.draw_networkx_labels(g, current_pos)
-        plt.title(f"Time: {row['timestamp']} | Action: {action.upper()} ({source}-{target})")
-        plt.axis('off')
-        plt.draw()
-        plt.pause(0.5)
-    plt.close()
-    print("Temporal simulation finished.")
+    temp_g.add_nodes_from(g.nodes())
+    temp_g.add_nodes_from(events['labels'])
+    pos = layout.get_layout(temp_g)
+
+    if output is None:
+        plt.figure(figsize=(10,8))
+        for i in range(total):
+            apply_events(g, events, i, i + 1)
+            plt.clf()
+            _draw_frame(plt.gca(), g, pos, _event_title(events, i))
+            plt.draw()
+            plt.pause(0.5)
+        plt.close()
+        print("Temporal simulation finished.")
+        return
+
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    frame_interval = max(1, frame_interval)
+    suffix = os.path.splitext(output)[1].lower()
+
+    if suffix in ('.gif', '.mp4'):
+        writer = animation.PillowWriter(fps=fps) if suffix == '.gif' else animation.FFMpegWriter(fps=fps)
+        saving = writer.saving(fig, output, dpi=100)
+    else:
+        os.makedirs(output, exist_ok=True)
+        writer, saving = None, contextlib.nullcontext()
+
+    frames = 0
+    with saving:
+        for start in range(0, total, frame_interval):
+            end = min(start + frame_interval, total)
+            apply_events(g, events, start, end)
+            ax.clear()
+            title = _event_title(events, end - 1) if end - start == 1 else \
+                f"Time: {_format_time(events, end - 1)} | Events {start + 1}-{end} of {total}"
+            _draw_frame(ax, g, pos, title)
+            if writer is not None:
+                writer.grab_frame()
+            else:
+                fig.savefig(os.path.join(output, f"frame_{frames:05d}.png"))
+            frames += 1
 
+    print(f"Temporal simulation finished: {total} events, {frames} frames written to {output}")
@@ -1,6 +1,8 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 
+import layout
+
 def plotGraph(graph, bfs_start_nodes):
     '''
     Creates the visual for the graph with the paths and substructures.
@@ -10,7 +12,7 @@ def plotGraph(graph, bfs_start_nodes):
      bfs_start_nodes (list): a list of nodes used for BFS
     '''
 
-    pos = nx.spring_layout(graph, k=0.3, seed=42)
+    pos = layout.get_layout(graph, k=0.3, seed=42)
     plt.figure(figsize = (50, 50))
 
     nx.draw_networkx_nodes(graph, pos, node_color = 'lightgray', node_size = 100)
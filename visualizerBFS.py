@@ -1,42 +1,104 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-from collections import deque
+import numpy as np
 
-def plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes):
+from graph_io import INF_VALUE
+from graph_algorithms import bfs_arrays
+from graph_csr import build_csr
+
+def layered_positions(depths, parents, spacing=1.0):
+    '''
+    Layered layout of a BFS tree: x grows with depth and y is the node's rank within
+    its depth, centered around 0. Nodes are grouped by depth with one stable sort, and
+    every level below the first is ordered by the ranks of the parents, so the tree
+    edges between two levels do not cross. Runs in O(n log n).
+
+    Arguments:
+        depths (np.ndarray): depth of every node (unreachable nodes at depth 0)
+        parents (np.ndarray): BFS parent of every node (-1 for roots)
+        spacing (float): horizontal distance between depths
+
+    Returns:
+        np.ndarray: (n, 2) positions
+    '''
+    n = len(depths)
+    order = np.argsort(depths, kind='stable')
+    counts = np.bincount(depths, minlength=1)
+    starts = np.cumsum(counts) - counts
+    rank = np.empty(n, dtype=np.int64)
+    for depth, (start, count) in enumerate(zip(starts.tolist(), counts.tolist())):
+        members = order[start:start + count]
+        if depth:
+            members = members[np.argsort(rank[parents[members]], kind='stable')]
+        rank[members] = np.arange(count)
+
+    positions = np.empty((n, 2))
+    positions[:, 0] = depths * spacing
+    positions[:, 1] = rank - counts[depths] / 2
+    return positions
+
+def _stored_BFS(graph, index, i, start):
+    '''
+    Reads the distance_i/parent_i attributes written by graph_algorithms.multi_BFS
+    back into arrays, or returns None if they are missing or belong to another start node.
+    Unreachable nodes (inf, or the INF_VALUE sentinel after a GML round trip) keep -1.
+    '''
+    if graph.nodes[start].get(f"distance_{i}") != 0:
+        return None
+    distances = np.full(len(index), -1, dtype=np.int64)
+    parents = np.full(len(index), -1, dtype=np.int64)
+    for node, d in nx.get_node_attributes(graph, f"distance_{i}").items():
+        if 0 <= d < INF_VALUE:
+            distances[index[node]] = d
+    for node, p in nx.get_node_attributes(graph, f"parent_{i}").items():
+        if p in index:
+            parents[index[node]] = index[p]
+    return distances, parents
+
+def _start_tree(graph, csr, i, bfs_start, bfs_results):
+    '''
+    BFS tree (distances, parents) of start node i, taken from the multi_BFS results,
+    else from the stored attributes, and computed only as a last resort.
+    '''
+    nodes, index, offsets, neighbors = csr
+    result = bfs_results.get(i) if bfs_results is not None else None
+    if result is None:
+        result = _stored_BFS(graph, index, i, bfs_start)
+    if result is None:
+        result = bfs_arrays(offsets, neighbors, index[bfs_start])
+    return result
+
+def _base_tree(graph, csr, bfs_start_nodes, bfs_results):
+    '''
+    Depths and parents of the tree drawn underneath: the BFS tree of the first node
+    (reused when it is a start node), with unreachable nodes at depth 0.
+    '''
+    nodes, _, offsets, neighbors = csr
+    if nodes[0] in bfs_start_nodes:
+        depths, parents = _start_tree(graph, csr, bfs_start_nodes.index(nodes[0]), nodes[0], bfs_results)
+    else:
+        depths, parents = bfs_arrays(offsets, neighbors, 0)
+    return np.maximum(depths, 0), parents
+
+def _tree_edges(nodes, parents):
+    children = np.flatnonzero(parents >= 0)
+    return [(nodes[p], nodes[c]) for p, c in zip(parents[children].tolist(), children.tolist())]
+
+def plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes, bfs_results=None, csr=None):
     # Build a comprehensive tree that includes all nodes
+    csr = csr if csr is not None else build_csr(graph)
+    nodes, index = csr[0], csr[1]
     tree = nx.Graph()
-    depths = {}
-    
-    # Start with the first node to build initial tree structure
-    if graph.nodes():
-        start_node = list(graph.nodes())[0]
-        depths = {start_node: 0}
-        queue = deque([start_node])
-        
-        while queue:
-            current = queue.popleft()
-            for neighbor in graph.neighbors(current):
-                if neighbor not in depths:
-                    depths[neighbor] = depths[current] + 1
-                    queue.append(neighbor)
-                    tree.add_edge(current, neighbor)
-    
-    # Add all nodes to the tree (including isolated ones)
-    for node in graph.nodes():
-        if node not in tree:
-            tree.add_node(node)
-            if node not in depths:
-                depths[node] = 0  # Set depth to 0 for isolated/unreachable nodes
-    
+    tree.add_nodes_from(nodes)
+    if not nodes:
+        return
+
+    depths, parents = _base_tree(graph, csr, bfs_start_nodes, bfs_results)
+    tree.add_edges_from(_tree_edges(nodes, parents))
+
     # Create depth-based layout
-    pos = {}
-    for node in tree.nodes():
-        depth = depths.get(node, 0)
-        nodes_at_depth = [n for n, d in depths.items() if d == depth]
-        index = nodes_at_depth.index(node) if node in nodes_at_depth else 0
-        x = depth * 1.5
-        y = index - len(nodes_at_depth)/2 if nodes_at_depth else 0
-        pos[node] = (x, y)
+    positions = layered_positions(depths, parents, spacing=1.5)
+    pos = dict(zip(nodes, positions.tolist()))
     
     plt.figure(figsize=(12, 8))
     
@@ -57,35 +119,25 @@ def plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes):
     
     # Highlight each BFS path
     for i, bfs_start in enumerate(bfs_start_nodes):
-        if bfs_start not in graph.nodes():
+        if bfs_start not in index:
             print(f"Node {bfs_start} not found, skipping...")
             continue
-            
-        # Perform BFS from this start node
-        bfs_depths = {bfs_start: 0}
-        bfs_queue = deque([bfs_start])
-        bfs_edges = []
-        bfs_nodes = [bfs_start]
-        
-        while bfs_queue:
-            current = bfs_queue.popleft()
-            for neighbor in graph.neighbors(current):
-                if neighbor not in bfs_depths:
-                    bfs_depths[neighbor] = bfs_depths[current] + 1
-                    bfs_queue.append(neighbor)
-                    bfs_edges.append((current, neighbor))
-                    bfs_nodes.append(neighbor)
-        
+
+        # Reuses the BFS tree computed by multi_BFS
+        bfs_depths, bfs_parents = _start_tree(graph, csr, i, bfs_start, bfs_results)
         color = colors[i % len(colors)]
         
         # Only draw edges if they exist in the main tree
-        valid_bfs_edges = [edge for edge in bfs_edges if tree.has_edge(*edge)]
+        children = np.flatnonzero(bfs_parents >= 0)
+        heads = bfs_parents[children]
+        in_tree = (parents[children] == heads) | (parents[heads] == children)
+        valid_bfs_edges = [(nodes[p], nodes[c]) for p, c in zip(heads[in_tree].tolist(), children[in_tree].tolist())]
         if valid_bfs_edges:
             nx.draw_networkx_edges(tree, pos, edgelist=valid_bfs_edges,
                                   edge_color=color, width=2.5, alpha=0.8)
         
         # Highlight path nodes
-        valid_bfs_nodes = [node for node in bfs_nodes if node in tree.nodes()]
+        valid_bfs_nodes = [nodes[node] for node in np.flatnonzero(bfs_depths >= 0).tolist()]
         if valid_bfs_nodes:
             nx.draw_networkx_nodes(tree, pos, nodelist=valid_bfs_nodes,
                                   node_size=400, node_color=color, alpha=0.7)
@@ -104,10 +156,11 @@ def plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes):
                 ha='center', va='bottom', fontsize=10, fontweight='bold', color=color)
     
     # Add depth indicators
-    max_depth = max(depths.values()) if depths else 0
+    max_depth = int(depths.max())
+    bottom = positions[:, 1].min() - 1
     for depth in range(max_depth + 1):
         plt.axvspan(depth * 1.5 - 0.5, depth * 1.5 + 0.5, color='gray', alpha=0.1)
-        plt.text(depth * 1.5, min([pos[n][1] for n in tree.nodes()]) - 1, f'Depth {depth}', 
+        plt.text(depth * 1.5, bottom, f'Depth {depth}', 
                 ha='center', fontsize=10, backgroundcolor='white')
     
     plt.title(f"BFS Paths from Different Start Nodes", fontsize=12)
@@ -115,38 +168,20 @@ def plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes):
     plt.tight_layout()
     plt.show()
 
-def plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes):
+def plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes, bfs_results=None, csr=None):
     # Build a comprehensive tree that includes all nodes
+    csr = csr if csr is not None else build_csr(graph)
+    nodes, index = csr[0], csr[1]
     tree = nx.Graph()
-    depths = {}
-    
-    # Start with the first node to build initial tree structure
-    if graph.nodes():
-        start_node = list(graph.nodes())[0]
-        depths = {start_node: 0}
-        queue = deque([start_node])
-        
-        while queue:
-            current = queue.popleft()
-            for neighbor in graph.neighbors(current):
-                if neighbor not in depths:
-                    depths[neighbor] = depths[current] + 1
-                    queue.append(neighbor)
-                    tree.add_edge(current, neighbor)
-    
-    # Add all nodes to the tree (including isolated ones)
-    for node in graph.nodes():
-        if node not in tree:
-            tree.add_node(node)
-            if node not in depths:
-                depths[node] = 0  # Set depth to 0 for isolated/unreachable nodes
-    
-    pos = {}
-    for node in tree.nodes():
-        depth = depths.get(node, 0)
-        nodes_at_depth = [n for n, d in depths.items() if d == depth]
-        y_pos = nodes_at_depth.index(node) - len(nodes_at_depth)/2 if node in nodes_at_depth else 0
-        pos[node] = (depth, y_pos)
+    tree.add_nodes_from(nodes)
+    if not nodes:
+        return
+
+    depths, parents = _base_tree(graph, csr, bfs_start_nodes, bfs_results)
+    tree.add_edges_from(_tree_edges(nodes, parents))
+
+    positions = layered_positions(depths, parents)
+    pos = dict(zip(nodes, positions.tolist()))
     
     plt.figure(figsize=(12, 6))
     
@@ -167,11 +202,12 @@ def plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes):
                    edgecolors='black', linewidths=1)
     
     # Highlight the important nodes
-    important_nodes = set(bfs_start_nodes)
+    important_nodes = set(node for node in bfs_start_nodes if node in index)
+    isolated_set = set(isolated_nodes)
     
     # Draw highlighted nodes
     for node in important_nodes:
-        if node in isolated_nodes:
+        if node in isolated_set:
             plt.scatter(pos[node][0], pos[node][1], s=100, c='red',
                        edgecolors='black', linewidths=2)
         else:
@@ -183,7 +219,7 @@ def plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes):
     nx.draw_networkx_labels(tree, pos, labels, font_size=8)
     
     # Add depth indicators
-    max_depth = max(depths.values(), default=0)
+    max_depth = int(depths.max())
     for depth in range(max_depth + 1):
         plt.axvline(x=depth, color='gray', linestyle='--', alpha=0.3)
         plt.text(depth, -max_depth/2 - 0.5, f'Depth {depth}', 
@@ -194,9 +230,15 @@ def plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes):
     plt.grid(True, alpha=0.1)
     plt.show()
 
-def plotBFStree(graph, bfs_start_nodes, iso_nodes):
+def plotBFStree(graph, bfs_start_nodes, iso_nodes, bfs_results=None, csr=None):
+    '''
+    Plots the BFS tree of the graph with the BFS trees of the start nodes.
+    bfs_results are the arrays returned by graph_algorithms.multi_BFS (with csr, the
+    graph_csr.build_csr result they are indexed by); without them the distance_i/parent_i
+    attributes stored by multi_BFS are used, so no BFS is run twice.
+    '''
     # Creates a graph for nodes less than 20 & labels nodes
     if len(graph.nodes()) < 20:
-        plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes)
+        plotBFStreeDetailed(graph, bfs_start_nodes, iso_nodes, bfs_results, csr)
     else:
-        plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes)
+        plotBFStreeMinimalist(graph, bfs_start_nodes, iso_nodes, bfs_results, csr)